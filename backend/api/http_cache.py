@@ -0,0 +1,252 @@
+# backend/api/http_cache.py - Opt-in on-disk cache of YouTube API response pages
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from backend.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+ZLIB_LEVEL = 6
+_FILE_EXT = ".json.zz"
+# Comment pages of a settled video hardly change; metadata (comment counts,
+# channel uploads) does, so it gets its own, usually shorter, TTL
+COMMENT_ENDPOINTS = ("commentThreads", "comments")
+_EXCLUDED_PARAMS = ("key",)
+
+
+def _endpoint(url: str) -> str:
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def cache_key(url: str, params: Dict[str, Any]) -> str:
+    """Endpoint plus sorted params without the API key → hex digest (same page, same key)."""
+    normalized = sorted(
+        (k, str(v)) for k, v in params.items() if k not in _EXCLUDED_PARAMS and v is not None
+    )
+    raw = json.dumps([_endpoint(url), normalized], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CachedPage:
+    __slots__ = ("key", "body", "etag", "stored_at", "fresh")
+
+    def __init__(self, key: str, body: Dict[str, Any], etag: Optional[str], stored_at: float, fresh: bool):
+        self.key = key
+        self.body = body
+        self.etag = etag
+        self.stored_at = stored_at
+        self.fresh = fresh
+
+
+class ResponseCache:
+    """
+    YouTube API response pages on disk, one zlib-compressed JSON file per
+    page under ``directory``/<2 hex chars>/<key>.json.zz.
+
+    A page younger than its TTL is served without calling YouTube (no quota,
+    no rate-limit token). An older one is kept: the next request for it sends
+    its ETag as If-None-Match, and a 304 answer refreshes it in place. Files
+    are written atomically, so several workers can share the directory.
+    Beyond ``max_bytes`` the least recently used pages are deleted (access
+    time is the file's mtime, so the order survives restarts). Each process
+    keeps its own size index; with several workers the cap is approximate.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, comment_ttl: float, meta_ttl: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.comment_ttl = comment_ttl
+        self.meta_ttl = meta_ttl
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None  # key → bytes, least recently used first
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + _FILE_EXT)
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """Scan the directory once per process (caller holds the lock)."""
+        if self._index is None:
+            found = []
+            if os.path.isdir(self.directory):
+                for sub in os.scandir(self.directory):
+                    if not sub.is_dir():
+                        continue
+                    for entry in os.scandir(sub.path):
+                        if not entry.name.endswith(_FILE_EXT):
+                            continue
+                        try:
+                            st = entry.stat()
+                        except FileNotFoundError:  # evicted by another worker meanwhile
+                            continue
+                        found.append((st.st_mtime, entry.name[: -len(_FILE_EXT)], st.st_size))
+            found.sort()
+            self._index = OrderedDict((key, size) for _, key, size in found)
+            self._bytes = sum(self._index.values())
+        return self._index
+
+    def _touch(self, key: str, size: Optional[int] = None) -> None:
+        index = self._load_index()
+        if size is not None:
+            self._bytes += size - index.get(key, 0)
+            index[key] = size
+        if key in index:
+            index.move_to_end(key)
+
+    def _forget(self, key: str) -> None:
+        index = self._load_index()
+        self._bytes -= index.pop(key, 0)
+
+    def ttl(self, url: str) -> float:
+        return self.comment_ttl if _endpoint(url) in COMMENT_ENDPOINTS else self.meta_ttl
+
+    def get(self, url: str, params: Dict[str, Any], max_age: Optional[float] = None) -> Optional[CachedPage]:
+        """
+        The stored page for this request, or None. ``fresh`` tells whether it
+        may be used as is; ``max_age`` (seconds) overrides the endpoint's TTL,
+        0 = always revalidate.
+        """
+        key = cache_key(url, params)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                record = json.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)  # evicted by another worker
+                self.misses += 1
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning(f"⚠️ Unreadable cache entry {path}: {e}")
+            self.delete(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        limit = self.ttl(url) if max_age is None else max_age
+        fresh = time.time() - record["stored_at"] < limit
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._touch(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return CachedPage(key, record["body"], record.get("etag"), record["stored_at"], fresh)
+
+    def put(self, url: str, params: Dict[str, Any], body: Dict[str, Any], etag: Optional[str] = None) -> None:
+        key = cache_key(url, params)
+        record = {
+            "endpoint": _endpoint(url),
+            "params": {k: v for k, v in params.items() if k not in _EXCLUDED_PARAMS},
+            "etag": etag or body.get("etag"),
+            "stored_at": time.time(),
+            "body": body,
+        }
+        blob = zlib.compress(json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), ZLIB_LEVEL)
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)  # atomic: readers never see a partial file
+        except OSError as e:
+            logger.warning(f"⚠️ Could not cache YouTube page: {e}")
+            return
+        with self._lock:
+            self.stored += 1
+            self._touch(key, len(blob))
+            victims = self._evict()
+        for victim in victims:
+            self._unlink(victim)
+
+    def revalidated_page(self, page: CachedPage, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """YouTube answered 304 for a stale page: restart its TTL → its body."""
+        with self._lock:
+            self.revalidated += 1
+        self.put(url, params, page.body, page.etag)
+        return page.body
+
+    def _evict(self) -> List[str]:
+        """Drop least recently used pages until under max_bytes (caller holds the lock) → their keys."""
+        index = self._load_index()
+        victims = []
+        while self._bytes > self.max_bytes and len(index) > 1:
+            key, size = index.popitem(last=False)
+            self._bytes -= size
+            self.evicted += 1
+            victims.append(key)
+        return victims
+
+    def _unlink(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"⚠️ Could not delete cache entry {key}: {e}")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._forget(key)
+        self._unlink(key)
+
+    def clear(self) -> int:
+        """Delete every cached page → pages deleted."""
+        with self._lock:
+            keys = list(self._load_index())
+            self._index.clear()
+            self._bytes = 0
+        for key in keys:
+            self._unlink(key)
+        return len(keys)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "pages": len(index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "comment_ttl": self.comment_ttl,
+                "meta_ttl": self.meta_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "revalidated": self.revalidated,
+                "stored": self.stored,
+                "evicted": self.evicted,
+            }
+
+
+def _build_cache() -> Optional[ResponseCache]:
+    settings = get_settings()
+    if not settings.YOUTUBE_CACHE_DIR:
+        return None
+    return ResponseCache(
+        settings.YOUTUBE_CACHE_DIR,
+        max_bytes=int(settings.YOUTUBE_CACHE_MAX_MB * 1024 * 1024),
+        comment_ttl=settings.YOUTUBE_CACHE_TTL,
+        meta_ttl=settings.YOUTUBE_CACHE_META_TTL,
+    )
+
+
+youtube_cache = _build_cache()  # None unless YOUTUBE_CACHE_DIR is set
@@ -3,14 +3,18 @@ import re
 import time
 import requests
 import logging
-from typing import List, Dict, Optional
+from typing import Any, Iterator, List, Dict, Optional, Set, Tuple
 from backend.core.config import get_settings
+from backend.api.http_cache import youtube_cache
+from backend.api.rate_limit import BudgetExceeded, youtube_budget, youtube_limiter
 
 logger = logging.getLogger(__name__)
 
 YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3/commentThreads"
 YOUTUBE_VIDEO_URL = "https://www.googleapis.com/youtube/v3/videos"
 YOUTUBE_COMMENTS_URL = "https://www.googleapis.com/youtube/v3/comments"
+YOUTUBE_CHANNELS_URL = "https://www.googleapis.com/youtube/v3/channels"
+YOUTUBE_PLAYLIST_ITEMS_URL = "https://www.googleapis.com/youtube/v3/playlistItems"
 
 
 def extract_video_id(input_str: str) -> str:
@@ -46,58 +50,225 @@ def get_total_comment_count(video_id: str, api_key: Optional[str] = None) -> int
 
     params = {"part": "statistics", "id": video_id, "key": key}
     try:
-        r = requests.get(YOUTUBE_VIDEO_URL, params=params, timeout=30)
-        r.raise_for_status()
-        data = r.json()
+        data = _request(YOUTUBE_VIDEO_URL, params)
         if data.get("items"):
             stats = data["items"][0].get("statistics", {})
             return int(stats.get("commentCount", 0))
         return 0
+    except BudgetExceeded:
+        raise
     except Exception as e:
         logger.error(f"Failed to get comment count for {video_id}: {e}")
         return 0
 
 
-def _request(url: str, params: Dict, retries: int = 3) -> Dict:
-    """Robust request with retries and exponential backoff"""
+def _error_reason(response) -> Optional[str]:
+    """First error reason of a YouTube API error response (e.g. "quotaExceeded")."""
+    try:
+        return response.json()["error"]["errors"][0]["reason"]
+    except Exception:
+        return None
+
+
+def _retry_after(response) -> Optional[float]:
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _request(url: str, params: Dict, retries: int = 3, max_age: Optional[float] = None) -> Dict:
+    """
+    Robust request with retries. Every call waits for its turn in the
+    process-wide rate limiter and counts against the daily unit budget
+    (backend.api.rate_limit). Throttling responses pause the shared limiter
+    instead of sleeping here (unless pacing is off); other transient errors
+    back off exponentially.
+
+    With YOUTUBE_CACHE_DIR set, pages come from the on-disk cache
+    (backend.api.http_cache) while younger than their TTL, or ``max_age``
+    seconds if given (0 = always ask YouTube); older ones are revalidated
+    with their ETag.
+    """
+    cached = youtube_cache.get(url, params, max_age) if youtube_cache is not None else None
+    if cached is not None and cached.fresh:
+        return cached.body
+    headers = {"If-None-Match": cached.etag} if cached is not None and cached.etag else None
+
     delay = 1.0
     for attempt in range(retries):
+        youtube_budget.check()
+        youtube_limiter.acquire()
         try:
-            r = requests.get(url, params=params, timeout=30)
+            r = requests.get(url, params=params, headers=headers, timeout=30)
+            youtube_budget.spend()
+            if r.status_code == 304 and cached is not None:
+                return youtube_cache.revalidated_page(cached, url, params)
             r.raise_for_status()
-            return r.json()
+            data = r.json()
+            if youtube_cache is not None:
+                youtube_cache.put(url, params, data, r.headers.get("ETag"))
+            return data
         except requests.exceptions.RequestException as e:
             code = getattr(e.response, "status_code", None)
+            reason = _error_reason(e.response) if e.response is not None else None
+            if reason == "quotaExceeded":
+                youtube_budget.exhausted()
+                raise
+            throttled = code == 429 or reason in ("rateLimitExceeded", "userRateLimitExceeded")
             retriable = isinstance(
                 e,
                 (requests.exceptions.Timeout, requests.exceptions.ConnectionError),
-            ) or (code in (429, 500, 502, 503, 504))
+            ) or throttled or (code in (500, 502, 503, 504))
             logger.warning(
                 f"Fetch error (attempt {attempt+1}/{retries}): {e}. Retriable={retriable}"
             )
             if not retriable or attempt == retries - 1:
                 raise
-            time.sleep(delay)
-            delay *= 2
+            retry_after = _retry_after(e.response) if throttled else None
+            # The limiter pauses everyone and the next acquire() waits it out;
+            # with pacing off (YOUTUBE_RATE_LIMIT=0) it returns 0 and we back off here
+            if not throttled or youtube_limiter.throttled(retry_after) <= 0:
+                time.sleep(max(delay, retry_after or 0.0))
+                delay *= 2
+
+
+def _thread_comment(th: Dict) -> Optional[Dict]:
+    """Top-level comment entry of a commentThreads item (None if malformed)."""
+    sn = th.get("snippet") or {}
+    top = (sn.get("topLevelComment") or {}).get("snippet") or {}
+    top_id = (sn.get("topLevelComment") or {}).get("id")
+    if not top_id:
+        return None
+    return {
+        "comment_id": top_id,
+        "text": top.get("textDisplay", "") or "",
+        "author": top.get("authorDisplayName", "") or "",
+        "like_count": int(top.get("likeCount") or 0),
+        "published_at": top.get("publishedAt", "") or "",
+        "is_reply": False,
+        "raw_json": th,
+    }
 
 
-def fetch_youtube_comments(
+def _iter_reply_pages(parent_id: str, key: str) -> Iterator[List[Dict]]:
+    """All replies of a thread, one comments.list page (1 quota unit) at a time."""
+    reply_params = {
+        "part": "snippet",
+        "parentId": parent_id,
+        "maxResults": 100,
+        "textFormat": "plainText",
+        "key": key,
+    }
+    while True:
+        rd = _request(YOUTUBE_COMMENTS_URL, reply_params)
+        ritems = rd.get("items", [])
+        if not ritems:
+            return
+        page = []
+        for rep in ritems:
+            rsn = rep.get("snippet") or {}
+            page.append(
+                {
+                    "comment_id": rep.get("id"),
+                    "text": rsn.get("textDisplay", "") or "",
+                    "author": rsn.get("authorDisplayName", "") or "",
+                    "like_count": int(rsn.get("likeCount") or 0),
+                    "published_at": rsn.get("publishedAt", "") or "",
+                    "is_reply": True,
+                    "raw_json": rep,
+                }
+            )
+        yield page
+
+        reply_token = rd.get("nextPageToken")
+        if not reply_token:
+            return
+        reply_params["pageToken"] = reply_token
+
+
+COMMENT_ORDERS = ("time", "relevance", "mixed")
+
+
+def _iter_thread_pages(video_id: str, key: str, order: str = "time") -> Iterator[List[Dict]]:
+    """commentThreads items of a video, one page (1 quota unit) at a time."""
+    params = {
+        "part": "snippet",
+        "videoId": video_id,
+        "key": key,
+        "maxResults": 100,
+        "order": order,
+        "textFormat": "plainText",
+    }
+    while True:
+        data = _request(YOUTUBE_API_URL, params)
+        items = data.get("items", [])
+        if not items:
+            logger.info("✅ Pagination finished (no items)")
+            return
+        yield items
+
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            logger.info("✅ Reached end of commentThreads pages")
+            return
+        params["pageToken"] = page_token
+
+
+def _iter_mixed_thread_pages(video_id: str, key: str) -> Iterator[List[Dict]]:
+    """
+    Alternate pages of the newest-first and the relevance-ranked thread
+    listings, dropping threads already yielded by the other one. A prefix of
+    this stream spans the video's whole lifetime instead of only its most
+    recent comments, so ratios estimated from it are less biased by time.
+    """
+    seen: Set[str] = set()
+    listings = [_iter_thread_pages(video_id, key, "time"), _iter_thread_pages(video_id, key, "relevance")]
+    while listings:
+        for listing in list(listings):
+            items = next(listing, None)
+            if items is None:
+                listings.remove(listing)
+                continue
+            fresh = []
+            for th in items:
+                thread_id = th.get("id")
+                if thread_id:
+                    if thread_id in seen:
+                        continue
+                    seen.add(thread_id)
+                fresh.append(th)
+            if fresh:
+                yield fresh
+
+
+def iter_youtube_comments(
     video_id: str,
     api_key: Optional[str] = None,
     max_comments: Optional[int] = None,  # None = unlimited
     include_replies: bool = True,
     percentage: float = 1.0,
-) -> List[Dict]:
-    """Fetch YouTube comments robustly (no hard cap, retry, safe parsing, full replies)."""
+    order: str = "time",
+) -> Iterator[Dict]:
+    """
+    Yield YouTube comments as they are fetched, one API page at a time
+    (retry, safe parsing, full replies). Memory use does not grow with the
+    number of comments, so callers can stream them into aggregators.
+
+    ``order`` is "time" (newest first), "relevance" or "mixed" (both
+    listings interleaved, see _iter_mixed_thread_pages).
+    """
     settings = get_settings()
     key = api_key or settings.YOUTUBE_API_KEY
     if not key:
         raise ValueError("YOUTUBE_API_KEY not configured")
+    if order not in COMMENT_ORDERS:
+        raise ValueError(f"order must be one of {', '.join(COMMENT_ORDERS)}, got '{order}'")
 
     total_comments = get_total_comment_count(video_id, key)
     if total_comments == 0:
         logger.warning(f"No comments found for video: {video_id}")
-        return []
+        return
 
     # Target jumlah komentar
     if percentage == 1.0 and max_comments is None:
@@ -113,105 +284,56 @@ def fetch_youtube_comments(
             f"📊 Fetching up to {target_max} comments (of {total_comments}, {percentage*100:.0f}%)"
         )
 
-    comments: List[Dict] = []
-    params = {
-        "part": "snippet",
-        "videoId": video_id,
-        "key": key,
-        "maxResults": 100,
-        "order": "time",
-        "textFormat": "plainText",
-    }
-    page_token: Optional[str] = None
-
-    while len(comments) < target_max:
-        if page_token:
-            params["pageToken"] = page_token
-        elif "pageToken" in params:
-            params.pop("pageToken")
-
-        data = _request(YOUTUBE_API_URL, params)
-        items = data.get("items", [])
-        if not items:
-            logger.info("✅ Pagination finished (no items)")
-            break
+    if target_max <= 0:
+        return
 
+    fetched = 0
+    pages = (
+        _iter_mixed_thread_pages(video_id, key) if order == "mixed"
+        else _iter_thread_pages(video_id, key, order)
+    )
+    for items in pages:
         for th in items:
-            if len(comments) >= target_max:
+            if fetched >= target_max:
                 break
 
-            sn = th.get("snippet") or {}
-            top = (sn.get("topLevelComment") or {}).get("snippet") or {}
-            top_id = (sn.get("topLevelComment") or {}).get("id")
-            if not top_id:
+            top = _thread_comment(th)
+            if top is None:
                 continue
-
-            comments.append(
-                {
-                    "comment_id": top_id,
-                    "text": top.get("textDisplay", "") or "",
-                    "author": top.get("authorDisplayName", "") or "",
-                    "like_count": int(top.get("likeCount") or 0),
-                    "published_at": top.get("publishedAt", "") or "",
-                    "is_reply": False,
-                    "raw_json": th,
-                }
-            )
-            if len(comments) >= target_max:
+            yield top
+            fetched += 1
+            if fetched >= target_max:
                 break
 
             # ---- Replies full pagination ----
-            if include_replies:
-                reply_token: Optional[str] = None
-                reply_params = {
-                    "part": "snippet",
-                    "parentId": top_id,
-                    "maxResults": 100,
-                    "textFormat": "plainText",
-                    "key": key,
-                }
-                while len(comments) < target_max:
-                    if reply_token:
-                        reply_params["pageToken"] = reply_token
-                    elif "pageToken" in reply_params:
-                        reply_params.pop("pageToken")
-
-                    rd = _request(YOUTUBE_COMMENTS_URL, reply_params)
-                    ritems = rd.get("items", [])
-                    if not ritems:
-                        break
-
-                    for rep in ritems:
-                        rsn = rep.get("snippet") or {}
-                        comments.append(
-                            {
-                                "comment_id": rep.get("id"),
-                                "text": rsn.get("textDisplay", "") or "",
-                                "author": rsn.get("authorDisplayName", "") or "",
-                                "like_count": int(rsn.get("likeCount") or 0),
-                                "published_at": rsn.get("publishedAt", "") or "",
-                                "is_reply": True,
-                                "raw_json": rep,
-                            }
-                        )
-                        if len(comments) >= target_max:
+            if include_replies and (th.get("snippet") or {}).get("totalReplyCount", 1):
+                for page in _iter_reply_pages(top["comment_id"], key):
+                    for rep in page:
+                        yield rep
+                        fetched += 1
+                        if fetched >= target_max:
                             break
-
-                    reply_token = rd.get("nextPageToken")
-                    if not reply_token:
+                    if fetched >= target_max:
                         break
 
-        page_token = data.get("nextPageToken")
-        if not page_token:
-            logger.info("✅ Reached end of commentThreads pages")
+        if fetched >= target_max:
             break
 
-    fetched = len(comments)
     pct = (fetched / total_comments * 100) if total_comments else 0.0
     logger.info(
         f"✅ Successfully fetched {fetched} comments (~{pct:.1f}% of top-level count {total_comments})."
     )
-    return comments
+
+
+def fetch_youtube_comments(
+    video_id: str,
+    api_key: Optional[str] = None,
+    max_comments: Optional[int] = None,  # None = unlimited
+    include_replies: bool = True,
+    percentage: float = 1.0,
+) -> List[Dict]:
+    """Fetch YouTube comments robustly (no hard cap, retry, safe parsing, full replies)."""
+    return list(iter_youtube_comments(video_id, api_key, max_comments, include_replies, percentage))
 
 
 def fetch_video_info(video_id: str, api_key: Optional[str] = None) -> Dict:
@@ -223,9 +345,7 @@ def fetch_video_info(video_id: str, api_key: Optional[str] = None) -> Dict:
 
     params = {"part": "snippet,statistics", "id": video_id, "key": key}
     try:
-        r = requests.get(YOUTUBE_VIDEO_URL, params=params, timeout=30)
-        r.raise_for_status()
-        data = r.json()
+        data = _request(YOUTUBE_VIDEO_URL, params)
         if data.get("items"):
             item = data["items"][0]
             snippet = item.get("snippet", {})
@@ -246,6 +366,8 @@ def fetch_video_info(video_id: str, api_key: Optional[str] = None) -> Dict:
                 "channel_title": "Unknown Channel",
                 "comment_count": 0,
             }
+    except BudgetExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error fetching video info for {video_id}: {e}")
         return {
@@ -254,3 +376,207 @@ def fetch_video_info(video_id: str, api_key: Optional[str] = None) -> Dict:
             "channel_title": "Unknown Channel",
             "comment_count": 0,
         }
+
+
+# ─── Channels ─────────────────────────────────────────────────────────────────
+
+def extract_channel_ref(input_str: str) -> Tuple[str, str]:
+    """
+    Parse a channel reference → ("id", "UC…") or ("handle", "@name").
+    Accepts channel IDs, @handles and youtube.com/channel/… or /@… URLs.
+    """
+    if not input_str or not isinstance(input_str, str):
+        raise ValueError("Invalid input: must be a non-empty string")
+
+    input_str = input_str.strip()
+    match = re.search(r"(?:youtube\.com/channel/)?(UC[a-zA-Z0-9_-]{22})(?:[/?#]|$)", input_str)
+    if match:
+        return "id", match.group(1)
+    match = re.search(r"(?:youtube\.com/)?(@[a-zA-Z0-9._-]{3,30})(?:[/?#]|$)", input_str)
+    if match:
+        return "handle", match.group(1)
+
+    raise ValueError(f"Could not extract channel ID or @handle from: {input_str}")
+
+
+def resolve_channel(channel_input: str, api_key: Optional[str] = None) -> Dict:
+    """Channel metadata and its uploads playlist ID (1 quota unit)."""
+    settings = get_settings()
+    key = api_key or settings.YOUTUBE_API_KEY
+    if not key:
+        raise ValueError("YOUTUBE_API_KEY not configured")
+
+    kind, value = extract_channel_ref(channel_input)
+    params = {"part": "snippet,contentDetails,statistics", "key": key}
+    params["id" if kind == "id" else "forHandle"] = value
+    data = _request(YOUTUBE_CHANNELS_URL, params)
+    items = data.get("items") or []
+    if not items:
+        raise ValueError(f"Channel not found: {channel_input}")
+
+    item = items[0]
+    snippet = item.get("snippet", {})
+    uploads = ((item.get("contentDetails") or {}).get("relatedPlaylists") or {}).get("uploads")
+    if not uploads:
+        raise ValueError(f"Channel has no uploads playlist: {channel_input}")
+    return {
+        "channel_id": item.get("id"),
+        "title": snippet.get("title", "Unknown Channel"),
+        "handle": snippet.get("customUrl"),
+        "uploads_playlist_id": uploads,
+        "video_count": int((item.get("statistics") or {}).get("videoCount", 0)),
+    }
+
+
+def list_channel_uploads(
+    uploads_playlist_id: str,
+    api_key: Optional[str] = None,
+    max_videos: int = 25,
+) -> Tuple[List[Dict], int]:
+    """
+    Most recent uploads, newest first → (videos, quota units used).
+    One playlistItems page (1 unit) returns up to 50 videos.
+    """
+    settings = get_settings()
+    key = api_key or settings.YOUTUBE_API_KEY
+    if not key:
+        raise ValueError("YOUTUBE_API_KEY not configured")
+
+    params = {
+        "part": "snippet,contentDetails",
+        "playlistId": uploads_playlist_id,
+        "maxResults": min(50, max_videos),
+        "key": key,
+    }
+    videos: List[Dict] = []
+    units = 0
+    while len(videos) < max_videos:
+        data = _request(YOUTUBE_PLAYLIST_ITEMS_URL, params)
+        units += 1
+        for item in data.get("items", []):
+            details = item.get("contentDetails") or {}
+            snippet = item.get("snippet") or {}
+            video_id = details.get("videoId")
+            if not video_id:
+                continue
+            videos.append({
+                "video_id": video_id,
+                "title": snippet.get("title", "Unknown Video"),
+                "channel_title": snippet.get("channelTitle", "Unknown Channel"),
+                "published_at": details.get("videoPublishedAt") or snippet.get("publishedAt", ""),
+            })
+            if len(videos) >= max_videos:
+                break
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            break
+        params["pageToken"] = page_token
+    return videos, units
+
+
+def fetch_comments_since(
+    video_id: str,
+    since: Optional[str] = None,
+    api_key: Optional[str] = None,
+    max_comments: Optional[int] = None,
+    include_replies: bool = True,
+    seen_at_mark: Optional[Set[str]] = None,
+    resume: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict], int, Optional[Dict[str, Any]]]:
+    """
+    Incremental fetch: threads newer than the ``since`` high-water mark (the
+    publishedAt of the newest top-level comment seen before), with their
+    replies → (comments, quota units used, resume point). Threads come newest
+    first, so paging stops at the first one older than the mark; threads
+    published in the mark's second are skipped only if their id is in
+    ``seen_at_mark``.
+
+    When ``max_comments`` cuts the fetch off before the mark, the resume
+    point says where: the page it stopped in, the publishedAt of the oldest
+    thread fetched and the ids fetched at that second. Passing it back as
+    ``resume`` continues downward from there instead of re-reading the
+    newest pages. None = the fetch reached the mark (or ran out of pages).
+    Replies added later to older threads are not picked up.
+    """
+    settings = get_settings()
+    key = api_key or settings.YOUTUBE_API_KEY
+    if not key:
+        raise ValueError("YOUTUBE_API_KEY not configured")
+
+    target_max = max_comments if max_comments is not None else float("inf")
+    comments: List[Dict] = []
+    units = 0
+    params = {
+        "part": "snippet",
+        "videoId": video_id,
+        "key": key,
+        "maxResults": 100,
+        "order": "time",
+        "textFormat": "plainText",
+    }
+    seen_at_mark = seen_at_mark or set()
+    before = (resume or {}).get("before")
+    seen_at_before = set((resume or {}).get("seen") or ())
+    if (resume or {}).get("page_token"):
+        params["pageToken"] = resume["page_token"]
+
+    next_resume: Optional[Dict[str, Any]] = None
+    last_at, ids_at_last = None, []  # fetched threads sharing the oldest second so far
+    while next_resume is None:
+        page_token = params.get("pageToken")
+        try:
+            # Never a cached page as is: the point is finding what is new
+            data = _request(YOUTUBE_API_URL, params, max_age=0)
+        except requests.exceptions.HTTPError as e:
+            status = getattr(e.response, "status_code", None)
+            if status == 400 and page_token and resume and page_token == resume.get("page_token"):
+                # Saved page token no longer accepted: page down from the newest
+                # again; threads at or above ``before`` are skipped unscored
+                logger.warning(f"⚠️ {video_id}: resume page token rejected, restarting from the newest page")
+                del params["pageToken"]
+                continue
+            if status == 403:  # comments disabled
+                logger.warning(f"Comments unavailable for {video_id}: {e}")
+                break
+            raise
+        units += 1
+
+        reached_seen = False
+        for th in data.get("items", []):
+            top = _thread_comment(th)
+            if top is None:
+                continue
+            # ISO-8601 UTC timestamps compare correctly as strings
+            published = top["published_at"]
+            if before and (published > before or (published == before and top["comment_id"] in seen_at_before)):
+                continue  # fetched by the capped run this one resumes
+            if since and published < since:
+                reached_seen = True
+                break
+            if since and published == since and top["comment_id"] in seen_at_mark:
+                continue  # same second as the mark: only the ids stored then are old
+            comments.append(top)
+            if published != last_at:
+                last_at, ids_at_last = published, []
+            ids_at_last.append(top["comment_id"])
+            if include_replies and (th.get("snippet") or {}).get("totalReplyCount"):
+                for page in _iter_reply_pages(top["comment_id"], key):
+                    units += 1
+                    comments.extend(page)
+            if len(comments) >= target_max:
+                seen = ids_at_last + (sorted(seen_at_before) if published == before else [])
+                next_resume = {"page_token": page_token, "before": published, "seen": seen}
+                break
+
+        next_token = data.get("nextPageToken")
+        if next_resume is not None or reached_seen or not next_token:
+            break
+        params["pageToken"] = next_token
+
+    logger.info(f"✅ {video_id}: {len(comments)} new comments since {since or 'start'} ({units} units)")
+    if next_resume is not None:
+        logger.warning(
+            f"⚠️ {video_id}: stopped at {len(comments)} comments before reaching {since or 'the start'}; "
+            f"the next refresh resumes below {next_resume['before']}"
+        )
+    return comments, units, next_resume
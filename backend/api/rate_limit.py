@@ -0,0 +1,316 @@
+# backend/api/rate_limit.py - Process-wide pacing and quota guard for YouTube API calls
+import contextvars
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, TypeVar
+
+from backend.core.config import get_settings
+from backend.services.quota import quota_ledger
+
+logger = logging.getLogger(__name__)
+
+# Every list call this app makes (commentThreads, comments, videos, channels,
+# playlistItems) costs 1 quota unit per page
+UNITS_PER_CALL = 1
+_RATE_WINDOW = 10.0          # seconds of grants behind the "current rate" metric
+_RECOVERY_PER_GRANT = 0.02   # share of the configured rate regained per call after throttling
+_MIN_RATE_SHARE = 0.1        # throttling never slows below this share of the configured rate
+
+T = TypeVar("T")
+
+_current_job: contextvars.ContextVar[str] = contextvars.ContextVar("youtube_job", default="default")
+
+
+class BudgetExceeded(Exception):
+    """The daily YouTube unit budget cannot cover a job (or is used up)."""
+
+
+def current_job() -> str:
+    return _current_job.get()
+
+
+def _pacific_today() -> date:
+    """YouTube quotas reset at midnight Pacific time."""
+    try:
+        from zoneinfo import ZoneInfo
+        return datetime.now(ZoneInfo("US/Pacific")).date()
+    except Exception:
+        return date.today()
+
+
+class FairRateLimiter:
+    """
+    Token bucket shared by every thread that calls YouTube. Tokens refill at
+    ``rate`` per second up to ``burst``; waiting calls are granted in
+    round-robin order across jobs, so one large analysis cannot starve the
+    others and N active jobs each get about 1/N of the rate.
+
+    When YouTube throttles anyway (throttled()), the whole bucket pauses for
+    the Retry-After time and the rate drops by half, then climbs back a
+    little with every granted call. All jobs slow down together instead of
+    each retrying on its own schedule.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self._cond = threading.Condition()
+        self.configured_rate = rate
+        self._rate = rate
+        self._burst = max(1.0, burst)
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queues: Dict[str, Deque[int]] = {}  # job → waiting tickets, FIFO
+        self._ring: Deque[str] = deque()           # jobs with waiting calls, next to serve first
+        self._tickets = itertools.count()
+        self._grants: Deque[float] = deque()
+        self.granted = 0
+        self.throttled_count = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, job: Optional[str] = None) -> float:
+        """Block until this call may go out → seconds waited. No-op when the rate is 0 (off)."""
+        if self.configured_rate <= 0:
+            return 0.0
+        job = job or current_job()
+        started = time.monotonic()
+        with self._cond:
+            ticket = next(self._tickets)
+            self._queues.setdefault(job, deque()).append(ticket)
+            if job not in self._ring:
+                self._ring.append(job)
+
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                head_job = self._ring[0]
+                if self._queues[head_job][0] == ticket:
+                    wait = max(self._paused_until - now, (1.0 - self._tokens) / self._rate)
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+
+            self._tokens -= 1.0
+            self._queues[job].popleft()
+            self._ring.popleft()
+            if self._queues[job]:
+                self._ring.append(job)  # back of the line behind the other jobs
+            else:
+                del self._queues[job]
+            if self._rate < self.configured_rate:
+                self._rate = min(self.configured_rate, self._rate + self.configured_rate * _RECOVERY_PER_GRANT)
+
+            self._grants.append(now)
+            self.granted += 1
+            waited = now - started
+            self.waited_seconds += waited
+            self._cond.notify_all()
+        return waited
+
+    def throttled(self, retry_after: Optional[float] = None) -> float:
+        """YouTube answered 429 / rate-limit 403: pause everyone and halve the rate → pause seconds."""
+        with self._cond:
+            self.throttled_count += 1
+            if self.configured_rate <= 0:
+                return 0.0  # no pacing: the caller backs off on its own
+            self._rate = max(self.configured_rate * _MIN_RATE_SHARE, self._rate / 2)
+            pause = retry_after if retry_after and retry_after > 0 else 1.0 / self._rate
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._tokens = min(self._tokens, 0.0)
+            self._cond.notify_all()
+        logger.warning(f"⏳ YouTube throttled: pausing {pause:.1f}s, rate now {self._rate:.2f}/s")
+        return pause
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            while self._grants and self._grants[0] < now - _RATE_WINDOW:
+                self._grants.popleft()
+            self._refill(now)
+            return {
+                "configured_rate": self.configured_rate,
+                "effective_rate": round(self._rate, 3),
+                "current_rate": round(len(self._grants) / _RATE_WINDOW, 3),
+                "tokens": round(self._tokens, 2),
+                "paused_for": round(max(0.0, self._paused_until - now), 2),
+                "waiting": {job: len(q) for job, q in self._queues.items()},
+                "granted": self.granted,
+                "throttled": self.throttled_count,
+                "avg_wait_ms": round(self.waited_seconds / self.granted * 1000, 1) if self.granted else 0.0,
+            }
+
+
+class QuotaBudget:
+    """
+    Guard for the daily quota (DAILY_QUOTA_LIMIT) while YouTube calls run.
+    Finished work is charged to the quota ledger (services/quota.py), read
+    through ``charged``; this class adds what running jobs have spent but not
+    yet charged. A job reserves its estimated cost up front (youtube_job()),
+    so concurrent jobs cannot together overrun what is left. The estimate
+    uses units per comment learned from finished jobs.
+    """
+
+    def __init__(
+        self,
+        daily_units: int,
+        charged: Callable[[], int] = lambda: 0,
+        prior_units_per_comment: float = 0.01,
+    ):
+        self._lock = threading.Lock()
+        self.daily_units = daily_units
+        self._charged = charged
+        self._day = _pacific_today()
+        self.spent = 0
+        self._reserved: Dict[str, int] = {}
+        self._job_spent: Dict[str, int] = {}
+        self.units_per_comment = prior_units_per_comment
+        self._exhausted = False
+
+    def _roll_day(self) -> None:
+        today = _pacific_today()
+        if today != self._day:
+            self._day = today
+            self.spent = 0
+            self._exhausted = False
+
+    def remaining(self) -> Optional[int]:
+        """Units left today after charges, running jobs and reservations (None = no limit)."""
+        if self.daily_units <= 0:
+            return None
+        with self._lock:
+            self._roll_day()
+            return self._remaining()
+
+    def _remaining(self) -> int:
+        if self._exhausted:
+            return 0
+        jobs = set(self._reserved) | set(self._job_spent)
+        in_flight = sum(max(self._reserved.get(job, 0), self._job_spent.get(job, 0)) for job in jobs)
+        return max(0, self.daily_units - self._charged() - in_flight)
+
+    def estimate(self, target_comments: int, overhead_calls: int = 2) -> int:
+        """Units a fetch of ``target_comments`` comments is expected to cost."""
+        return overhead_calls + max(1, math.ceil(target_comments * self.units_per_comment))
+
+    def reserve(self, job: str, units: int) -> None:
+        if self.daily_units <= 0 or units <= 0:
+            return
+        with self._lock:
+            self._roll_day()
+            left = self._remaining()
+            if units > left:
+                raise BudgetExceeded(
+                    f"YouTube API budget: job needs ~{units} units, {left} of {self.daily_units} left today"
+                )
+            self._reserved[job] = self._reserved.get(job, 0) + units
+
+    def spend(self, units: int = UNITS_PER_CALL, job: Optional[str] = None) -> None:
+        with self._lock:
+            self._roll_day()
+            self.spent += units
+            job = job or current_job()
+            if job != "default":  # calls outside any job are never charged to the ledger
+                self._job_spent[job] = self._job_spent.get(job, 0) + units
+
+    def check(self) -> None:
+        """Raise BudgetExceeded if today's quota is used up (called before every call)."""
+        if self.daily_units <= 0:
+            return
+        with self._lock:
+            self._roll_day()
+            if self._exhausted or self._charged() + sum(self._job_spent.values()) >= self.daily_units:
+                raise BudgetExceeded(f"YouTube API budget of {self.daily_units} units is used up for today")
+
+    def exhausted(self) -> None:
+        """YouTube reported quotaExceeded: nothing more can be spent today."""
+        with self._lock:
+            self._exhausted = True
+
+    def release(self, job: str, comments: Optional[int] = None) -> int:
+        """
+        End a job → units it spent; learns units per comment from it. The
+        caller charges those units to the ledger, which takes them over.
+        """
+        with self._lock:
+            self._reserved.pop(job, None)
+            spent = self._job_spent.pop(job, 0)
+            if comments and comments >= 100 and spent:
+                # Exponential moving average, so a few unusual videos do not dominate
+                self.units_per_comment = 0.8 * self.units_per_comment + 0.2 * (spent / comments)
+            return spent
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._roll_day()
+            return {
+                "day": self._day.isoformat(),
+                "daily_units": self.daily_units or None,
+                "spent": self.spent,
+                "charged": self._charged(),
+                "in_flight": {job: units for job, units in self._job_spent.items()},
+                "reserved": {job: units for job, units in self._reserved.items()},
+                "remaining": self._remaining() if self.daily_units > 0 else None,
+                "exhausted": self._exhausted,
+                "units_per_comment": round(self.units_per_comment, 4),
+            }
+
+
+_settings = get_settings()
+youtube_limiter = FairRateLimiter(_settings.YOUTUBE_RATE_LIMIT, _settings.YOUTUBE_RATE_BURST)
+youtube_budget = QuotaBudget(_settings.DAILY_QUOTA_LIMIT, charged=lambda: quota_ledger.usage()[0])
+_job_ids = itertools.count(1)
+
+
+class YouTubeJob:
+    """One analysis' share of the limiter and the budget (see youtube_job)."""
+
+    def __init__(self, name: str):
+        self.id = f"{name}#{next(_job_ids)}"
+        self.comments: Optional[int] = None  # set by the caller; teaches the budget units per comment
+        self.units = 0                       # units spent, known once the job ends
+
+    def reserve(self, units: int) -> None:
+        """Hold ``units`` of today's budget for this job (BudgetExceeded if they are not left)."""
+        youtube_budget.reserve(self.id, units)
+
+    def bind(self, fn: Callable[..., T]) -> Callable[..., T]:
+        """``fn`` running as part of this job, for thread pools (contextvars do not cross threads)."""
+        def _run(*args: Any, **kwargs: Any) -> T:
+            token = _current_job.set(self.id)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_job.reset(token)
+        return _run
+
+
+@contextmanager
+def youtube_job(name: str, estimated_units: int = 0) -> Iterator[YouTubeJob]:
+    """
+    Scope the YouTube calls made in this context to one job: they share its
+    fair-share queue in the limiter and count against its reservation of
+    ``estimated_units`` (BudgetExceeded if the budget cannot cover it).
+    """
+    job = YouTubeJob(name)
+    job.reserve(estimated_units)
+    token = _current_job.set(job.id)
+    try:
+        yield job
+    finally:
+        _current_job.reset(token)
+        job.units = youtube_budget.release(job.id, job.comments)
+
+
+def youtube_metrics() -> Dict[str, Any]:
+    return {"rate": youtube_limiter.metrics(), "budget": youtube_budget.metrics()}
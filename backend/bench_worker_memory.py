@@ -0,0 +1,193 @@
+"""
+Memory per worker with and without the shared (preloaded) model.
+
+Starts the API under gunicorn twice with the same number of workers: once
+with PRELOAD_MODEL=0 (every worker loads its own copy of the model) and once
+with the default gunicorn.conf.py (the master loads it once and forks). After
+warm-up requests it reads /proc/<pid>/smaps_rollup of the master and every
+worker and reports:
+
+    RSS  resident memory, counting shared pages in full for every process
+    PSS  resident memory with shared pages split between their sharers
+    USS  memory private to the process (what it would free on exit)
+
+Sum of PSS is the real footprint of the whole server; with the shared model
+each worker's USS should drop by roughly the size of the weights.
+
+Linux only (reads /proc), needs gunicorn and uvicorn-worker installed.
+Run from the project root:
+    python -m backend.bench_worker_memory
+    python -m backend.bench_worker_memory --workers 4 --requests 40
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional, Sequence
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_TIMEOUT = 900  # seconds; every worker loads the model in the baseline
+_SMAPS_FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty")
+_WARMUP_TEXTS = [
+    "Lagunya enak banget, suaranya mantap!",
+    "The audio is terrible in the second half",
+    "Not sure what to think about this one",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    out = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            out.append(int(entry))
+    return sorted(out)
+
+
+def _memory_mb(pid: int) -> Dict[str, float]:
+    """RSS / PSS / USS of one process in MB, from smaps_rollup."""
+    values = dict.fromkeys(_SMAPS_FIELDS, 0)
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in values:
+                values[key] = int(rest.split()[0])  # kB
+    return {
+        "rss": round(values["Rss"] / 1024, 1),
+        "pss": round(values["Pss"] / 1024, 1),
+        "uss": round((values["Private_Clean"] + values["Private_Dirty"]) / 1024, 1),
+    }
+
+
+def _get(url: str, timeout: float = 5.0) -> Optional[Dict]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as r:
+            return json.loads(r.read())
+    except Exception:
+        return None
+
+
+def _post(url: str, body: Dict, timeout: float = 120.0) -> None:
+    req = urllib.request.Request(
+        url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as r:
+        r.read()
+
+
+def measure(preload: bool, workers: int, requests: int) -> Dict:
+    """Start the server in one mode, warm it up and measure every process."""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        PRELOAD_MODEL="1" if preload else "0",
+        WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}",
+        RENDER_WORKERS="0",  # chart processes would blur the per-worker numbers
+    )
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ss-mem-'), 'mem.db')}")
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        # Workers answer only after their startup (model load attempt) is done
+        deadline = time.time() + STARTUP_TIMEOUT
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+            if time.time() > deadline:
+                raise RuntimeError("server did not become ready in time")
+            health = [_get(f"{base}/health") for _ in range(workers * 3)]
+            if len(_children(server.pid)) == workers and all(health):
+                model_ready = all(h.get("model_ready") for h in health)
+                break
+            time.sleep(2)
+
+        for _ in range(requests):
+            _post(f"{base}/api/predict", {"texts": _WARMUP_TEXTS})
+        time.sleep(2)
+
+        master = _memory_mb(server.pid)
+        per_worker = [_memory_mb(pid) for pid in _children(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    def _avg(key: str) -> float:
+        return round(sum(w[key] for w in per_worker) / len(per_worker), 1)
+
+    return {
+        "mode": "shared (preload)" if preload else "per-worker copies",
+        "workers": len(per_worker),
+        "model_ready": model_ready,
+        "master": master,
+        "worker_avg": {"rss": _avg("rss"), "pss": _avg("pss"), "uss": _avg("uss")},
+        "total_pss": round(master["pss"] + sum(w["pss"] for w in per_worker), 1),
+    }
+
+
+def compare_modes(workers: int = 4, requests: int = 20) -> List[Dict]:
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("This benchmark reads /proc/<pid>/smaps_rollup and only runs on Linux")
+
+    results = [measure(False, workers, requests), measure(True, workers, requests)]
+
+    print(f"{'mode':<20} {'workers':>7} {'master RSS':>11} {'worker RSS':>11} "
+          f"{'worker PSS':>11} {'worker USS':>11} {'total PSS':>10}   (MB)")
+    for r in results:
+        w = r["worker_avg"]
+        print(f"{r['mode']:<20} {r['workers']:>7} {r['master']['rss']:>11} {w['rss']:>11} "
+              f"{w['pss']:>11} {w['uss']:>11} {r['total_pss']:>10}")
+    if not all(r["model_ready"] for r in results):
+        print("⚠️ The model did not load (MODEL_DIR missing?): numbers show the app without it")
+    else:
+        baseline, shared = results
+        if shared["total_pss"] >= baseline["total_pss"]:
+            print("⚠️ Preloading did not reduce the total memory")
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.bench_worker_memory",
+        description=__doc__.split("\n\n")[0].strip(),
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes (default: 4)")
+    parser.add_argument("--requests", type=int, default=20, help="Warm-up /api/predict requests (default: 20)")
+    parser.add_argument("--json", action="store_true", help="Also print the raw measurements as JSON")
+    args = parser.parse_args(argv)
+
+    results = compare_modes(args.workers, args.requests)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
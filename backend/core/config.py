@@ -10,20 +10,52 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: Optional[str] = Field(default=None, description="Database connection URL")
+    DB_READ_THROUGH_MINUTES: int = Field(default=60, description="Serve stored analyses younger than this (0 = always re-fetch)")
+    RAW_JSON_STORAGE: str = Field(default="table", description="Where raw YouTube payloads go: 'table' (compressed side table), 'disk' or 'off'")
+    RAW_JSON_DIR: str = Field(default="data/raw_json", description="Directory for compressed payload files when RAW_JSON_STORAGE=disk")
+    RAW_JSON_RETENTION_DAYS: int = Field(default=30, description="Prune raw payloads older than this (0 = keep forever)")
     
     # YouTube
     YOUTUBE_API_KEY: Optional[str] = Field(default=None, description="YouTube API key")
+    YOUTUBE_RATE_LIMIT: float = Field(default=0.0, description="YouTube API calls per second for this process, shared fairly by jobs (0 = unlimited, the default)")
+    YOUTUBE_RATE_BURST: float = Field(default=5.0, description="Calls that may go out back to back after an idle period")
+    YOUTUBE_CACHE_DIR: str = Field(default="", description="Directory for cached YouTube API pages (empty = no cache)")
+    YOUTUBE_CACHE_MAX_MB: float = Field(default=500.0, description="Size cap of the page cache; least recently used pages go first")
+    YOUTUBE_CACHE_TTL: int = Field(default=86400, description="Seconds a cached comment page is used without asking YouTube")
+    YOUTUBE_CACHE_META_TTL: int = Field(default=3600, description="Seconds cached video, channel and playlist pages are used as is")
     
     # Model
     MODEL_DIR: str = Field(default="artifacts/xlmr-sentiment-best-balanced", description="Model directory path")
     NEUTRAL_THRESHOLD: Optional[float] = Field(default=None, description="Custom neutral threshold")
+    MODEL_NAME: Optional[str] = Field(default=None, description="Model name stored with predictions (default: MODEL_DIR's folder name)")
     
     # API Settings
     DAILY_QUOTA_LIMIT: int = 100
+    QUOTA_PER_IP_LIMIT: int = Field(default=0, description="Daily units per client IP (0 = no per-IP limit)")
+    QUOTA_PER_SESSION_LIMIT: int = Field(default=0, description="Daily units per X-Session-ID (0 = no per-session limit)")
+    QUOTA_RECONCILE_SECONDS: int = Field(default=60, description="How often the in-memory quota ledger re-reads DB totals")
     MAX_COMMENTS_LIMIT: int = 1000
+    PRECISION_SAMPLE_ORDER: str = Field(default="mixed", description="Comment order sampled by target_margin analyses: mixed, relevance or time")
+    STREAM_MAX_COMMENTS_LIMIT: int = Field(default=0, description="Cap for bounded-memory streaming analyses above MAX_COMMENTS_LIMIT (0 = off)")
+    BATCH_MAX_VIDEOS: int = Field(default=20, description="Videos accepted per /api/analyze/batch request")
+    BATCH_FETCH_WORKERS: int = Field(default=4, description="Videos fetched from YouTube concurrently in a batch")
+    CHANNEL_MAX_VIDEOS: int = Field(default=50, description="Most recent uploads crawled per channel analysis")
     DEFAULT_MAX_COMMENTS: int = 300
     BATCH_SIZE: int = 32
     MAX_TEXT_LENGTH: int = 160
+    LONG_TEXT_MODE: str = Field(default="truncate", description="Comments over MAX_TEXT_LENGTH tokens: truncate or window (overlapping windows, pooled)")
+    WINDOW_OVERLAP: int = Field(default=32, description="Tokens shared by consecutive windows when LONG_TEXT_MODE=window")
+    CASCADE_MODEL_PATH: str = Field(default="", description="First-stage model for the cascade (empty = cascade off)")
+    CASCADE_CONFIDENCE_GATE: float = Field(default=0.9, description="First-stage confidence at or above which the transformer is skipped")
+    CASCADE_AUDIT_RATE: float = Field(default=0.02, description="Share of gated comments also scored by the transformer to measure agreement")
+    TOPIC_CLUSTERS: int = Field(default=0, description="Topic clusters per analysis from the model's comment embeddings (0 = off)")
+    DEDUP_MODE: str = Field(default="exact", description="Duplicate collapsing before inference: exact, near or off")
+    DEDUP_THRESHOLD: float = Field(default=0.8, description="Estimated Jaccard similarity at which comments count as near duplicates")
+
+    # Visualization
+    RENDER_WORKERS: int = Field(default=3, description="Chart render worker processes (0 = render in the request thread)")
+    KEYWORD_SKETCH_CAPACITY: int = Field(default=5000, description="Distinct words tracked per keyword sketch (bounds keyword memory)")
+    CHART_CACHE_SIZE: int = Field(default=256, description="Rendered pie/bar charts kept in memory, keyed by counts (0 = off)")
     
     @field_validator('NEUTRAL_THRESHOLD', mode='before')
     @classmethod
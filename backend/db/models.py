@@ -1,6 +1,6 @@
 # backend/db/models.py - FIXED VERSION (Compatible with All Python Versions)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, JSON, Float, Date
+from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, JSON, Float, Date, Index, LargeBinary
 from datetime import datetime, date, timezone
 from typing import Optional, List
 
@@ -41,8 +41,22 @@ class Comment(Base):
     video: Mapped["Video"] = relationship(back_populates="comments")
     predictions: Mapped[List["Prediction"]] = relationship(back_populates="comment", cascade="all, delete-orphan")
 
+class CommentRaw(Base):
+    """Compressed raw YouTube payload of a comment, kept out of the hot comments table."""
+    __tablename__ = "comment_raw"
+
+    comment_pk: Mapped[int] = mapped_column(ForeignKey("comments.id", ondelete="CASCADE"), primary_key=True)
+    codec: Mapped[str] = mapped_column(String(16))                         # 'zstd' | 'zlib'
+    payload: Mapped[bytes] = mapped_column(LargeBinary)
+    raw_size: Mapped[int] = mapped_column(Integer, default=0)              # uncompressed bytes
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
 class Prediction(Base):
     __tablename__ = "predictions"
+    # One prediction per comment and model — the ON CONFLICT target for bulk upserts
+    __table_args__ = (
+        Index("uq_predictions_comment_model", "comment_pk", "model_name", unique=True),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     comment_pk: Mapped[int] = mapped_column(ForeignKey("comments.id", ondelete="CASCADE"), index=True)
@@ -57,6 +71,84 @@ class Prediction(Base):
     # Relationships
     comment: Mapped["Comment"] = relationship(back_populates="predictions")
 
+class AnalysisRun(Base):
+    """One completed analysis of a video — what read-through serves results from."""
+    __tablename__ = "analysis_runs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    video_pk: Mapped[int] = mapped_column(ForeignKey("videos.id", ondelete="CASCADE"), index=True)
+    percentage: Mapped[float] = mapped_column(Float)
+    total_comments: Mapped[int] = mapped_column(Integer, default=0)
+    analyzed_count: Mapped[int] = mapped_column(Integer, default=0)
+    model_name: Mapped[str] = mapped_column(String(64))
+    summary: Mapped[Optional[dict]] = mapped_column(JSON)                  # keyword frequencies etc.
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+    # Relationships
+    video: Mapped["Video"] = relationship()
+
+class SentimentDaily(Base):
+    """
+    Rollup of predictions per video, model, comment day and label — kept up to
+    date incrementally as predictions are upserted, so trends never scan comments.
+    """
+    __tablename__ = "sentiment_daily"
+    __table_args__ = (
+        Index("uq_sentiment_daily_key", "video_pk", "model_name", "day", "label", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    video_pk: Mapped[int] = mapped_column(ForeignKey("videos.id", ondelete="CASCADE"))
+    model_name: Mapped[str] = mapped_column(String(64))
+    day: Mapped[date] = mapped_column(Date)                                 # comment publish date (UTC)
+    label: Mapped[str] = mapped_column(String(16))
+    comment_count: Mapped[int] = mapped_column(Integer, default=0)
+    positive_score_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    neutral_score_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    negative_score_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    confidence_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class Channel(Base):
+    """A YouTube channel analyzed as a whole; ``summary`` holds its latest aggregate."""
+    __tablename__ = "channels"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    channel_id: Mapped[str] = mapped_column(String(32), unique=True, index=True)
+    title: Mapped[Optional[str]] = mapped_column(String(256))
+    handle: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    uploads_playlist_id: Mapped[str] = mapped_column(String(64))
+    summary: Mapped[Optional[dict]] = mapped_column(JSON)                  # channel-wide counts / per-video rollup
+    last_crawled_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Relationships
+    videos: Mapped[List["ChannelVideo"]] = relationship(back_populates="channel", cascade="all, delete-orphan")
+
+class ChannelVideo(Base):
+    """Crawl state of one channel upload: the high-water mark for incremental fetches."""
+    __tablename__ = "channel_videos"
+    __table_args__ = (
+        Index("uq_channel_videos_channel_video", "channel_pk", "video_pk", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    channel_pk: Mapped[int] = mapped_column(ForeignKey("channels.id", ondelete="CASCADE"))
+    video_pk: Mapped[int] = mapped_column(ForeignKey("videos.id", ondelete="CASCADE"), index=True)
+    published_at: Mapped[Optional[str]] = mapped_column(String(64))        # video upload time
+    high_water_mark: Mapped[Optional[str]] = mapped_column(String(64))     # newest top-level comment seen
+    # A capped refresh leaves a gap below the newest comments it fetched: where
+    # to continue downward (fetch_comments_since's resume point), and the mark
+    # to take once the gap is closed
+    resume_point: Mapped[Optional[dict]] = mapped_column(JSON(none_as_null=True))
+    pending_mark: Mapped[Optional[str]] = mapped_column(String(64))
+    comments_seen: Mapped[int] = mapped_column(Integer, default=0)
+    last_crawled_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+    # Relationships
+    channel: Mapped["Channel"] = relationship(back_populates="videos")
+    video: Mapped["Video"] = relationship()
+
 class QuotaUsage(Base):
     __tablename__ = "quota_usage"
     
@@ -0,0 +1,212 @@
+# backend/db/raw_store.py - Compressed, out-of-line storage for raw YouTube payloads
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from backend.core.config import get_settings
+from backend.db.models import Comment, CommentRaw
+from backend.db.repository import BULK_BATCH_SIZE, chunked, insert_for
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+STORAGE_MODES = ("table", "disk", "off")
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+# YouTube comment ids are URL-safe base64 plus '.' for replies ("<parent>.<reply>")
+_COMMENT_ID_RE = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}$")
+
+
+# ─── Codecs ───────────────────────────────────────────────────────────────────
+# zstd from the standard library (Python 3.14+) or the zstandard package;
+# zlib otherwise. Each payload records its codec, so switching is safe.
+
+def _zstd_codec() -> Optional[Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    try:
+        from compression import zstd  # Python 3.14+
+        return (lambda b: zstd.compress(b, level=ZSTD_LEVEL)), zstd.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    # zstandard (de)compressor objects are not thread-safe; make one per call
+    return (
+        lambda b: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(b),
+        lambda b: zstandard.ZstdDecompressor().decompress(b),
+    )
+
+
+_CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": ((lambda b: zlib.compress(b, ZLIB_LEVEL)), zlib.decompress),
+}
+_zstd = _zstd_codec()
+if _zstd is not None:
+    _CODECS["zstd"] = _zstd
+DEFAULT_CODEC = "zstd" if "zstd" in _CODECS else "zlib"
+
+_FILE_EXT = {"zstd": ".json.zst", "zlib": ".json.zz"}
+
+
+def encode_payload(payload: Dict[str, Any]) -> Tuple[str, bytes, int]:
+    """Compact JSON, compressed with the best available codec: (codec, blob, raw_size)."""
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return DEFAULT_CODEC, _CODECS[DEFAULT_CODEC][0](raw), len(raw)
+
+
+def decode_payload(codec: str, blob: bytes) -> Dict[str, Any]:
+    if codec not in _CODECS:
+        raise RuntimeError(f"Payload is '{codec}'-compressed but no {codec} codec is installed")
+    return json.loads(_CODECS[codec][1](blob))
+
+
+# ─── Disk layout ──────────────────────────────────────────────────────────────
+# RAW_JSON_DIR/<first two hex chars>/<sha256 of comment_id>.json.zst
+# Comment ids are case-sensitive but the filesystems of Windows and macOS are
+# not, so ids never name files directly.
+
+def _file_name(comment_id: str) -> str:
+    return hashlib.sha256(comment_id.encode("utf-8")).hexdigest()
+
+
+def _disk_path(comment_id: str, codec: str) -> str:
+    name = _file_name(comment_id)
+    return os.path.join(settings.RAW_JSON_DIR, name[:2], name + _FILE_EXT[codec])
+
+
+def _write_file(path: str, blob: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+    os.replace(tmp, path)  # atomic: readers never see a partial file
+
+
+def _read_file(comment_id: str) -> Optional[Dict[str, Any]]:
+    for codec in _FILE_EXT:
+        path = _disk_path(comment_id, codec)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return decode_payload(codec, f.read())
+    return None
+
+
+# ─── Save / load / prune ──────────────────────────────────────────────────────
+
+def save_raw_payloads(
+    session: Session,
+    comment_pks: Dict[str, int],
+    payloads: Dict[str, Dict[str, Any]],
+    mode: Optional[str] = None,
+) -> int:
+    """
+    Store raw payloads ({comment_id: payload}) of comments that were persisted
+    (``comment_pks``) according to RAW_JSON_STORAGE. Returns payloads written.
+    """
+    mode = mode or settings.RAW_JSON_STORAGE
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"RAW_JSON_STORAGE must be one of {', '.join(STORAGE_MODES)}, got '{mode}'")
+    if mode == "off" or not payloads:
+        return 0
+
+    written = 0
+    raw_bytes = stored_bytes = 0
+    now = datetime.now(timezone.utc)
+    rows = []
+    for comment_id, payload in payloads.items():
+        pk = comment_pks.get(comment_id)
+        if pk is None or not payload:
+            continue
+        codec, blob, raw_size = encode_payload(payload)
+        raw_bytes += raw_size
+        stored_bytes += len(blob)
+        if mode == "disk":
+            if _COMMENT_ID_RE.match(comment_id):
+                _write_file(_disk_path(comment_id, codec), blob)
+                written += 1
+        else:
+            rows.append({
+                "comment_pk": pk, "codec": codec, "payload": blob,
+                "raw_size": raw_size, "created_at": now,
+            })
+
+    if rows:
+        insert = insert_for(session)
+        for chunk in chunked(rows, BULK_BATCH_SIZE):
+            stmt = insert(CommentRaw).values(list(chunk))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[CommentRaw.comment_pk],
+                set_={
+                    "codec": stmt.excluded.codec,
+                    "payload": stmt.excluded.payload,
+                    "raw_size": stmt.excluded.raw_size,
+                    "created_at": stmt.excluded.created_at,
+                },
+            )
+            session.execute(stmt)
+        written = len(rows)
+
+    if written:
+        logger.debug(
+            f"Stored {written:,} raw payloads ({mode}, {DEFAULT_CODEC}): "
+            f"{raw_bytes:,} → {stored_bytes:,} bytes"
+        )
+    return written
+
+
+def load_raw_payload(session: Session, comment_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Raw payload of one comment, looked up lazily: on-disk file, then the
+    comment_raw table, then the legacy inline comments.raw_json column.
+    """
+    if not _COMMENT_ID_RE.match(comment_id):
+        return None
+    payload = _read_file(comment_id)
+    if payload is not None:
+        return payload
+
+    row = session.execute(
+        select(CommentRaw.codec, CommentRaw.payload, Comment.raw_json)
+        .select_from(Comment)
+        .outerjoin(CommentRaw, CommentRaw.comment_pk == Comment.id)
+        .where(Comment.comment_id == comment_id)
+    ).first()
+    if row is None:
+        return None
+    if row.payload is not None:
+        return decode_payload(row.codec, row.payload)
+    return row.raw_json
+
+
+def prune_raw_payloads(session: Session, retention_days: int) -> int:
+    """Delete stored payloads (table rows and files) older than ``retention_days``."""
+    if retention_days <= 0:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    pruned = session.execute(delete(CommentRaw).where(CommentRaw.created_at < cutoff)).rowcount or 0
+
+    if os.path.isdir(settings.RAW_JSON_DIR):
+        cutoff_ts = time.time() - retention_days * 86400
+        for root, _dirs, files in os.walk(settings.RAW_JSON_DIR):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff_ts:
+                        os.remove(path)
+                        pruned += 1
+                except FileNotFoundError:
+                    pass
+    return pruned
@@ -0,0 +1,770 @@
+# backend/db/repository.py - Bulk persistence and read-through queries for analyses
+from __future__ import annotations
+
+import json
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.orm import Session
+
+from backend.db.models import (
+    AnalysisRun, Channel, ChannelVideo, Comment, Prediction, QuotaUsage, SentimentDaily, Video,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement. Postgres caps bind parameters at 65535 per
+# statement; comments carry 8 columns, so 1000 rows stays well below it.
+BULK_BATCH_SIZE = 1000
+
+
+def insert_for(session: Session):
+    """Dialect-specific insert() that supports ON CONFLICT (Postgres / SQLite)."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported on '{dialect}'")
+    return insert
+
+
+def _prediction_dict(pred: Prediction) -> Dict[str, Any]:
+    """A stored prediction in SentimentService.predict's output format."""
+    return {
+        "label": pred.label,
+        "confidence": pred.confidence,
+        "scores": {
+            "negative": pred.negative_score,
+            "neutral": pred.neutral_score,
+            "positive": pred.positive_score,
+        },
+    }
+
+
+def chunked(rows: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    """Consecutive slices of at most ``size`` rows (one bulk statement each)."""
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def upsert_video(session: Session, video_id: str, title: str, channel_title: str) -> int:
+    """Insert or refresh a video row and return its primary key."""
+    insert = insert_for(session)
+    stmt = insert(Video).values(
+        video_id=video_id,
+        source="youtube",
+        title=title,
+        channel_title=channel_title,
+        created_at=datetime.now(timezone.utc),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Video.video_id],
+        set_={
+            "title": stmt.excluded.title,
+            "channel_title": stmt.excluded.channel_title,
+            "updated_at": datetime.now(timezone.utc),
+        },
+    ).returning(Video.id)
+    return session.execute(stmt).scalar_one()
+
+
+def bulk_upsert_comments(session: Session, video_pk: int, analyzed: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Upsert analyzed comments keyed by their YouTube comment_id.
+    Returns {comment_id: comments.id} for every row written.
+    """
+    insert = insert_for(session)
+    now = datetime.now(timezone.utc)
+
+    # One row per comment_id: ON CONFLICT cannot touch the same row twice per statement
+    rows_by_id: Dict[str, Dict[str, Any]] = {}
+    for c in analyzed:
+        comment_id = c.get("comment_id")
+        if not comment_id:
+            continue
+        rows_by_id[comment_id] = {
+            "video_pk": video_pk,
+            "comment_id": comment_id,
+            "author": (c.get("author") or "")[:256],
+            "text": c.get("text", ""),
+            "like_count": c.get("like_count", 0),
+            "is_reply": c.get("is_reply", False),
+            "commented_at": c.get("published_at", ""),
+            "created_at": now,
+        }
+
+    skipped = len(analyzed) - len(rows_by_id)
+    if skipped:
+        logger.debug(f"Skipped {skipped} comments without a unique comment_id")
+
+    pks: Dict[str, int] = {}
+    for chunk in chunked(list(rows_by_id.values()), BULK_BATCH_SIZE):
+        stmt = insert(Comment).values(list(chunk))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Comment.comment_id],
+            set_={
+                "text": stmt.excluded.text,
+                "author": stmt.excluded.author,
+                "like_count": stmt.excluded.like_count,
+            },
+        ).returning(Comment.id, Comment.comment_id)
+        for pk, comment_id in session.execute(stmt):
+            pks[comment_id] = pk
+    return pks
+
+
+def upsert_prediction_rows(
+    session: Session,
+    rows: Sequence[Tuple[int, str, Dict[str, Any]]],
+) -> int:
+    """
+    Upsert (comment_pk, model_name, prediction) triples, one row per comment
+    and model, and apply the change to the sentiment_daily rollups.
+    Returns the number of rows written.
+
+    The DB writer, background re-scoring, channel crawls and other workers
+    write predictions concurrently. Each chunk locks its comment rows before
+    reading the predictions it replaces, so two writers never subtract the
+    same old row from the rollups.
+    """
+    insert = insert_for(session)
+    now = datetime.now(timezone.utc)
+
+    values_by_key: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    for pk, model_name, pred in rows:
+        scores = pred.get("scores", {})
+        values_by_key[(pk, model_name)] = {
+            "comment_pk": pk,
+            "model_name": model_name,
+            "label": pred.get("label", "neutral"),
+            "confidence": pred.get("confidence", 0.0),
+            "positive_score": scores.get("positive", 0.0),
+            "neutral_score": scores.get("neutral", 0.0),
+            "negative_score": scores.get("negative", 0.0),
+            "predicted_at": now,
+        }
+
+    # Ascending comment_pk: every writer takes the row locks in the same order
+    values: List[Dict[str, Any]] = [values_by_key[key] for key in sorted(values_by_key)]
+    for chunk in chunked(values, BULK_BATCH_SIZE):
+        deltas = _RollupDeltas()
+        _subtract_replaced_predictions(session, chunk, deltas)
+
+        stmt = insert(Prediction).values(list(chunk))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Prediction.comment_pk, Prediction.model_name],
+            set_={
+                "label": stmt.excluded.label,
+                "confidence": stmt.excluded.confidence,
+                "positive_score": stmt.excluded.positive_score,
+                "neutral_score": stmt.excluded.neutral_score,
+                "negative_score": stmt.excluded.negative_score,
+                "predicted_at": stmt.excluded.predicted_at,
+            },
+        )
+        session.execute(stmt)
+        apply_rollup_deltas(session, deltas)
+    return len(values)
+
+
+def bulk_upsert_predictions(
+    session: Session,
+    analyzed: Sequence[Dict[str, Any]],
+    comment_pks: Dict[str, int],
+) -> int:
+    """Upsert the prediction of every analyzed comment that has a stored row."""
+    rows = []
+    for c in analyzed:
+        pk = comment_pks.get(c.get("comment_id") or "")
+        if pk is not None:
+            rows.append((pk, c.get("model_name") or "xlmr-sentiment", c.get("prediction", {})))
+    return upsert_prediction_rows(session, rows)
+
+
+def load_stored_predictions(session: Session, comment_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Bulk-load stored comments by YouTube comment_id with every stored prediction.
+
+    Returns {comment_id: {"comment_pk", "text", "predictions": {model_name: prediction},
+    "predicted_at": {model_name: datetime}}} for the ids found.
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    for chunk in chunked(sorted(set(comment_ids)), BULK_BATCH_SIZE):
+        rows = session.execute(
+            select(Comment.id, Comment.comment_id, Comment.text, Prediction)
+            .outerjoin(Prediction, Prediction.comment_pk == Comment.id)
+            .where(Comment.comment_id.in_(list(chunk)))
+        )
+        for pk, comment_id, text, pred in rows:
+            entry = found.setdefault(
+                comment_id,
+                {"comment_pk": pk, "text": text, "predictions": {}, "predicted_at": {}},
+            )
+            if pred is not None:
+                entry["predictions"][pred.model_name] = _prediction_dict(pred)
+                entry["predicted_at"][pred.model_name] = pred.predicted_at
+    return found
+
+
+def bulk_save_comments(
+    session: Session,
+    result: Dict[str, Any],
+    analyzed: Sequence[Dict[str, Any]],
+    raw_payloads: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Tuple[int, int]:
+    """
+    Persist the video plus one batch of analyzed comments, their predictions
+    and raw API payloads ({comment_id: payload}) if given. Streaming analyses
+    call this once per chunk. Returns (video_pk, comments written).
+    """
+    video_pk = upsert_video(session, result["video_id"], result["video_title"], result["channel_title"])
+    comment_pks = bulk_upsert_comments(session, video_pk, analyzed)
+    bulk_upsert_predictions(session, analyzed, comment_pks)
+    if raw_payloads:
+        from backend.db.raw_store import save_raw_payloads  # imports this module
+        save_raw_payloads(session, comment_pks, raw_payloads)
+    return video_pk, len(comment_pks)
+
+
+def bulk_save_analysis(
+    session: Session,
+    result: Dict[str, Any],
+    analyzed: Sequence[Dict[str, Any]],
+    raw_payloads: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> int:
+    """
+    Persist a whole analysis — video, every analyzed comment and its prediction,
+    plus raw API payloads ({comment_id: payload}) if given — in a handful of
+    batched statements. Returns the number of comments written.
+    """
+    video_pk, saved = bulk_save_comments(session, result, analyzed, raw_payloads)
+    record_analysis_run(session, video_pk, result, analyzed)
+    return saved
+
+
+def record_analysis_run(
+    session: Session,
+    video_pk: int,
+    result: Dict[str, Any],
+    analyzed: Sequence[Dict[str, Any]] = (),
+    model_name: Optional[str] = None,
+) -> None:
+    """
+    Record a completed analysis so fresh results can be served from the DB.
+    The summary keeps what the analysis returned (counts, examples, timeline,
+    topics, keywords) plus the ids of ``analyzed``, so read-through serves the
+    run's own sample however many models scored it. The run's model is
+    ``model_name`` or, if not given, the one that scored most of ``analyzed``.
+    """
+    if model_name is None:
+        model_counts = Counter(c.get("model_name") or "xlmr-sentiment" for c in analyzed)
+        model_name = model_counts.most_common(1)[0][0] if model_counts else "xlmr-sentiment"
+    viz = result.get("visualizations") or {}
+    summary = {
+        "word_frequencies": (viz.get("chart_data") or {}).get("word_frequencies", {}),
+        "top_keywords_by_sentiment": viz.get("top_keywords_by_sentiment"),
+        "counts": result.get("counts"),
+        "examples": [{k: v for k, v in c.items() if k != "embedding"} for c in result.get("examples") or []],
+        "duplicates_collapsed": result.get("duplicates_collapsed", 0),
+        "timeline": result.get("timeline"),
+        "topics": result.get("topics"),
+        # Streamed runs pass no comments: their sample is too large to list here
+        "comment_ids": [c["comment_id"] for c in analyzed if c.get("comment_id")] or None,
+    }
+    session.add(AnalysisRun(
+        video_pk=video_pk,
+        percentage=result.get("percentage_analyzed", 0.0),
+        total_comments=result.get("total_comments", 0),
+        analyzed_count=result.get("actual_analyzed", 0),
+        model_name=model_name,
+        summary=json.loads(json.dumps(summary, default=float)),  # numpy scalars → JSON numbers
+    ))
+
+
+# ─── Daily sentiment rollups ──────────────────────────────────────────────────
+# sentiment_daily holds one row per (video, model, comment day, label) with the
+# comment count and score sums. Every prediction upsert adds its new values and
+# subtracts the ones it replaces, so the table always matches the predictions
+# without ever re-aggregating them.
+#
+# One analysis serves predictions from several models (reused older ones, the
+# cascade's first stage, the rule-based fallback), so a per-model rollup only
+# ever covers part of a video. The SERVED_ROLLUP rows count every comment once,
+# with its newest prediction (the one the last analysis served and saved),
+# whichever model made it; trends and channel summaries read those.
+
+SERVED_ROLLUP = "served"
+_ROLLUP_SUMS = ("positive_score_sum", "neutral_score_sum", "negative_score_sum", "confidence_sum")
+
+
+def _comment_day(commented_at: Optional[str]) -> Optional[date]:
+    """Calendar day of a YouTube publishedAt timestamp ("2024-05-01T10:00:00Z")."""
+    try:
+        return date.fromisoformat((commented_at or "")[:10])
+    except ValueError:
+        return None
+
+
+class _RollupDeltas:
+    """Accumulates signed changes per rollup key before they are written in bulk."""
+
+    def __init__(self):
+        # (video_pk, model_name, day, label) -> [count, positive, neutral, negative, confidence]
+        self._rows: Dict[Tuple[int, str, date, str], List[float]] = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0.0])
+
+    def add(
+        self,
+        video_pk: int,
+        commented_at: Optional[str],
+        values: Dict[str, Any],
+        sign: int = 1,
+        model_name: Optional[str] = None,
+    ) -> None:
+        day = _comment_day(commented_at)
+        if day is None:
+            return
+        row = self._rows[(video_pk, model_name or values["model_name"], day, values["label"])]
+        row[0] += sign
+        row[1] += sign * values["positive_score"]
+        row[2] += sign * values["neutral_score"]
+        row[3] += sign * values["negative_score"]
+        row[4] += sign * values["confidence"]
+
+    def values(self) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        return [
+            {
+                "video_pk": video_pk,
+                "model_name": model_name,
+                "day": day,
+                "label": label,
+                "comment_count": int(d[0]),
+                **dict(zip(_ROLLUP_SUMS, d[1:])),
+                "updated_at": now,
+            }
+            for (video_pk, model_name, day, label), d in self._rows.items()
+            if d[0] or any(d[1:])  # unchanged predictions net out to zero
+        ]
+
+
+def _subtract_replaced_predictions(
+    session: Session,
+    chunk: Sequence[Dict[str, Any]],
+    deltas: _RollupDeltas,
+) -> None:
+    """
+    Record -old/+new rollup deltas for a chunk of prediction rows about to be
+    upserted: per model, and for the served rollup, where the new row replaces
+    the comment's newest prediction so far.
+    """
+    pks = list({v["comment_pk"] for v in chunk})
+    # SELECT … FOR UPDATE (Postgres; SQLite ignores it): held until commit, so
+    # the predictions read below stay the ones this chunk replaces
+    comments = {
+        pk: (video_pk, commented_at)
+        for pk, video_pk, commented_at in session.execute(
+            select(Comment.id, Comment.video_pk, Comment.commented_at)
+            .where(Comment.id.in_(pks))
+            .order_by(Comment.id)
+            .with_for_update()
+        )
+    }
+    keys = {(v["comment_pk"], v["model_name"]) for v in chunk}
+    old = session.execute(
+        select(
+            Prediction.comment_pk, Prediction.model_name, Prediction.label, Prediction.confidence,
+            Prediction.positive_score, Prediction.neutral_score, Prediction.negative_score,
+        )
+        .where(Prediction.comment_pk.in_(pks))
+        .order_by(Prediction.comment_pk, Prediction.predicted_at.desc(), Prediction.id.desc())
+    )
+    served: Dict[int, Dict[str, Any]] = {}
+    for row in old:
+        if row.comment_pk not in comments:
+            continue
+        if row.comment_pk not in served:
+            served[row.comment_pk] = row._asdict()
+        if (row.comment_pk, row.model_name) in keys:
+            deltas.add(*comments[row.comment_pk], row._asdict(), sign=-1)
+    for v in chunk:
+        pk = v["comment_pk"]
+        if pk not in comments:
+            continue
+        deltas.add(*comments[pk], v)
+        # Written now, so it becomes the comment's newest prediction
+        if pk in served:
+            deltas.add(*comments[pk], served[pk], sign=-1, model_name=SERVED_ROLLUP)
+        deltas.add(*comments[pk], v, model_name=SERVED_ROLLUP)
+        served[pk] = v
+
+
+def apply_rollup_deltas(session: Session, deltas: _RollupDeltas) -> int:
+    """Add accumulated deltas onto sentiment_daily with ON CONFLICT increments."""
+    insert = insert_for(session)
+    values = deltas.values()
+    for chunk in chunked(values, BULK_BATCH_SIZE):
+        stmt = insert(SentimentDaily).values(list(chunk))
+        increments = {
+            col: getattr(SentimentDaily, col) + getattr(stmt.excluded, col)
+            for col in ("comment_count",) + _ROLLUP_SUMS
+        }
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                SentimentDaily.video_pk, SentimentDaily.model_name,
+                SentimentDaily.day, SentimentDaily.label,
+            ],
+            set_={**increments, "updated_at": stmt.excluded.updated_at},
+        )
+        session.execute(stmt)
+    return len(values)
+
+
+def rebuild_sentiment_daily(session: Session, video_pk: Optional[int] = None) -> int:
+    """
+    Recompute rollups from the predictions table (backfill or repair), for one
+    video or all of them. Streams rows, so memory stays bounded by the rollup size.
+    """
+    stmt = delete(SentimentDaily)
+    query = (
+        select(
+            Comment.id, Comment.video_pk, Comment.commented_at, Prediction.model_name, Prediction.label,
+            Prediction.confidence, Prediction.positive_score, Prediction.neutral_score,
+            Prediction.negative_score,
+        )
+        .join(Comment, Prediction.comment_pk == Comment.id)
+        .order_by(Comment.id, Prediction.predicted_at.desc(), Prediction.id.desc())
+    )
+    if video_pk is not None:
+        stmt = stmt.where(SentimentDaily.video_pk == video_pk)
+        query = query.where(Comment.video_pk == video_pk)
+    session.execute(stmt)
+
+    deltas = _RollupDeltas()
+    last_comment = None
+    for row in session.execute(query.execution_options(yield_per=BULK_BATCH_SIZE)):
+        deltas.add(row.video_pk, row.commented_at, row._asdict())
+        if row.id != last_comment:  # newest prediction of the comment comes first
+            deltas.add(row.video_pk, row.commented_at, row._asdict(), model_name=SERVED_ROLLUP)
+            last_comment = row.id
+    written = apply_rollup_deltas(session, deltas)
+    logger.info(f"Rebuilt {written:,} daily sentiment rollup rows")
+    return written
+
+
+def daily_sentiment_series(
+    session: Session,
+    video_id: str,
+    model_name: Optional[str] = None,
+    since: Optional[date] = None,
+) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    Per-day sentiment of a video straight from the rollups — O(days x labels).
+    Without ``model_name`` every stored comment counts once, with its served
+    prediction (SERVED_ROLLUP), whichever model made it.
+    Returns (model_name, [{date, total, counts, ratios, mean_scores, mean_confidence}]);
+    model_name is None when nothing is stored.
+    """
+    video_pk = session.execute(select(Video.id).where(Video.video_id == video_id)).scalar_one_or_none()
+    if video_pk is None:
+        return None, []
+
+    served = model_name is None
+    model_name = model_name or SERVED_ROLLUP
+
+    query = (
+        select(SentimentDaily)
+        .where(SentimentDaily.video_pk == video_pk, SentimentDaily.model_name == model_name)
+        .order_by(SentimentDaily.day)
+    )
+    if since is not None:
+        query = query.where(SentimentDaily.day >= since)
+
+    days: Dict[date, Dict[str, Any]] = {}
+    for r in session.execute(query).scalars():
+        if r.comment_count <= 0:
+            continue
+        d = days.setdefault(r.day, {"counts": Counter(), "sums": Counter(), "confidence": Counter()})
+        d["counts"][r.label] += r.comment_count
+        d["sums"].update({
+            "positive": r.positive_score_sum,
+            "neutral": r.neutral_score_sum,
+            "negative": r.negative_score_sum,
+        })
+        d["confidence"][r.label] += r.confidence_sum
+    if served and not days:
+        return None, []
+
+    series = []
+    labels = ("positive", "neutral", "negative")
+    for day, d in days.items():
+        total = sum(d["counts"].values())
+        series.append({
+            "date": day.isoformat(),
+            "total": total,
+            "counts": {k: d["counts"][k] for k in labels},
+            "ratios": {k: d["counts"][k] / total for k in labels},
+            "mean_scores": {k: d["sums"][k] / total for k in labels},
+            "mean_confidence": {
+                k: (d["confidence"][k] / d["counts"][k]) if d["counts"][k] else None for k in labels
+            },
+        })
+    return model_name, series
+
+
+# ─── Read-through queries ─────────────────────────────────────────────────────
+
+def find_fresh_run(
+    session: Session,
+    video_id: str,
+    percentage: float,
+    max_age: timedelta,
+) -> Optional[AnalysisRun]:
+    """Latest run of the video covering at least ``percentage`` within ``max_age``."""
+    cutoff = datetime.now(timezone.utc) - max_age
+    return session.execute(
+        select(AnalysisRun)
+        .join(Video, AnalysisRun.video_pk == Video.id)
+        .where(
+            Video.video_id == video_id,
+            AnalysisRun.percentage >= percentage,
+            AnalysisRun.created_at >= cutoff,
+        )
+        .order_by(AnalysisRun.created_at.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+
+def _stored_entry(comment: Comment, pred: Prediction) -> Dict[str, Any]:
+    """Rebuild an analyzed-comment dict (as produced by _run_analysis) from rows."""
+    return {
+        "comment_id": comment.comment_id,
+        "text": comment.text,
+        "author": comment.author or "",
+        "published_at": comment.commented_at or "",
+        "like_count": comment.like_count,
+        "is_reply": comment.is_reply,
+        "prediction": _prediction_dict(pred),
+        "model_name": pred.model_name,
+    }
+
+
+def stored_analyzed(
+    session: Session,
+    video_pk: int,
+    model_names: Sequence[str] = (),
+    comment_ids: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Stored comments of a video with one prediction each (used for CSV export):
+    the first of ``model_names`` that scored the comment, else its newest
+    prediction (as _score_comments picks reused ones). ``comment_ids`` limits
+    the export to one run's sample; None = every stored comment of the video.
+    """
+    base = (
+        select(Comment, Prediction)
+        .join(Prediction, Prediction.comment_pk == Comment.id)
+        .where(Comment.video_pk == video_pk)
+        .order_by(Comment.id, Prediction.predicted_at.desc())
+    )
+    if comment_ids is None:
+        rows = list(session.execute(base))
+    else:
+        rows = []
+        for chunk in chunked(sorted(set(comment_ids)), BULK_BATCH_SIZE):
+            rows.extend(session.execute(base.where(Comment.comment_id.in_(chunk))))
+        rows.sort(key=lambda row: row[0].id)  # stable: newest prediction stays first per comment
+
+    rank = {name: i for i, name in enumerate(model_names)}
+    best: Dict[int, Tuple[Comment, Prediction]] = {}
+    for comment, pred in rows:
+        current = best.get(comment.id)
+        if current is None or rank.get(pred.model_name, len(rank)) < rank.get(current[1].model_name, len(rank)):
+            best[comment.id] = (comment, pred)
+    return [_stored_entry(c, p) for c, p in best.values()]
+
+
+# ─── Channels ─────────────────────────────────────────────────────────────────
+
+def upsert_channel(session: Session, channel: Dict[str, Any]) -> int:
+    """Insert or refresh a channel (as returned by resolve_channel) and return its pk."""
+    insert = insert_for(session)
+    stmt = insert(Channel).values(
+        channel_id=channel["channel_id"],
+        title=channel.get("title"),
+        handle=channel.get("handle"),
+        uploads_playlist_id=channel["uploads_playlist_id"],
+        created_at=datetime.now(timezone.utc),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Channel.channel_id],
+        set_={
+            "title": stmt.excluded.title,
+            "handle": stmt.excluded.handle,
+            "uploads_playlist_id": stmt.excluded.uploads_playlist_id,
+        },
+    ).returning(Channel.id)
+    return session.execute(stmt).scalar_one()
+
+
+def channel_crawl_states(session: Session, channel_pk: int) -> Dict[str, Dict[str, Any]]:
+    """
+    {video_id: {"mark": newest top-level comment publishedAt already stored,
+    "seen_at_mark": ids of the stored top-level comments published at that
+    same second, "resume": where a capped refresh stopped, or None}} for a channel.
+    """
+    rows = session.execute(
+        select(Video.video_id, ChannelVideo.high_water_mark, ChannelVideo.resume_point, Comment.comment_id)
+        .join(Video, ChannelVideo.video_pk == Video.id)
+        .outerjoin(Comment, and_(
+            Comment.video_pk == ChannelVideo.video_pk,
+            Comment.commented_at == ChannelVideo.high_water_mark,
+            Comment.is_reply.is_(False),
+        ))
+        .where(ChannelVideo.channel_pk == channel_pk)
+    )
+    states: Dict[str, Dict[str, Any]] = {}
+    for video_id, mark, resume, comment_id in rows:
+        state = states.setdefault(video_id, {"mark": mark, "seen_at_mark": set(), "resume": resume})
+        if comment_id:
+            state["seen_at_mark"].add(comment_id)
+    return states
+
+
+def save_channel_video_crawl(
+    session: Session,
+    channel_pk: int,
+    video: Dict[str, Any],
+    analyzed: Sequence[Dict[str, Any]],
+    raw_payloads: Optional[Dict[str, Dict[str, Any]]] = None,
+    resume: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Persist one upload's newly fetched comments and its crawl state in the
+    same transaction, so a failed save is simply re-fetched. A capped fetch
+    (``resume`` set) keeps the high-water mark, stores where to continue and
+    remembers the newest comment above the gap as the pending mark; the
+    refresh that closes the gap (``resume`` None) moves the mark up to it.
+    """
+    video_pk = upsert_video(session, video["video_id"], video.get("title"), video.get("channel_title"))
+    comment_pks = bulk_upsert_comments(session, video_pk, analyzed)
+    bulk_upsert_predictions(session, analyzed, comment_pks)
+    if raw_payloads:
+        from backend.db.raw_store import save_raw_payloads  # imports this module
+        save_raw_payloads(session, comment_pks, raw_payloads)
+
+    newest = max((c.get("published_at") or "" for c in analyzed if not c.get("is_reply")), default="")
+    state = session.execute(
+        select(ChannelVideo).where(ChannelVideo.channel_pk == channel_pk, ChannelVideo.video_pk == video_pk)
+    ).scalar_one_or_none()
+    if state is None:
+        state = ChannelVideo(channel_pk=channel_pk, video_pk=video_pk, comments_seen=0)
+        session.add(state)
+    state.published_at = video.get("published_at")
+    reached = max(state.pending_mark or "", newest)
+    if resume is None:
+        state.high_water_mark = max(state.high_water_mark or "", reached) or None
+        state.pending_mark = None
+    else:
+        state.pending_mark = reached or None
+    state.resume_point = resume
+    state.comments_seen = (state.comments_seen or 0) + len(comment_pks)
+    state.last_crawled_at = datetime.now(timezone.utc)
+    session.flush()  # sessions don't autoflush; the channel rollup queries these rows
+
+
+def refresh_channel_summary(session: Session, channel_pk: int) -> Dict[str, Any]:
+    """
+    Recompute a channel's aggregate from the served sentiment_daily rollups
+    of its uploads (O(videos x days), no comment scans) and store it on the
+    channel. Every stored comment counts once, whichever model scored it.
+    """
+    rows = session.execute(
+        select(
+            Video.video_id, Video.title, ChannelVideo.published_at, ChannelVideo.last_crawled_at,
+            ChannelVideo.resume_point.is_(None).label("caught_up"),
+            SentimentDaily.label, func.sum(SentimentDaily.comment_count),
+        )
+        .select_from(ChannelVideo)
+        .join(Video, ChannelVideo.video_pk == Video.id)
+        .outerjoin(SentimentDaily, and_(
+            SentimentDaily.video_pk == Video.id, SentimentDaily.model_name == SERVED_ROLLUP,
+        ))
+        .where(ChannelVideo.channel_pk == channel_pk)
+        .group_by(
+            Video.video_id, Video.title, ChannelVideo.published_at, ChannelVideo.last_crawled_at,
+            ChannelVideo.resume_point.is_(None), SentimentDaily.label,
+        )
+    )
+    per_video: Dict[str, Dict[str, Any]] = {}
+    for video_id, title, published_at, crawled_at, caught_up, label, n in rows:
+        v = per_video.setdefault(video_id, {
+            "video_id": video_id,
+            "title": title,
+            "published_at": published_at,
+            "last_crawled_at": crawled_at.isoformat() if crawled_at else None,
+            "caught_up": bool(caught_up),  # False: a gap below the newest comments is still being fetched
+            "_counts": Counter(),
+        })
+        if label is not None:
+            v["_counts"][label] += int(n or 0)
+
+    labels = ("positive", "neutral", "negative")
+    totals: Counter = Counter({k: 0 for k in labels})
+    videos = []
+    for v in per_video.values():
+        counts = v.pop("_counts")
+        total = sum(counts.values())
+        v.update({
+            "total": total,
+            "counts": {k: counts[k] for k in labels},
+            "ratios": {k: (counts[k] / total if total else 0.0) for k in labels},
+        })
+        totals.update(v["counts"])
+        videos.append(v)
+    videos.sort(key=lambda v: v["published_at"] or "", reverse=True)
+
+    grand_total = sum(totals.values())
+    summary = {
+        "videos_tracked": len(videos),
+        "total": grand_total,
+        "counts": dict(totals),
+        "ratios": {k: (totals[k] / grand_total if grand_total else 0.0) for k in labels},
+        "videos": videos,
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+    }
+    channel = session.get(Channel, channel_pk)
+    channel.summary = summary
+    channel.last_crawled_at = datetime.now(timezone.utc)
+    return summary
+
+
+def find_channel(session: Session, kind: str, value: str) -> Optional[Channel]:
+    """Stored channel by ("id", "UC…") or ("handle", "@name")."""
+    column = Channel.channel_id if kind == "id" else Channel.handle
+    return session.execute(select(Channel).where(func.lower(column) == value.lower())).scalar_one_or_none()
+
+
+# ─── Quota ────────────────────────────────────────────────────────────────────
+
+def quota_totals(session: Session, day: date) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+    """Units used on ``day``: (total, per user_ip, per session_id)."""
+    used_today = QuotaUsage.date == day
+    total = session.execute(
+        select(func.coalesce(func.sum(QuotaUsage.units_used), 0)).where(used_today)
+    ).scalar_one()
+    by_ip = dict(session.execute(
+        select(QuotaUsage.user_ip, func.sum(QuotaUsage.units_used))
+        .where(used_today, QuotaUsage.user_ip.is_not(None))
+        .group_by(QuotaUsage.user_ip)
+    ).all())
+    by_session = dict(session.execute(
+        select(QuotaUsage.session_id, func.sum(QuotaUsage.units_used))
+        .where(used_today, QuotaUsage.session_id.is_not(None))
+        .group_by(QuotaUsage.session_id)
+    ).all())
+    return int(total), by_ip, by_session
@@ -6,23 +6,51 @@ import csv
 import io
 import json
 import logging
+import os
 import re
+import threading
 import time
-from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Dict, List, Optional
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 import matplotlib
 matplotlib.use("Agg")
+import numpy as np
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from backend.core.config import get_settings
-from backend.api.ingest_youtube import extract_video_id, fetch_youtube_comments, fetch_video_info
+from backend.api.ingest_youtube import (
+    extract_channel_ref,
+    extract_video_id,
+    fetch_comments_since,
+    fetch_video_info,
+    fetch_youtube_comments,
+    iter_youtube_comments,
+    list_channel_uploads,
+    resolve_channel,
+)
+from backend.api.http_cache import youtube_cache
+from backend.api.rate_limit import BudgetExceeded, YouTubeJob, youtube_budget, youtube_job, youtube_metrics
+from backend.services.dedup import find_duplicates
+from backend.services.lexicon import RULE_BASED_MODEL as _RULE_BASED_MODEL
+from backend.services.lexicon import rule_based_sentiment as _rule_based_sentiment
+from backend.services.precision import has_converged, precision_report
+from backend.services.quota import quota_ledger
+from backend.services.streaming import CSV_HEADER, StreamingAggregator, csv_row
 from backend.services.sentiment import SentimentService
-from backend.services.visualization import VisualizationService
+from backend.services.visualization import (
+    CHART_ARTIFACTS,
+    VIZ_ARTIFACTS,
+    VisualizationService,
+    shutdown_render_pool,
+)
 
 # ─── Logging ─────────────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -40,6 +68,23 @@ _model_loading = False
 _model_ready = False
 _last_analysis_cache: Dict[str, Any] = {}
 
+# Chart-ready data of recent analyses, keyed by "<video_id>:<percentage>".
+# PNGs are rendered on first request and memoized alongside the data.
+_CHART_STORE_SIZE = 32
+_chart_store: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_chart_store_lock = threading.Lock()
+
+# Persistence runs off the request path on a single writer thread
+_db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+# Comments per fetch → score → aggregate → persist step of a streaming analysis
+_STREAM_CHUNK_SIZE = 1000
+# Target-precision analyses check their intervals after every chunk of this
+# size, and never stop before _PRECISION_MIN_SAMPLE comments
+_PRECISION_CHUNK_SIZE = 200
+_PRECISION_MIN_SAMPLE = 400
+_CSV_READ_BLOCK = 64 * 1024
+
 
 def _try_load_model() -> bool:
     """Attempt to load the XLM-RoBERTa model. Returns True on success."""
@@ -73,15 +118,26 @@ async def lifespan(app: FastAPI):
     loop = asyncio.get_event_loop()
     await loop.run_in_executor(None, _try_load_model)
 
-    # Initialize DB tables if DB is available
+    # Initialize DB tables if DB is available, then seed the quota ledger
+    background: List[asyncio.Task] = []
     try:
-        from backend.db.session import init_db
-        init_db()
+        from backend.db.session import init_db, run_db
+        await run_db(init_db)
         logger.info("✅ Database tables initialized")
+        await run_db(_reconcile_quota_ledger)
+        background.append(asyncio.create_task(_quota_reconcile_loop()))
+        if settings.RAW_JSON_RETENTION_DAYS > 0:
+            background.append(asyncio.create_task(_raw_payload_retention_loop()))
     except Exception as e:
-        logger.warning(f"⚠️ Database not available (quota tracking disabled): {e}")
+        logger.warning(f"⚠️ Database not available (quota tracked in memory only): {e}")
 
     yield
+    for task in background:
+        task.cancel()
+    shutdown_render_pool()
+    _rescore_executor.shutdown(wait=False, cancel_futures=True)
+    _db_writer.shutdown(wait=True)
+    _cache_last_analysis("", 0.0)  # removes a spilled CSV export
     logger.info("Social Sentiment API shutting down.")
 
 
@@ -117,6 +173,14 @@ class PredictResponse(BaseModel):
     results: List[PredictResult]
 
 
+class BatchAnalyzeRequest(BaseModel):
+    videos: List[str] = Field(..., min_length=1, description="Video IDs or URLs")
+    percentage: float = Field(0.5, ge=0.25, le=1.0)
+    include: Optional[str] = None
+    save_to_db: bool = True
+    refresh: bool = False
+
+
 class AnalyzeOut(BaseModel):
     video_id: str
     video_title: str
@@ -129,75 +193,400 @@ class AnalyzeOut(BaseModel):
     examples: List[Dict[str, Any]]
     processing_time: float
     visualizations: Optional[Dict[str, Any]] = None
+    timeline: Optional[Dict[str, Any]] = None  # per-bucket counts / mean scores, chart-ready
+    precision: Optional[Dict[str, Any]] = None  # ratio confidence intervals (target_margin runs)
+    duplicates_collapsed: int = 0  # comments that reused a duplicate's prediction
+    topics: Optional[Dict[str, Any]] = None  # topic clusters (TOPIC_CLUSTERS > 0)
+    data_source: str = "youtube"  # "database" when served by read-through
+    quota_units: int = 0  # YouTube units this request spent (0 for read-through and per-video batch results)
+
+
+class BatchAnalyzeOut(BaseModel):
+    videos: List[AnalyzeOut]
+    errors: List[Dict[str, str]]
+    aggregate: Dict[str, Any]
+    processing_time: float
+    quota_units: int = 0
 
 
-# ─── Fallback sentiment (rule-based) ─────────────────────────────────────────
-_POS_WORDS = {
-    "good", "great", "amazing", "awesome", "love", "excellent", "wonderful",
-    "fantastic", "perfect", "best", "helpful", "thanks", "thank", "brilliant",
-    "outstanding", "nice", "beautiful", "cool", "incredible", "superb",
-    "bagus", "keren", "mantap", "suka", "luar biasa", "terima kasih", "makasih",
-    "menarik", "kece", "top", "jos", "gilak", "gila", "dewa", "sempurna",
-    "membantu", "bermanfaat", "informatif", "edukatif",
-}
-_NEG_WORDS = {
-    "bad", "terrible", "awful", "hate", "worst", "horrible", "disgusting",
-    "stupid", "boring", "sucks", "waste", "disappointed", "useless", "trash",
-    "pathetic", "annoying", "frustrating",
-    "buruk", "jelek", "payah", "benci", "membosankan", "sampah", "lebay",
-    "norak", "kampungan", "tidak berguna", "buang waktu", "kecewa", "zonk",
-}
-
-
-def _rule_based_sentiment(text: str) -> Dict[str, Any]:
-    tl = text.lower()
-    pos = sum(1 for w in _POS_WORDS if w in tl)
-    neg = sum(1 for w in _NEG_WORDS if w in tl)
-    if pos > neg:
-        label, conf = "positive", min(0.95, 0.60 + (pos - neg) * 0.1)
-    elif neg > pos:
-        label, conf = "negative", min(0.95, 0.60 + (neg - pos) * 0.1)
-    else:
-        label, conf = "neutral", 0.65
-    return {
-        "label": label,
-        "confidence": conf,
-        "scores": {
-            "positive": conf if label == "positive" else 0.25,
-            "neutral": conf if label == "neutral" else 0.35,
-            "negative": conf if label == "negative" else 0.25,
-        },
-    }
+# ─── Lazy visualization helpers ───────────────────────────────────────────────
+def _parse_include(include: Optional[str]) -> Optional[Set[str]]:
+    """Parse the include= query value. None / "all" → everything, "none" → nothing."""
+    if include is None or include.strip().lower() in ("", "all"):
+        return None
+    if include.strip().lower() == "none":
+        return set()
+
+    selected = {part.strip().lower() for part in include.split(",") if part.strip()}
+    unknown = selected - set(VIZ_ARTIFACTS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include value(s): {', '.join(sorted(unknown))}. "
+                   f"Allowed: {', '.join(VIZ_ARTIFACTS)}, all, none",
+        )
+    return selected
 
 
-# ─── Core analysis logic ──────────────────────────────────────────────────────
-def _run_analysis(
+def _chart_key(video_id: str, percentage: float) -> str:
+    return f"{video_id}:{percentage}"
+
+
+def _remember_chart_data(video_id: str, percentage: float, viz: Dict[str, Any]) -> None:
+    """Keep chart-ready data (and any charts already rendered) for on-demand rendering."""
+    rendered = {
+        chart: viz.get(f"{chart}_base64")
+        for chart in CHART_ARTIFACTS
+        if viz.get(f"{chart}_base64")
+    }
+    key = _chart_key(video_id, percentage)
+    with _chart_store_lock:
+        _chart_store[key] = {"data": viz.get("chart_data", {}), "rendered": rendered}
+        _chart_store.move_to_end(key)
+        while len(_chart_store) > _CHART_STORE_SIZE:
+            _chart_store.popitem(last=False)
+
+
+def _render_stored_chart(video_id: str, percentage: float, chart: str) -> Optional[str]:
+    """Render a chart from stored chart data, memoizing the PNG. Raises KeyError if not analyzed."""
+    key = _chart_key(video_id, percentage)
+    with _chart_store_lock:
+        entry = _chart_store[key]
+        _chart_store.move_to_end(key)
+        cached = entry["rendered"].get(chart)
+    if cached:
+        return cached
+
+    image = _viz_service.render_chart(chart, entry["data"])
+    if image:
+        with _chart_store_lock:
+            entry["rendered"][chart] = image
+    return image
+
+
+# ─── Read-through from the database ───────────────────────────────────────────
+def _read_through(
     video_id: str,
     percentage: float,
-    progress_cb=None,
-) -> Dict[str, Any]:
+    include: Optional[Set[str]] = None,
+) -> Optional[Dict[str, Any]]:
     """
-    Full pipeline: fetch → predict → visualize.
-    progress_cb(step: str, pct: int) is called at each stage.
+    Build an analysis result from the stored run when the video was analyzed
+    (at this percentage or more) within DB_READ_THROUGH_MINUTES. Counts,
+    examples, timeline, topics and keywords come from the run's summary, so
+    they match what that analysis returned. Returns None on a miss, for runs
+    recorded without those results, or when the DB is unavailable.
     """
+    if settings.DB_READ_THROUGH_MINUTES <= 0:
+        return None
+
     start = time.time()
+    try:
+        from backend.db.session import get_session
+        from backend.db.repository import find_fresh_run
+
+        with get_session() as db:
+            run = find_fresh_run(
+                db, video_id, percentage, timedelta(minutes=settings.DB_READ_THROUGH_MINUTES)
+            )
+            if run is None:
+                return None
+            video_title = run.video.title or "Unknown Video"
+            channel_title = run.video.channel_title or "Unknown Channel"
+            total_comments = run.total_comments
+            run_percentage = run.percentage
+            summary = dict(run.summary or {})
+            analyzed_at = run.created_at
+
+    except Exception as e:
+        logger.warning(f"Read-through skipped because database is not available: {e}")
+        return None
+
+    counts = summary.get("counts")
+    total_analyzed = sum(counts.values()) if counts else 0
+    if total_analyzed == 0:
+        return None  # recorded before runs kept their results
+
+    viz = _viz_service.generate_all(
+        [], counts, include, frequencies=Counter(summary.get("word_frequencies") or {})
+    )
+    viz["top_keywords_by_sentiment"] = summary.get("top_keywords_by_sentiment") or {}
+    _remember_chart_data(video_id, percentage, viz)
+
+    logger.info(f"🗄️ Read-through HIT for {video_id} (analyzed {analyzed_at:%Y-%m-%d %H:%M})")
+    return {
+        "video_id": video_id,
+        "video_title": video_title,
+        "channel_title": channel_title,
+        "total_comments": total_comments,
+        "actual_analyzed": total_analyzed,
+        "percentage_analyzed": run_percentage,
+        "counts": counts,
+        "ratios": {k: v / total_analyzed for k, v in counts.items()},
+        "examples": summary.get("examples") or [],
+        "duplicates_collapsed": summary.get("duplicates_collapsed", 0),
+        "topics": summary.get("topics"),
+        "processing_time": round(time.time() - start, 2),
+        "visualizations": viz,
+        "timeline": summary.get("timeline"),
+        "data_source": "database",
+    }
+
+
+def _load_stored_comments(video_id: str, percentage: float) -> List[Dict[str, Any]]:
+    """
+    Stored comments + predictions behind a read-through result (for CSV
+    export): the run's own sample, each comment with the prediction the
+    current model(s) would reuse. Streamed runs do not list their sample, so
+    they export every stored comment of the video.
+    """
+    from backend.db.session import get_session
+    from backend.db.repository import find_fresh_run, stored_analyzed
+
+    try:
+        model_names = SentimentService.get().model_names()
+    except Exception:
+        model_names = []
+    with get_session() as db:
+        run = find_fresh_run(
+            db, video_id, percentage, timedelta(minutes=settings.DB_READ_THROUGH_MINUTES)
+        )
+        if run is None:
+            return []
+        comment_ids = (run.summary or {}).get("comment_ids")
+        return stored_analyzed(db, run.video_pk, [run.model_name, *model_names], comment_ids)
+
+
+# ─── Prediction reuse ─────────────────────────────────────────────────────────
+# Background re-scoring of comments whose only stored prediction comes from an
+# older model. Kept apart from the DB writer so long inference never delays saves.
+_rescore_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rescore")
+
+
+def _load_stored_predictions(comment_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Stored text + predictions per YouTube comment_id ({} when the DB is unavailable)."""
+    if not comment_ids:
+        return {}
+    try:
+        from backend.db.session import get_session
+        from backend.db.repository import load_stored_predictions
+
+        with get_session() as db:
+            return load_stored_predictions(db, comment_ids)
+    except Exception as e:
+        logger.warning(f"Prediction reuse skipped because database is not available: {e}")
+        return {}
+
+
+def _rescore_stale(stale: List[Dict[str, Any]]) -> None:
+    """Score comments with the current model and store the new predictions."""
+    try:
+        from backend.db.session import get_session
+        from backend.db.repository import upsert_prediction_rows
+
+        svc = SentimentService.get()
+        batch = settings.BATCH_SIZE * 8
+        for i in range(0, len(stale), batch):
+            chunk = stale[i:i + batch]
+            preds = svc.predict([c["text"] for c in chunk])
+            with get_session() as db:
+                upsert_prediction_rows(db, [
+                    (c["comment_pk"], svc.model_name, pred) for c, pred in zip(chunk, preds)
+                ])
+        logger.info(f"🔁 Re-scored {len(stale):,} comments with {svc.model_name}")
+    except Exception as e:
+        logger.warning(f"Background re-scoring skipped: {e}")
 
+
+def _score_comments(
+    comments: List[Dict[str, Any]],
+    emit=None,
+    groups: Optional[Sequence[Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Predict sentiment for fetched comments → (analyzed, counts).
+
+    Comments whose stored text is unchanged reuse their stored prediction for
+    the current model; only new or edited comments go through the model.
+    Predictions from an older model are reused too and re-scored in the
+    background. Of the rest, exact and near-duplicate texts (DEDUP_MODE) are
+    scored once and the prediction is fanned out to every copy; copies carry
+    "duplicate_of" with the scored comment's id. ``groups`` (one key per
+    comment, e.g. its video) keeps duplicates from matching across groups, so
+    a shared batch pass collapses exactly what per-video passes would.
+    Falls back to the rule-based
+    model if inference fails. With TOPIC_CLUSTERS, comments also carry their
+    float16 "embedding" for topic clustering: from the scoring pass, or for
+    reused and first-stage cascade predictions from an extra embedding pass,
+    so topics describe the whole sample rather than only the newly scored part.
+    """
     def _emit(step: str, pct: int):
-        if progress_cb:
-            progress_cb(step, pct)
+        if emit:
+            emit(step, pct)
+
+    def _analyzed_entry(
+        comment: Dict[str, Any],
+        pred: Dict[str, Any],
+        model_name: str,
+        duplicate_of: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "comment_id": comment.get("comment_id"),
+            "text": comment.get("text", ""),
+            "author": comment.get("author", "Anonymous"),
+            "published_at": comment.get("published_at", ""),
+            "like_count": comment.get("like_count", 0),
+            "is_reply": comment.get("is_reply", False),
+            "prediction": pred,
+            "model_name": model_name,
+            "duplicate_of": duplicate_of,
+        }
 
-    # ── 1. Fetch video info ──────────────────────────────────────────────────
-    _emit("Fetching video info…", 5)
-    video_info = fetch_video_info(video_id, settings.YOUTUBE_API_KEY)
-    video_title = video_info.get("title", "Unknown Video")
-    channel_title = video_info.get("channel_title", "Unknown Channel")
+    try:
+        svc: Optional[SentimentService] = SentimentService.get()
+    except Exception as e:
+        logger.warning(f"Model failed, using rule-based fallback: {e}")
+        svc = None
+
+    # Reuse stored predictions of unchanged comments
+    stored = _load_stored_predictions([c["comment_id"] for c in comments if c.get("comment_id")])
+    reused: Dict[int, Tuple[Dict[str, Any], str]] = {}
+    stale: List[Dict[str, Any]] = []
+    for i, comment in enumerate(comments):
+        entry = stored.get(comment.get("comment_id") or "")
+        if not entry or entry["text"] != comment.get("text", ""):
+            continue  # new or edited
+        preds = entry["predictions"]
+        current = [name for name in svc.model_names() if name in preds] if svc is not None else []
+        if current:
+            reused[i] = (preds[current[0]], current[0])
+            continue
+        older = [(name, p) for name, p in preds.items() if name != _RULE_BASED_MODEL]
+        if older:
+            name, pred = max(older, key=lambda item: entry["predicted_at"][item[0]])
+            reused[i] = (pred, name)
+            if svc is not None:
+                stale.append({"comment_pk": entry["comment_pk"], "text": entry["text"]})
+
+    to_score = [i for i in range(len(comments)) if i not in reused]
+    if reused:
+        logger.info(f"♻️ Reusing {len(reused):,} stored predictions, scoring {len(to_score):,} comments")
+
+    # Collapse duplicates: one representative per cluster goes through the model
+    copy_of: Dict[int, int] = {}
+    if settings.DEDUP_MODE != "off" and len(to_score) > 1:
+        members: Dict[Any, List[int]] = {}
+        for i in to_score:
+            members.setdefault(groups[i] if groups is not None else None, []).append(i)
+        stats = Counter()
+        for group in members.values():
+            if len(group) < 2:
+                continue
+            representative, group_stats = find_duplicates(
+                [comments[i].get("text", "") for i in group],
+                threshold=settings.DEDUP_THRESHOLD,
+                near=settings.DEDUP_MODE == "near",
+            )
+            copy_of.update({group[j]: group[r] for j, r in enumerate(representative) if r != j})
+            stats.update(group_stats)
+        if copy_of:
+            logger.info(
+                f"🧹 Collapsed {len(copy_of):,} duplicate comments "
+                f"({stats['exact']:,} exact, {stats['near']:,} near) before inference"
+            )
+            to_score = [i for i in to_score if i not in copy_of]
+
+    scored: Dict[int, Tuple[Dict[str, Any], str]] = {}
+    embeddings: Dict[int, Any] = {}
+    if svc is not None and to_score:
+        try:
+            predictions, vectors = svc.predict_cascade(
+                [comments[i].get("text", "") for i in to_score], embed=settings.TOPIC_CLUSTERS > 0
+            )
+            _emit("AI model running — processing predictions…", 65)
+            for j, i in enumerate(to_score):
+                if j < len(predictions):
+                    scored[i] = predictions[j]
+                if j in vectors:
+                    embeddings[i] = vectors[j]
+            logger.info("✅ Used XLM-RoBERTa for sentiment analysis")
+        except Exception as e:
+            logger.warning(f"Model failed, using rule-based fallback: {e}")
+            scored = {}
+    if len(scored) < len(to_score):
+        _emit("Using rule-based fallback model…", 65)
+
+    if svc is not None and settings.TOPIC_CLUSTERS > 0:
+        missing = sorted({copy_of.get(i, i) for i in range(len(comments))} - embeddings.keys())
+        if missing:
+            try:
+                vectors = svc.embed([comments[i].get("text", "") for i in missing])
+                embeddings.update(zip(missing, vectors))
+                logger.info(f"🧭 Embedded {len(missing):,} reused or first-stage comments for topic clustering")
+            except Exception as e:
+                logger.warning(f"Topic embeddings incomplete, clustering only part of the comments: {e}")
+
+    analyzed: List[Dict[str, Any]] = []
+    counts = {"positive": 0, "neutral": 0, "negative": 0}
+    for i, comment in enumerate(comments):
+        source = copy_of.get(i, i)
+        hit = reused.get(i) or scored.get(source)
+        if hit is None:
+            hit = (_rule_based_sentiment(comments[source].get("text", "")), _RULE_BASED_MODEL)
+            scored[source] = hit  # later copies share the fallback prediction
+        pred, model_name = hit
+        duplicate_of = comments[source].get("comment_id") if source != i else None
+        entry = _analyzed_entry(comment, pred, model_name, duplicate_of)
+        if source in embeddings:
+            entry["embedding"] = embeddings[source]  # consumed by StreamingAggregator
+        analyzed.append(entry)
+        counts[pred["label"]] += 1
+
+    if stale:
+        _rescore_executor.submit(_rescore_stale, stale)
+
+    return analyzed, counts
+
+
+# ─── Core analysis logic ──────────────────────────────────────────────────────
+# The pipeline is split into stages shared by single-video and batch analysis:
+# fetch (per video) → score (one call, may span videos) → assemble (per video)
+# → persist (background).
+
+def _comment_target(video_info: Dict[str, Any], percentage: float) -> int:
+    """Comments an analysis of ``percentage`` asks for, before any cap."""
     total_comments = video_info.get("comment_count", 0)
+    return int(total_comments * percentage) if total_comments > 0 else 500
+
+
+@contextmanager
+def _youtube_job(name: str, estimated_units: int = 0) -> Iterator[YouTubeJob]:
+    """youtube_job() with an exhausted budget answered as 429 Too Many Requests."""
+    try:
+        with youtube_job(name, estimated_units) as job:
+            yield job
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+def _fetch_video(
+    video_id: str,
+    percentage: float,
+    emit=None,
+    video_info: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Fetch stage: video metadata and the comment sample → (video_info, comments)."""
+    def _emit(step: str, pct: int):
+        if emit:
+            emit(step, pct)
+
+    if video_info is None:
+        _emit("Fetching video info…", 5)
+        video_info = fetch_video_info(video_id, settings.YOUTUBE_API_KEY)
 
-    # ── 2. Collect comments ──────────────────────────────────────────────────
     _emit("Collecting comments from YouTube…", 15)
     # Apply safety cap limit from settings to prevent server overload
-    raw_target = int(total_comments * percentage) if total_comments > 0 else 500
-    max_comments = min(raw_target, settings.MAX_COMMENTS_LIMIT)
+    max_comments = min(_comment_target(video_info, percentage), settings.MAX_COMMENTS_LIMIT)
     comments = fetch_youtube_comments(
         video_id=video_id,
         api_key=settings.YOUTUBE_API_KEY,
@@ -211,91 +600,482 @@ def _run_analysis(
             status_code=404,
             detail="No comments found. The video may have comments disabled or be private.",
         )
+    return video_info, comments
 
-    _emit(f"Collected {len(comments):,} comments. Inserting into AI model…", 40)
-
-    # ── 3. Sentiment prediction ──────────────────────────────────────────────
-    comment_texts = [c.get("text", "") for c in comments]
-    analyzed: List[Dict[str, Any]] = []
-    counts = {"positive": 0, "neutral": 0, "negative": 0}
 
-    try:
-        svc = SentimentService.get()
-        predictions = svc.predict(comment_texts)
-        _emit("AI model running — processing predictions…", 65)
-
-        for i, comment in enumerate(comments):
-            pred = predictions[i] if i < len(predictions) else _rule_based_sentiment(comment.get("text", ""))
-            analyzed.append({
-                "text": comment.get("text", ""),
-                "author": comment.get("author", "Anonymous"),
-                "published_at": comment.get("published_at", ""),
-                "like_count": comment.get("like_count", 0),
-                "is_reply": comment.get("is_reply", False),
-                "prediction": pred,
-            })
-            counts[pred["label"]] += 1
-
-        logger.info("✅ Used XLM-RoBERTa for sentiment analysis")
+def _assemble_result(
+    video_id: str,
+    percentage: float,
+    video_info: Dict[str, Any],
+    analyzed: List[Dict[str, Any]],
+    include: Optional[Set[str]] = None,
+    started: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Assemble stage: keywords, charts, timeline and examples for one video."""
+    agg = StreamingAggregator(settings.KEYWORD_SKETCH_CAPACITY, topic_clusters=settings.TOPIC_CLUSTERS)
+    for i in range(0, len(analyzed), _STREAM_CHUNK_SIZE):
+        agg.update(analyzed[i:i + _STREAM_CHUNK_SIZE])
+    return _result_from_aggregate(video_id, percentage, video_info, agg, include, started)
 
-    except Exception as e:
-        logger.warning(f"Model failed, using rule-based fallback: {e}")
-        _emit("Using rule-based fallback model…", 65)
 
-        for comment in comments:
-            pred = _rule_based_sentiment(comment.get("text", ""))
-            analyzed.append({
-                "text": comment.get("text", ""),
-                "author": comment.get("author", "Anonymous"),
-                "published_at": comment.get("published_at", ""),
-                "like_count": comment.get("like_count", 0),
-                "is_reply": comment.get("is_reply", False),
-                "prediction": pred,
-            })
-            counts[pred["label"]] += 1
-
-    total_analyzed = len(analyzed)
+def _result_from_aggregate(
+    video_id: str,
+    percentage: float,
+    video_info: Dict[str, Any],
+    agg: StreamingAggregator,
+    include: Optional[Set[str]] = None,
+    started: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Analysis result from the incremental aggregates of one video."""
+    counts = dict(agg.counts)
+    total_analyzed = agg.total
     ratios = {k: (v / total_analyzed if total_analyzed > 0 else 0.0) for k, v in counts.items()}
 
-    # ── 4. Generate visualizations ───────────────────────────────────────────
-    _emit("Generating visualizations…", 80)
-    texts_for_viz = [c.get("text", "") for c in comments if c.get("text")]
-    viz = _viz_service.generate_all(texts_for_viz, counts)
-
-    # ── 5. Assemble examples ─────────────────────────────────────────────────
-    _emit("Completing results…", 95)
-    examples: List[Dict] = []
-    for sentiment in ["positive", "neutral", "negative"]:
-        pool = [c for c in analyzed if c["prediction"]["label"] == sentiment]
-        pool.sort(key=lambda x: x.get("like_count", 0), reverse=True)
-        examples.extend(pool[:5])
-
-    processing_time = time.time() - start
-    _emit("Complete!", 100)
-
-    # Cache the full comments list for instant CSV generation
-    global _last_analysis_cache
-    _last_analysis_cache = {
-        "video_id": video_id,
-        "percentage": percentage,
-        "comments": analyzed,
-    }
+    # Bounded-memory keyword counts, overall and per sentiment
+    viz = _viz_service.generate_all([], counts, include, frequencies=agg.sketch.frequencies())
+    viz["top_keywords_by_sentiment"] = agg.sketch.top_keywords_by_sentiment()
+    _remember_chart_data(video_id, percentage, viz)
 
     return {
         "video_id": video_id,
-        "video_title": video_title,
-        "channel_title": channel_title,
-        "total_comments": total_comments,
+        "video_title": video_info.get("title", "Unknown Video"),
+        "channel_title": video_info.get("channel_title", "Unknown Channel"),
+        "total_comments": video_info.get("comment_count", 0),
         "actual_analyzed": total_analyzed,
         "percentage_analyzed": percentage,
         "counts": counts,
         "ratios": ratios,
-        "examples": examples[:15],
-        "processing_time": round(processing_time, 2),
+        "examples": agg.examples()[:15],
+        "duplicates_collapsed": agg.duplicates,
+        "topics": agg.topics.result() if agg.topics is not None else None,
+        "processing_time": round(time.time() - started, 2) if started else 0.0,
         "visualizations": viz,
+        "timeline": agg.timeline.result(),
+        "data_source": "youtube",
+    }
+
+
+def _raw_payloads(comments: List[Dict[str, Any]]) -> Optional[Dict[str, Dict[str, Any]]]:
+    # Raw API objects go to persistence only (compressed, out of the comments table)
+    if settings.RAW_JSON_STORAGE == "off":
+        return None
+    return {c["comment_id"]: c["raw_json"] for c in comments if c.get("comment_id") and c.get("raw_json")}
+
+
+def _queue_save(result: Dict[str, Any], analyzed: List[Dict[str, Any]], comments: List[Dict[str, Any]]) -> None:
+    """Persist stage: hand the analysis to the background DB writer."""
+    _db_writer.submit(_try_save_to_db, result, analyzed, _raw_payloads(comments))
+
+
+def _cache_last_analysis(video_id: str, percentage: float, comments=None, csv_path: Optional[str] = None) -> None:
+    """Keep the latest analysis for instant CSV download: its comments, or its spilled CSV file."""
+    global _last_analysis_cache
+    old_path = _last_analysis_cache.get("csv_path")
+    _last_analysis_cache = {
+        "video_id": video_id,
+        "percentage": percentage,
+        "comments": comments,
+        "csv_path": csv_path,
+    }
+    if old_path and old_path != csv_path:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+
+
+def _run_analysis(
+    video_id: str,
+    percentage: float,
+    progress_cb=None,
+    include: Optional[Set[str]] = None,
+    save_to_db: bool = False,
+    read_through: bool = True,
+    target_margin: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Full pipeline: fetch → predict → visualize.
+    progress_cb(step: str, pct: int) is called at each stage.
+    include selects which visualization artifacts are computed eagerly
+    (None = all); the rest can be fetched later from /charts/{chart}.
+    save_to_db queues every analyzed comment for background persistence.
+    read_through serves a recent stored analysis instead of re-fetching.
+    target_margin stops fetching once every sentiment ratio is known within
+    ± target_margin (95% confidence); percentage is then only an upper bound.
+    """
+    start = time.time()
+
+    def _emit(step: str, pct: int):
+        if progress_cb:
+            progress_cb(step, pct)
+
+    # ── 0. Recent stored analysis? ───────────────────────────────────────────
+    if read_through:
+        _emit("Checking stored results…", 2)
+        stored = _read_through(video_id, percentage, include)
+        if stored is not None:
+            _emit("Complete!", 100)
+            return stored
+
+    # ── 1. Fetch video info and comments ─────────────────────────────────────
+    _emit("Fetching video info…", 5)
+    with _youtube_job(f"video:{video_id}") as job:
+        video_info = fetch_video_info(video_id, settings.YOUTUBE_API_KEY)
+        streaming = target_margin is not None or (
+            settings.STREAM_MAX_COMMENTS_LIMIT > settings.MAX_COMMENTS_LIMIT
+            and _comment_target(video_info, percentage) > settings.MAX_COMMENTS_LIMIT
+        )
+        if not streaming:
+            target = min(_comment_target(video_info, percentage), settings.MAX_COMMENTS_LIMIT)
+            job.reserve(youtube_budget.estimate(target, overhead_calls=1))
+            video_info, comments = _fetch_video(video_id, percentage, _emit, video_info)
+            job.comments = len(comments)
+    if streaming:
+        result = _run_streaming_analysis(
+            video_id, percentage, video_info, progress_cb, include, save_to_db, target_margin
+        )
+        result["quota_units"] += job.units  # the video info call
+        return result
+    _emit(f"Collected {len(comments):,} comments. Inserting into AI model…", 40)
+
+    # ── 2. Sentiment prediction ──────────────────────────────────────────────
+    analyzed, _ = _score_comments(comments, _emit)
+
+    # ── 3. Visualizations, timeline and examples ─────────────────────────────
+    _emit("Generating visualizations…", 80)
+    result = _assemble_result(video_id, percentage, video_info, analyzed, include, start)
+    result["quota_units"] = job.units
+    _emit("Complete!", 100)
+
+    # Cache the full comments list for instant CSV generation
+    _cache_last_analysis(video_id, percentage, comments=analyzed)
+
+    if save_to_db:
+        _queue_save(result, analyzed, comments)
+
+    return result
+
+
+def _run_streaming_analysis(
+    video_id: str,
+    percentage: float,
+    video_info: Dict[str, Any],
+    progress_cb=None,
+    include: Optional[Set[str]] = None,
+    save_to_db: bool = False,
+    target_margin: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Bounded-memory variant of _run_analysis for samples above MAX_COMMENTS_LIMIT
+    (up to STREAM_MAX_COMMENTS_LIMIT). Comments stream from the fetcher in
+    chunks of _STREAM_CHUNK_SIZE through inference into a StreamingAggregator;
+    each chunk is then persisted and dropped. Only one chunk save is
+    outstanding at a time, so a slow database throttles the fetch instead of
+    queueing chunks in memory. The full comment list is spilled to a temporary
+    CSV for download rather than kept in memory.
+
+    With target_margin, comments come in PRECISION_SAMPLE_ORDER (by default
+    the newest-first and relevance listings interleaved, a less time-biased
+    sample than newest-first alone) in smaller chunks, and the stream stops
+    as soon as the ratio intervals are tight enough.
+    """
+    start = time.time()
+
+    def _emit(step: str, pct: int):
+        if progress_cb:
+            progress_cb(step, pct)
+
+    cap = settings.STREAM_MAX_COMMENTS_LIMIT
+    if target_margin is not None:
+        cap = max(cap, settings.MAX_COMMENTS_LIMIT)
+    target = min(_comment_target(video_info, percentage), cap)
+    population = video_info.get("comment_count") or None
+    chunk_size = _STREAM_CHUNK_SIZE if target_margin is None else _PRECISION_CHUNK_SIZE
+    logger.info(f"🌊 Streaming analysis of {video_id}: up to {target:,} comments")
+    _emit(f"Streaming up to {target:,} comments…", 15)
+
+    agg = StreamingAggregator(
+        settings.KEYWORD_SKETCH_CAPACITY, spill_csv=True, topic_clusters=settings.TOPIC_CLUSTERS
+    )
+    video = {
+        "video_id": video_id,
+        "video_title": video_info.get("title", "Unknown Video"),
+        "channel_title": video_info.get("channel_title", "Unknown Channel"),
+    }
+    pending_save = None
+
+    def _flush(chunk: List[Dict[str, Any]]) -> bool:
+        """Score, aggregate and persist one chunk; True once the target margin is reached."""
+        nonlocal pending_save
+        analyzed, _ = _score_comments(chunk)
+        agg.update(analyzed)
+        if save_to_db:
+            if pending_save is not None:
+                pending_save.result()  # backpressure: at most one chunk waiting for the DB
+            pending_save = _db_writer.submit(_try_save_chunk, video, analyzed, _raw_payloads(chunk))
+        pct = 15 + int(65 * min(agg.total / target, 1.0))
+        if target_margin is None:
+            _emit(f"Analyzed {agg.total:,} of ~{target:,} comments…", pct)
+            return False
+        margin = precision_report(agg.counts, target_margin, population)["achieved_margin"]
+        _emit(f"Analyzed {agg.total:,} comments (±{margin * 100:.1f}%, target ±{target_margin * 100:.1f}%)…", pct)
+        return has_converged(agg.counts, target_margin, population, _PRECISION_MIN_SAMPLE)
+
+    stopped_early = False
+    try:
+        chunk: List[Dict[str, Any]] = []
+        with _youtube_job(f"stream:{video_id}", youtube_budget.estimate(target, overhead_calls=1)) as job:
+            for comment in iter_youtube_comments(
+                video_id=video_id,
+                api_key=settings.YOUTUBE_API_KEY,
+                max_comments=target,
+                include_replies=True,
+                percentage=percentage,
+                order="time" if target_margin is None else settings.PRECISION_SAMPLE_ORDER,
+            ):
+                chunk.append(comment)
+                if len(chunk) >= chunk_size:
+                    if _flush(chunk):
+                        stopped_early = agg.total < target
+                        chunk = []
+                        break
+                    chunk = []
+            if chunk:
+                _flush(chunk)
+            job.comments = agg.total
+        agg.close()
+
+        if agg.total == 0:
+            raise HTTPException(
+                status_code=404,
+                detail="No comments found. The video may have comments disabled or be private.",
+            )
+
+        _emit("Generating visualizations…", 80)
+        result = _result_from_aggregate(video_id, percentage, video_info, agg, include, start)
+        result["quota_units"] = job.units
+        if target_margin is not None:
+            result["precision"] = precision_report(agg.counts, target_margin, population, stopped_early)
+            if stopped_early and population:
+                # Record the fraction actually sampled so read-through never
+                # serves this run for a larger percentage
+                result["percentage_analyzed"] = round(agg.total / population, 4)
+            logger.info(
+                f"🎯 {video_id}: ±{result['precision']['achieved_margin'] * 100:.1f}% after "
+                f"{agg.total:,} comments (target ±{target_margin * 100:.1f}%, stopped early: {stopped_early})"
+            )
+    except BaseException:
+        agg.discard()
+        raise
+
+    if save_to_db:
+        _db_writer.submit(_try_record_run, result, agg.model_name())
+    _cache_last_analysis(video_id, percentage, csv_path=agg.csv_path)
+    _emit("Complete!", 100)
+    logger.info(f"🌊 Streamed {agg.total:,} comments for {video_id} in {time.time() - start:.1f}s")
+    return result
+
+
+def _run_batch_analysis(
+    video_ids: List[str],
+    percentage: float,
+    include: Optional[Set[str]] = None,
+    save_to_db: bool = True,
+    read_through: bool = True,
+) -> Dict[str, Any]:
+    """
+    Analyze several videos at once. Recently stored ones are served by
+    read-through; the rest are fetched concurrently and all their comments go
+    through a single _score_comments call, so model batches stay full across
+    videos. Per-video failures are reported in "errors", not raised.
+    """
+    start = time.time()
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: List[Dict[str, str]] = []
+
+    pending: List[str] = []
+    for video_id in video_ids:
+        stored = _read_through(video_id, percentage, include) if read_through else None
+        if stored is not None:
+            results[video_id] = stored
+        else:
+            pending.append(video_id)
+
+    # ── Fetch concurrently ───────────────────────────────────────────────────
+    fetched: Dict[str, Tuple[Dict[str, Any], List[Dict[str, Any]]]] = {}
+    units = 0
+    if pending:
+        workers = max(1, min(settings.BATCH_FETCH_WORKERS, len(pending)))
+        # The whole batch is one job: it gets one fair share of the rate limit
+        estimate = len(pending) * youtube_budget.estimate(settings.MAX_COMMENTS_LIMIT)
+        with _youtube_job(f"batch:{len(pending)}", estimate) as job, \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-fetch") as pool:
+            futures = {vid: pool.submit(job.bind(_fetch_video), vid, percentage) for vid in pending}
+            for vid, future in futures.items():
+                try:
+                    fetched[vid] = future.result()
+                except HTTPException as e:
+                    errors.append({"video_id": vid, "detail": str(e.detail)})
+                except Exception as e:
+                    logger.error(f"❌ Batch fetch failed for {vid}: {e}")
+                    errors.append({"video_id": vid, "detail": str(e)})
+            job.comments = sum(len(comments) for _, comments in fetched.values())
+        units = job.units
+
+    # ── One shared inference pass ────────────────────────────────────────────
+    if fetched:
+        all_comments = [c for _, comments in fetched.values() for c in comments]
+        groups = [vid for vid, (_, comments) in fetched.items() for _ in comments]
+        logger.info(f"📦 Batch: scoring {len(all_comments):,} comments from {len(fetched)} videos together")
+        all_analyzed, _ = _score_comments(all_comments, groups=groups)
+
+        offset = 0
+        for vid, (video_info, comments) in fetched.items():
+            analyzed = all_analyzed[offset:offset + len(comments)]
+            offset += len(comments)
+            results[vid] = _assemble_result(vid, percentage, video_info, analyzed, include, start)
+            if save_to_db:
+                _queue_save(results[vid], analyzed, comments)
+
+    videos = [results[vid] for vid in video_ids if vid in results]
+
+    # ── Aggregate across videos ──────────────────────────────────────────────
+    counts = Counter({"positive": 0, "neutral": 0, "negative": 0})
+    keywords: Counter = Counter()
+    for r in videos:
+        counts.update(r["counts"])
+        viz = r.get("visualizations") or {}
+        keywords.update((viz.get("chart_data") or {}).get("word_frequencies") or {})
+    total = sum(counts.values())
+
+    return {
+        "videos": videos,
+        "errors": errors,
+        "aggregate": {
+            "videos_analyzed": len(videos),
+            "from_database": sum(1 for r in videos if r.get("data_source") == "database"),
+            "actual_analyzed": total,
+            "duplicates_collapsed": sum(r.get("duplicates_collapsed", 0) for r in videos),
+            "counts": dict(counts),
+            "ratios": {k: (v / total if total else 0.0) for k, v in counts.items()},
+            "top_keywords": [{"word": w, "frequency": f} for w, f in keywords.most_common(20)],
+        },
+        "processing_time": round(time.time() - start, 2),
+        "quota_units": units,
+    }
+
+
+# ─── Channel analysis ─────────────────────────────────────────────────────────
+def _run_channel_analysis(channel_input: str, max_videos: int) -> Dict[str, Any]:
+    """
+    Crawl a channel's most recent uploads incrementally. Each upload keeps a
+    high-water mark (newest top-level comment stored), so a refresh fetches and
+    scores only newer comments. An upload with more new comments than
+    MAX_COMMENTS_LIMIT keeps its mark ("caught_up": false) and saves where the
+    fetch stopped; the next refresh continues downward from there until the
+    gap is closed, then moves the mark up. New comments from all uploads share one
+    _score_comments pass; the channel aggregate is rebuilt from the daily
+    rollups and stored on the channel row. Requires the database.
+    """
+    from backend.db.session import get_session
+    from backend.db.repository import (
+        channel_crawl_states, refresh_channel_summary, save_channel_video_crawl, upsert_channel,
+    )
+
+    start = time.time()
+    # Refreshes mostly fetch a page or two per upload, so reserve about that
+    with _youtube_job(f"channel:{channel_input}", 2 + 2 * max_videos) as job:
+        channel = resolve_channel(channel_input, settings.YOUTUBE_API_KEY)
+        uploads, list_units = list_channel_uploads(channel["uploads_playlist_id"], settings.YOUTUBE_API_KEY, max_videos)
+        units = 1 + list_units
+
+        with get_session() as db:
+            channel_pk = upsert_channel(db, channel)
+            states = channel_crawl_states(db, channel_pk)
+
+        # ── Fetch only comments newer than each upload's high-water mark ─────
+        fetched: Dict[str, List[Dict[str, Any]]] = {}
+        resumes: Dict[str, Optional[Dict[str, Any]]] = {}
+        errors: List[Dict[str, str]] = []
+        if uploads:
+            workers = max(1, min(settings.BATCH_FETCH_WORKERS, len(uploads)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="channel-fetch") as pool:
+                futures = {}
+                for v in uploads:
+                    state = states.get(v["video_id"]) or {}
+                    futures[v["video_id"]] = pool.submit(
+                        job.bind(fetch_comments_since), v["video_id"], state.get("mark"),
+                        settings.YOUTUBE_API_KEY, settings.MAX_COMMENTS_LIMIT, True,
+                        state.get("seen_at_mark"), state.get("resume"),
+                    )
+                for vid, future in futures.items():
+                    try:
+                        comments, fetch_units, resumes[vid] = future.result()
+                        fetched[vid] = comments
+                        units += fetch_units
+                    except Exception as e:
+                        logger.error(f"❌ Channel fetch failed for {vid}: {e}")
+                        errors.append({"video_id": vid, "detail": str(e)})
+
+    # ── Score every new comment together ─────────────────────────────────────
+    all_comments = [c for comments in fetched.values() for c in comments]
+    groups = [vid for vid, comments in fetched.items() for _ in comments]
+    all_analyzed: List[Dict[str, Any]] = []
+    if all_comments:
+        logger.info(f"📺 Channel {channel['channel_id']}: scoring {len(all_comments):,} new comments")
+        all_analyzed, _ = _score_comments(all_comments, groups=groups)
+
+    # ── Persist, advance high-water marks, roll up ───────────────────────────
+    new_per_video: Dict[str, int] = {}
+    with get_session() as db:
+        offset = 0
+        for video in uploads:
+            comments = fetched.get(video["video_id"])
+            if comments is None:
+                continue  # fetch failed: keep the old mark, retry next refresh
+            analyzed = all_analyzed[offset:offset + len(comments)]
+            offset += len(comments)
+            raw_payloads = {
+                c["comment_id"]: c["raw_json"] for c in comments if c.get("comment_id") and c.get("raw_json")
+            } if settings.RAW_JSON_STORAGE != "off" else None
+            save_channel_video_crawl(db, channel_pk, video, analyzed, raw_payloads, resumes[video["video_id"]])
+            new_per_video[video["video_id"]] = len(comments)
+        summary = refresh_channel_summary(db, channel_pk)
+
+    for v in summary["videos"]:
+        v["new_comments"] = new_per_video.get(v["video_id"], 0)
+
+    return {
+        "channel_id": channel["channel_id"],
+        "title": channel["title"],
+        "handle": channel.get("handle"),
+        "videos_crawled": len(fetched),
+        "new_comments": len(all_comments),
+        "summary": summary,
+        "errors": errors,
+        "quota_units": units,
+        "processing_time": round(time.time() - start, 2),
     }
 
 
+def _load_channel_summary(channel_input: str) -> Optional[Dict[str, Any]]:
+    from backend.db.session import get_session
+    from backend.db.repository import find_channel
+
+    kind, value = extract_channel_ref(channel_input)
+    with get_session() as db:
+        channel = find_channel(db, kind, value)
+        if channel is None:
+            return None
+        return {
+            "channel_id": channel.channel_id,
+            "title": channel.title,
+            "handle": channel.handle,
+            "last_crawled_at": channel.last_crawled_at.isoformat() if channel.last_crawled_at else None,
+            "summary": channel.summary or {},
+        }
+
+
 # ─── Endpoints ────────────────────────────────────────────────────────────────
 
 @app.get("/")
@@ -312,56 +1092,177 @@ def health_check():
     }
 
 
-# Helper to check daily quota limit
-def _check_quota_or_raise():
-    """Check daily quota limit (from settings.DAILY_QUOTA_LIMIT). Raises HTTP 429 if exceeded."""
+# ─── Quota ledger ─────────────────────────────────────────────────────────────
+# Checks and /api/quota read the in-memory ledger; the DB is only touched to
+# persist usage rows and to reconcile in the background.
+
+def _client_identity(request: Request) -> Tuple[Optional[str], Optional[str]]:
+    """(user_ip, session_id) of a request. Honors X-Forwarded-For behind a proxy."""
+    forwarded = request.headers.get("x-forwarded-for", "")
+    user_ip = forwarded.split(",")[0].strip() if forwarded else None
+    if not user_ip and request.client:
+        user_ip = request.client.host
+    session_id = request.headers.get("x-session-id") or request.query_params.get("session_id")
+    return (user_ip[:45] if user_ip else None), (session_id[:64] if session_id else None)
+
+
+# Reconciliations skipped in a row (rows persisted during the read) before
+# one runs on the DB writer, where no persist can land between read and apply
+_RECONCILE_MAX_SKIPS = 3
+
+
+def _reconcile_quota_ledger() -> bool:
+    """Replace the ledger's DB-backed totals with today's quota_usage sums (blocking) → applied."""
+    from backend.db.session import get_session
+    from backend.db.repository import quota_totals
+    from datetime import date
+
+    version = quota_ledger.version()
+    today = date.today()
+    with get_session() as db:
+        total, by_ip, by_session = quota_totals(db, today)
+    return quota_ledger.reconcile(today, total, by_ip, by_session, version)
+
+
+async def _quota_reconcile_loop() -> None:
+    from backend.db.session import run_db
+
+    skipped = 0
+    while True:
+        await asyncio.sleep(settings.QUOTA_RECONCILE_SECONDS)
+        try:
+            if await run_db(_reconcile_quota_ledger):
+                skipped = 0
+                continue
+            skipped += 1
+            if skipped >= _RECONCILE_MAX_SKIPS:
+                # Steady traffic keeps persisting during the read; quota rows are
+                # only persisted on the single DB writer thread, so queue it there
+                if await asyncio.wrap_future(_db_writer.submit(_reconcile_quota_ledger)):
+                    skipped = 0
+                else:
+                    logger.warning("Quota reconciliation skipped on the DB writer too")
+        except Exception as e:
+            logger.warning(f"Quota reconciliation skipped: {e}")
+
+
+def _check_quota_or_raise(user_ip: Optional[str] = None, session_id: Optional[str] = None):
+    """Check daily, per-IP and per-session limits against the ledger. Raises HTTP 429 if exceeded."""
+    exhausted = quota_ledger.exceeded(
+        settings.DAILY_QUOTA_LIMIT,
+        settings.QUOTA_PER_IP_LIMIT,
+        settings.QUOTA_PER_SESSION_LIMIT,
+        user_ip,
+        session_id,
+    )
+    if exhausted == "daily":
+        raise HTTPException(
+            status_code=429,
+            detail="Daily API quota limit exceeded. Please try again tomorrow.",
+        )
+    if exhausted:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Daily API quota limit for this {'IP address' if exhausted == 'ip' else 'session'} "
+                   f"exceeded. Please try again tomorrow.",
+        )
+
+
+def _persist_quota_usage(
+    units: int,
+    user_ip: Optional[str],
+    session_id: Optional[str],
+    operation_type: str,
+    video_id: Optional[str],
+    meta_data: Dict[str, Any],
+) -> None:
+    """Write a quota_usage row and mark its units persisted in the ledger."""
     try:
-        from backend.db.session import get_db
-        from sqlalchemy import func
+        from backend.db.session import get_session
         from backend.db.models import QuotaUsage
         from datetime import date
 
-        db = next(get_db())
         today = date.today()
-        used = db.query(func.sum(QuotaUsage.units_used)).filter(
-            QuotaUsage.date == today
-        ).scalar() or 0
-        db.close()
-
-        daily_limit = settings.DAILY_QUOTA_LIMIT
-        if used >= daily_limit:
-            raise HTTPException(
-                status_code=429,
-                detail="Daily API quota limit exceeded. Please try again tomorrow.",
-            )
-    except HTTPException:
-        raise
+        with get_session() as db:
+            db.add(QuotaUsage(
+                date=today,
+                operation_type=operation_type,
+                units_used=units,
+                video_id=video_id,
+                user_ip=user_ip,
+                session_id=session_id,
+                meta_data=meta_data,
+            ))
+        quota_ledger.persisted(units, user_ip, session_id, today)
     except Exception as e:
-        # DB might not be available, log and ignore to allow graceful fallback
-        logger.warning(f"Quota check skipped because database is not available: {e}")
+        logger.warning(f"Quota usage not persisted (kept in memory): {e}")
+
+
+def _charge_quota(
+    units: int,
+    user_ip: Optional[str],
+    session_id: Optional[str],
+    operation_type: str,
+    meta_data: Dict[str, Any],
+    video_id: Optional[str] = None,
+) -> None:
+    """Record units in the ledger now and queue their quota_usage row."""
+    if units <= 0:
+        return
+    quota_ledger.record(units, user_ip, session_id)
+    _db_writer.submit(_persist_quota_usage, units, user_ip, session_id, operation_type, video_id, meta_data)
+
+
+def _record_quota_usage(result: Dict[str, Any], user_ip: Optional[str], session_id: Optional[str]) -> None:
+    """Charge the units an analysis spent on YouTube calls (read-through and cache hits are free)."""
+    _charge_quota(
+        result.get("quota_units", 0), user_ip, session_id, "analyze",
+        {"percentage": result.get("percentage_analyzed", 0.0)}, result["video_id"],
+    )
+
+
+def _record_batch_quota_usage(
+    batch: Dict[str, Any],
+    user_ip: Optional[str],
+    session_id: Optional[str],
+) -> None:
+    """Charge a whole batch in one ledger update and one quota_usage row."""
+    fetched = [r for r in batch["videos"] if r.get("data_source") == "youtube"]
+    _charge_quota(batch.get("quota_units", 0), user_ip, session_id, "analyze_batch", {
+        "video_ids": [r["video_id"] for r in fetched],
+        "percentage": fetched[0].get("percentage_analyzed", 0.0) if fetched else 0.0,
+    })
 
 
 # ── Main analyze endpoint (direct, blocking) ──────────────────────────────────
 @app.get("/api/analyze/video/{video_input}/visualize", response_model=AnalyzeOut)
 async def analyze_video_with_visualization(
+    request: Request,
     video_input: str,
     percentage: float = Query(0.5, ge=0.25, le=1.0),
     save_to_db: bool = Query(True),
+    include: Optional[str] = Query(None, description="Comma-separated artifacts to compute now: "
+                                                     "wordcloud, pie_chart, bar_chart, top_keywords, all, none"),
+    refresh: bool = Query(False, description="Ignore stored results and re-analyze from YouTube"),
+    target_margin: Optional[float] = Query(None, gt=0.0, le=0.25, description="Stop once every sentiment ratio "
+                                           "is within ± this margin (95% confidence); percentage becomes the upper bound"),
 ):
     """
     Analyze a YouTube video's comments and return sentiment results with visualizations.
     This is a blocking call — use the /stream endpoint for progress updates.
     """
     try:
-        _check_quota_or_raise()
+        user_ip, session_id = _client_identity(request)
+        _check_quota_or_raise(user_ip, session_id)
+        selected = _parse_include(include)
         video_id = extract_video_id(video_input)
         logger.info(f"🎯 Direct analyze: {video_id} @ {percentage*100:.0f}%")
 
         loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, _run_analysis, video_id, percentage, None)
-
-        if save_to_db:
-            _try_save_to_db(result)
+        result = await loop.run_in_executor(
+            None, _run_analysis, video_id, percentage, None, selected, save_to_db, not refresh, target_margin
+        )
+        _record_quota_usage(result, user_ip, session_id)
 
         return AnalyzeOut(**result)
 
@@ -372,18 +1273,135 @@ async def analyze_video_with_visualization(
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+# ── Batch analyze endpoint ────────────────────────────────────────────────────
+@app.post("/api/analyze/batch", response_model=BatchAnalyzeOut)
+async def analyze_batch(request: Request, body: BatchAnalyzeRequest):
+    """
+    Analyze several videos (IDs or URLs) in one call: concurrent fetches, one
+    shared inference queue, per-video results plus an aggregate. Quota is
+    checked once up front and charged once for the whole batch.
+    """
+    if len(body.videos) > settings.BATCH_MAX_VIDEOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_VIDEOS} videos per batch.",
+        )
+
+    user_ip, session_id = _client_identity(request)
+    _check_quota_or_raise(user_ip, session_id)
+    selected = _parse_include(body.include)
+
+    video_ids: List[str] = []
+    invalid: List[Dict[str, str]] = []
+    for video_input in body.videos:
+        try:
+            video_id = extract_video_id(video_input)
+        except ValueError as e:
+            invalid.append({"video_id": video_input, "detail": str(e)})
+            continue
+        if video_id not in video_ids:
+            video_ids.append(video_id)
+
+    logger.info(f"📦 Batch analyze: {len(video_ids)} videos @ {body.percentage*100:.0f}%")
+    try:
+        loop = asyncio.get_event_loop()
+        batch = await loop.run_in_executor(
+            None, _run_batch_analysis, video_ids, body.percentage, selected, body.save_to_db, not body.refresh
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch analysis failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
+
+    batch["errors"] = invalid + batch["errors"]
+    _record_batch_quota_usage(batch, user_ip, session_id)
+    return BatchAnalyzeOut(**batch)
+
+
+# ── Channel endpoints ─────────────────────────────────────────────────────────
+@app.get("/api/analyze/channel/{channel_input:path}")
+async def analyze_channel(
+    request: Request,
+    channel_input: str,
+    max_videos: int = Query(10, ge=1, description="Most recent uploads to crawl (capped by CHANNEL_MAX_VIDEOS)"),
+):
+    """
+    Analyze a channel's recent uploads (channel ID, @handle or channel URL).
+    Refreshing only fetches and scores comments newer than the last crawl.
+    """
+    # Crawl state lives in the database: without it nothing could be saved
+    if not settings.DATABASE_URL:
+        raise HTTPException(status_code=503, detail="Channel analysis requires the database.")
+    user_ip, session_id = _client_identity(request)
+    _check_quota_or_raise(user_ip, session_id)
+    try:
+        extract_channel_ref(channel_input)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    max_videos = min(max_videos, settings.CHANNEL_MAX_VIDEOS)
+    logger.info(f"📺 Channel analyze: {channel_input} (last {max_videos} uploads)")
+    try:
+        loop = asyncio.get_event_loop()
+        result = await loop.run_in_executor(None, _run_channel_analysis, channel_input, max_videos)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Channel analysis failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Channel analysis failed: {str(e)}")
+
+    _charge_quota(result["quota_units"], user_ip, session_id, "analyze_channel", {
+        "channel_id": result["channel_id"],
+        "videos": result["videos_crawled"],
+        "new_comments": result["new_comments"],
+    })
+    return result
+
+
+@app.get("/api/channels/{channel_input:path}")
+async def get_channel_summary(channel_input: str):
+    """Stored aggregate of a previously analyzed channel (no YouTube calls)."""
+    try:
+        extract_channel_ref(channel_input)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        from backend.db.session import run_db
+
+        stored = await run_db(_load_channel_summary, channel_input)
+    except Exception as e:
+        logger.warning(f"Channel summary unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Channel data requires the database.")
+
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Channel not analyzed yet.")
+    return stored
+
+
 # ── SSE streaming endpoint — with step-by-step progress ───────────────────────
 @app.get("/api/analyze/video/{video_input}/stream")
 async def analyze_video_stream(
+    request: Request,
     video_input: str,
     percentage: float = Query(0.5, ge=0.25, le=1.0),
+    include: Optional[str] = Query(None, description="Comma-separated artifacts to compute now: "
+                                                     "wordcloud, pie_chart, bar_chart, top_keywords, all, none"),
+    refresh: bool = Query(False, description="Ignore stored results and re-analyze from YouTube"),
+    target_margin: Optional[float] = Query(None, gt=0.0, le=0.25, description="Stop once every sentiment ratio "
+                                           "is within ± this margin (95% confidence); percentage becomes the upper bound"),
 ):
     """
     Stream analysis progress as Server-Sent Events (SSE).
     Sends progress updates, then the final result.
     """
     try:
-        _check_quota_or_raise()
+        user_ip, session_id = _client_identity(request)
+        _check_quota_or_raise(user_ip, session_id)
+        selected = _parse_include(include)
         video_id = extract_video_id(video_input)
     except HTTPException:
         raise
@@ -402,8 +1420,11 @@ async def analyze_video_stream(
     def _run_in_thread():
         """Run full analysis pipeline in a thread."""
         try:
-            result = _run_analysis(video_id, percentage, _progress)
-            _try_save_to_db(result)  # Record result and quota usage to database
+            # Results and quota usage are recorded to the database in the background
+            result = _run_analysis(
+                video_id, percentage, _progress, selected, True, not refresh, target_margin
+            )
+            _record_quota_usage(result, user_ip, session_id)
             loop.call_soon_threadsafe(
                 progress_queue.put_nowait, {"done": True, "result": result}
             )
@@ -452,6 +1473,110 @@ async def analyze_video_stream(
     )
 
 
+# ── On-demand chart endpoint ──────────────────────────────────────────────────
+@app.get("/api/analyze/video/{video_input}/charts/{chart}")
+async def get_chart(
+    video_input: str,
+    chart: str,
+    percentage: float = Query(0.5, ge=0.25, le=1.0),
+):
+    """
+    Render (or return the memoized) chart of a previous analysis.
+    Pair with include= on the analyze endpoints to skip rendering up front.
+    """
+    if chart not in CHART_ARTIFACTS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown chart '{chart}'. Available: {', '.join(CHART_ARTIFACTS)}",
+        )
+    try:
+        video_id = extract_video_id(video_input)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        loop = asyncio.get_event_loop()
+        image = await loop.run_in_executor(None, _render_stored_chart, video_id, percentage, chart)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail="No analysis found for this video and percentage. Run an analysis first.",
+        )
+
+    return {"video_id": video_id, "chart": chart, "image_base64": image}
+
+
+# ── Trend endpoint ────────────────────────────────────────────────────────────
+def _load_trend(video_id: str, model_name: Optional[str], days: Optional[int]):
+    from backend.db.session import get_session
+    from backend.db.repository import daily_sentiment_series
+    from datetime import date
+
+    since = date.today() - timedelta(days=days - 1) if days else None
+    with get_session() as db:
+        return daily_sentiment_series(db, video_id, model_name, since)
+
+
+@app.get("/api/videos/{video_input}/trend")
+async def get_video_trend(
+    video_input: str,
+    model_name: Optional[str] = Query(None, description="One model's predictions only; default: each comment's served prediction"),
+    days: Optional[int] = Query(None, ge=1, le=3650, description="Only the last N days (by comment publish date)"),
+):
+    """
+    Daily sentiment time series of a stored video, served from the
+    sentiment_daily rollups (kept current whenever predictions are saved).
+    """
+    try:
+        video_id = extract_video_id(video_input)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        from backend.db.session import run_db
+
+        model, series = await run_db(_load_trend, video_id, model_name, days)
+    except Exception as e:
+        logger.warning(f"Trend unavailable because database is not available: {e}")
+        raise HTTPException(status_code=503, detail="Trend data requires the database.")
+
+    if model is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No stored predictions for this video. Run an analysis first.",
+        )
+
+    return {"video_id": video_id, "model_name": model, "days": len(series), "series": series}
+
+
+# ── Raw comment payload ───────────────────────────────────────────────────────
+def _load_raw_payload(comment_id: str) -> Optional[Dict[str, Any]]:
+    from backend.db.session import get_session
+    from backend.db.raw_store import load_raw_payload
+
+    with get_session() as db:
+        return load_raw_payload(db, comment_id)
+
+
+@app.get("/api/comments/{comment_id}/raw")
+async def get_comment_raw(comment_id: str):
+    """Full YouTube API object of a stored comment, decompressed on request."""
+    try:
+        from backend.db.session import run_db
+
+        payload = await run_db(_load_raw_payload, comment_id)
+    except Exception as e:
+        logger.warning(f"Raw payload unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Raw payloads require the database.")
+
+    if payload is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No raw payload stored for this comment (never saved or pruned).",
+        )
+    return {"comment_id": comment_id, "raw_json": payload}
+
+
 # ── Predict endpoint ──────────────────────────────────────────────────────────
 @app.post("/api/predict", response_model=PredictResponse)
 def predict_sentiment(body: PredictRequest):
@@ -471,63 +1596,98 @@ def predict_sentiment(body: PredictRequest):
     return PredictResponse(results=[PredictResult(**r) for r in results])
 
 
+@app.get("/api/model/cascade")
+def cascade_status():
+    """
+    Cascade configuration, the first stage's offline agreement report (from
+    training) and live routing / audit counters since startup.
+    """
+    svc = _sentiment_service
+    first_stage = svc.first_stage if svc is not None else None
+    return {
+        "enabled": first_stage is not None,
+        "model_path": settings.CASCADE_MODEL_PATH or None,
+        "confidence_gate": settings.CASCADE_CONFIDENCE_GATE,
+        "audit_rate": settings.CASCADE_AUDIT_RATE,
+        "full_model": svc.model_name if svc is not None else None,
+        "first_stage": first_stage.meta if first_stage is not None else None,
+        "live": svc.cascade_stats.report() if svc is not None else None,
+    }
+
+
 # ── Download CSV endpoint ─────────────────────────────────────────────────────
 @app.get("/api/analyze/video/{video_input}/download")
 async def download_csv(
+    request: Request,
     video_input: str,
     percentage: float = Query(0.5, ge=0.25, le=1.0),
 ):
     """Run analysis (or fetch from memory cache) and return all analyzed results as a downloadable CSV file."""
     try:
-        _check_quota_or_raise()
+        user_ip, session_id = _client_identity(request)
+        _check_quota_or_raise(user_ip, session_id)
         video_id = extract_video_id(video_input)
         
-        global _last_analysis_cache
-        if (_last_analysis_cache.get("video_id") == video_id 
-            and _last_analysis_cache.get("percentage") == percentage 
-            and _last_analysis_cache.get("comments")):
+        comments_to_write: List[Dict[str, Any]] = []
+        csv_path: Optional[str] = None
+        cached = _last_analysis_cache
+        if (cached.get("video_id") == video_id
+            and cached.get("percentage") == percentage
+            and (cached.get("comments") or cached.get("csv_path"))):
             logger.info(f"🚀 CSV Download: Cache HIT for video {video_id}")
-            comments_to_write = _last_analysis_cache["comments"]
+            comments_to_write = cached.get("comments") or []
+            csv_path = cached.get("csv_path")
         else:
             logger.info(f"⚠️ CSV Download: Cache MISS for video {video_id}. Re-running analysis...")
             loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, _run_analysis, video_id, percentage, None)
-            _try_save_to_db(result)
-            comments_to_write = _last_analysis_cache.get("comments", [])
-            
+            # The CSV never shows charts — skip rendering, they stay available on demand
+            result = await loop.run_in_executor(
+                None, _run_analysis, video_id, percentage, None, set(), True
+            )
+            _record_quota_usage(result, user_ip, session_id)
+            if result.get("data_source") == "database":
+                from backend.db.session import run_db
+                comments_to_write = await run_db(_load_stored_comments, video_id, percentage)
+            else:
+                comments_to_write = _last_analysis_cache.get("comments") or []
+                csv_path = _last_analysis_cache.get("csv_path")
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to generate CSV: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    filename = f"sentiment_{video_id}_{int(percentage*100)}pct.csv"
+
+    # Streaming analyses already spilled their rows to disk — stream the file
+    if csv_path:
+        try:
+            spilled = open(csv_path, "r", encoding="utf-8", newline="")
+        except FileNotFoundError:
+            raise HTTPException(status_code=410, detail="Analysis export expired. Please re-run the analysis.")
+
+        def _file_chunks():
+            with spilled:
+                while True:
+                    block = spilled.read(_CSV_READ_BLOCK)
+                    if not block:
+                        break
+                    yield block
+
+        return StreamingResponse(
+            _file_chunks(),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
     # Build CSV
     output = io.StringIO()
     writer = csv.writer(output)
-    writer.writerow([
-        "author", "text", "like_count", "is_reply",
-        "published_at", "sentiment", "confidence",
-        "score_positive", "score_neutral", "score_negative",
-    ])
-    
-    for c in comments_to_write:
-        pred = c.get("prediction", {})
-        scores = pred.get("scores", {})
-        writer.writerow([
-            c.get("author", ""),
-            c.get("text", "").replace("\n", " "),
-            c.get("like_count", 0),
-            c.get("is_reply", False),
-            c.get("published_at", ""),
-            pred.get("label", ""),
-            round(pred.get("confidence", 0), 4),
-            round(scores.get("positive", 0), 4),
-            round(scores.get("neutral", 0), 4),
-            round(scores.get("negative", 0), 4),
-        ])
+    writer.writerow(CSV_HEADER)
+    writer.writerows(csv_row(c) for c in comments_to_write)
 
     output.seek(0)
-    filename = f"sentiment_{video_id}_{int(percentage*100)}pct.csv"
     return StreamingResponse(
         iter([output.getvalue()]),
         media_type="text/csv",
@@ -537,22 +1697,10 @@ async def download_csv(
 
 # ── Quota endpoint ────────────────────────────────────────────────────────────
 @app.get("/api/quota")
-def get_quota():
-    """YouTube API quota status (tracks via DB if available, else static estimate)."""
-    try:
-        from backend.db.session import get_db
-        from sqlalchemy import func
-        from backend.db.models import QuotaUsage
-        from datetime import date
-
-        db = next(get_db())
-        today = date.today()
-        used = db.query(func.sum(QuotaUsage.units_used)).filter(
-            QuotaUsage.date == today
-        ).scalar() or 0
-        db.close()
-    except Exception:
-        used = 0  # DB not available — show 0 usage
+def get_quota(request: Request):
+    """YouTube API quota status, answered from the in-memory quota ledger."""
+    user_ip, session_id = _client_identity(request)
+    used, ip_used, session_used = quota_ledger.usage(user_ip, session_id)
 
     daily_limit = settings.DAILY_QUOTA_LIMIT
     remaining = max(0, daily_limit - used)
@@ -576,76 +1724,101 @@ def get_quota():
         "comments_remaining": remaining * 100,
         "videos_remaining": remaining // 2,
         "last_updated": datetime.now(timezone.utc).isoformat(),
+        "client": {
+            "ip_used": ip_used,
+            "ip_limit": settings.QUOTA_PER_IP_LIMIT or None,
+            "session_used": session_used,
+            "session_limit": settings.QUOTA_PER_SESSION_LIMIT or None,
+        },
     }
 
 
+@app.get("/api/quota/youtube")
+def get_youtube_rate():
+    """
+    This process' YouTube API pacing and unit budget: configured and current
+    call rate, calls waiting per job, throttling seen, units spent and
+    reserved today, and the page cache's hit rate and size (if enabled).
+    """
+    metrics = youtube_metrics()
+    metrics["cache"] = youtube_cache.metrics() if youtube_cache is not None else None
+    return metrics
+
+
 # ─── Optional: save to DB ────────────────────────────────────────────────────
-def _try_save_to_db(result: Dict) -> None:
-    """Attempt to save analysis results to DB. Silently skips if DB unavailable."""
+def _try_save_to_db(
+    result: Dict,
+    analyzed: List[Dict[str, Any]],
+    raw_payloads: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> None:
+    """
+    Attempt to save analysis results to DB. Silently skips if DB unavailable.
+    Every analyzed comment and prediction is written with batched upserts;
+    raw YouTube payloads are stored compressed per RAW_JSON_STORAGE.
+    """
     try:
         from backend.db.session import get_session
-        from backend.db.models import Video, Comment, Prediction, QuotaUsage
-        from datetime import date
+        from backend.db.repository import bulk_save_analysis
 
+        started = time.time()
         with get_session() as db:
-            # Upsert video
-            video = db.query(Video).filter_by(video_id=result["video_id"]).first()
-            if not video:
-                video = Video(
-                    video_id=result["video_id"],
-                    title=result["video_title"],
-                    channel_title=result["channel_title"],
-                )
-                db.add(video)
-                db.flush()
-
-            # Save example comments + predictions
-            for ex in result.get("examples", []):
-                # Skip if already exists
-                existing = db.query(Comment).filter_by(
-                    comment_id=ex.get("text", "")[:64]
-                ).first()
-                if existing:
-                    continue
-
-                comment = Comment(
-                    video_pk=video.id,
-                    comment_id=str(hash(ex.get("text", ""))),
-                    author=ex.get("author", ""),
-                    text=ex.get("text", ""),
-                    like_count=ex.get("like_count", 0),
-                    is_reply=ex.get("is_reply", False),
-                    commented_at=ex.get("published_at", ""),
-                )
-                db.add(comment)
-                db.flush()
-
-                pred = ex.get("prediction", {})
-                scores = pred.get("scores", {})
-                prediction = Prediction(
-                    comment_pk=comment.id,
-                    label=pred.get("label", "neutral"),
-                    confidence=pred.get("confidence", 0.0),
-                    positive_score=scores.get("positive", 0.0),
-                    neutral_score=scores.get("neutral", 0.0),
-                    negative_score=scores.get("negative", 0.0),
-                )
-                db.add(prediction)
-
-            # Calculate estimated YouTube API quota units used:
-            # 1 unit for video metadata list + 1 unit per 100 comments/replies fetched
-            actual_analyzed = result.get("actual_analyzed", 0)
-            units_used = 1 + max(1, (actual_analyzed + 99) // 100)
-
-            # Record quota usage
-            usage = QuotaUsage(
-                date=date.today(),
-                operation_type="analyze",
-                units_used=units_used,
-                video_id=result["video_id"],
-                meta_data={"percentage": result.get("percentage_analyzed")},
-            )
-            db.add(usage)
+            saved = bulk_save_analysis(db, result, analyzed, raw_payloads)
+        logger.info(f"💾 Saved {saved:,} comments for {result['video_id']} in {time.time() - started:.2f}s")
 
     except Exception as e:
         logger.warning(f"DB save skipped: {e}")
+
+
+def _try_save_chunk(
+    video: Dict[str, Any],
+    analyzed: List[Dict[str, Any]],
+    raw_payloads: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> None:
+    """Persist one chunk of a streaming analysis. Silently skips if DB unavailable."""
+    try:
+        from backend.db.session import get_session
+        from backend.db.repository import bulk_save_comments
+
+        with get_session() as db:
+            bulk_save_comments(db, video, analyzed, raw_payloads)
+    except Exception as e:
+        logger.warning(f"DB save skipped for chunk of {video['video_id']}: {e}")
+
+
+def _try_record_run(result: Dict[str, Any], model_name: Optional[str]) -> None:
+    """Record a finished streaming analysis once all its chunks are persisted."""
+    try:
+        from backend.db.session import get_session
+        from backend.db.repository import record_analysis_run, upsert_video
+
+        with get_session() as db:
+            video_pk = upsert_video(db, result["video_id"], result["video_title"], result["channel_title"])
+            record_analysis_run(db, video_pk, result, model_name=model_name)
+        logger.info(f"💾 Saved streamed analysis of {result['video_id']} ({result['actual_analyzed']:,} comments)")
+    except Exception as e:
+        logger.warning(f"DB save skipped: {e}")
+
+
+# ─── Raw payload retention ────────────────────────────────────────────────────
+_RAW_PRUNE_INTERVAL_SECONDS = 6 * 3600
+
+
+def _prune_raw_payloads() -> None:
+    from backend.db.session import get_session
+    from backend.db.raw_store import prune_raw_payloads
+
+    with get_session() as db:
+        pruned = prune_raw_payloads(db, settings.RAW_JSON_RETENTION_DAYS)
+    if pruned:
+        logger.info(f"🧹 Pruned {pruned:,} raw payloads older than {settings.RAW_JSON_RETENTION_DAYS} days")
+
+
+async def _raw_payload_retention_loop() -> None:
+    from backend.db.session import run_db
+
+    while True:
+        try:
+            await run_db(_prune_raw_payloads)
+        except Exception as e:
+            logger.warning(f"Raw payload pruning skipped: {e}")
+        await asyncio.sleep(_RAW_PRUNE_INTERVAL_SECONDS)
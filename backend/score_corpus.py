@@ -0,0 +1,353 @@
+"""
+Offline batch scoring for large local comment corpora.
+
+Streams a JSONL, CSV or Parquet file through SentimentService in chunks and
+appends predictions to a JSONL or CSV file as it goes. A checkpoint next to
+the output records how far it got, so an interrupted run continues with
+--resume instead of starting over. Falls back to the rule-based model when
+the transformer model cannot be loaded (or with --rule-based).
+
+Run from the project root:
+    python -m backend.score_corpus comments.jsonl scored.jsonl
+    python -m backend.score_corpus archive.parquet scored.csv --workers 2
+    python -m backend.score_corpus archive.csv scored.jsonl --resume
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backend.core.config import get_settings
+from backend.services.lexicon import RULE_BASED_MODEL, rule_based_sentiment
+
+logger = logging.getLogger("score_corpus")
+
+INPUT_FORMATS = ("jsonl", "csv", "parquet")
+OUTPUT_FORMATS = ("jsonl", "csv")
+SCORE_FIELDS = ["label", "confidence", "negative", "neutral", "positive", "model_name"]
+
+
+def _detect_format(path: str, allowed: Sequence[str]) -> str:
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    fmt = {"json": "jsonl", "ndjson": "jsonl", "pq": "parquet"}.get(ext, ext)
+    if fmt not in allowed:
+        raise ValueError(f"Cannot tell the format of '{path}'; expected one of: {', '.join(allowed)}")
+    return fmt
+
+
+# ─── Input ────────────────────────────────────────────────────────────────────
+
+def _iter_jsonl(path: str) -> Iterator[Optional[Dict[str, Any]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Line {lineno}: invalid JSON skipped ({e})")
+                record = None
+            yield record if isinstance(record, dict) else None
+
+
+def _iter_csv(path: str) -> Iterator[Optional[Dict[str, Any]]]:
+    csv.field_size_limit(sys.maxsize)
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def _iter_parquet(path: str, batch_rows: int) -> Iterator[Optional[Dict[str, Any]]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Reading Parquet needs pyarrow: pip install pyarrow")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+        yield from batch.to_pylist()
+
+
+def iter_chunks(
+    path: str,
+    fmt: str,
+    chunk_size: int,
+    skip: int = 0,
+) -> Iterator[List[Optional[Dict[str, Any]]]]:
+    """Records in lists of ``chunk_size``, after skipping the first ``skip``. Bad records are None."""
+    if fmt == "jsonl":
+        records = _iter_jsonl(path)
+    elif fmt == "csv":
+        records = _iter_csv(path)
+    else:
+        records = _iter_parquet(path, chunk_size)
+
+    chunk: List[Optional[Dict[str, Any]]] = []
+    for i, record in enumerate(records):
+        if i < skip:
+            continue
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ─── Scoring ──────────────────────────────────────────────────────────────────
+
+class Scorer:
+    """SentimentService (or the rule-based fallback) with a batch strategy."""
+
+    def __init__(self, use_model: bool, batch_size: int, max_len: int, strategy: str):
+        self.batch_size = batch_size
+        self.max_len = max_len
+        self.strategy = strategy
+        self.svc = None
+        if use_model:
+            try:
+                from backend.services.sentiment import SentimentService  # imports torch
+                self.svc = SentimentService.get()
+            except Exception as e:
+                logger.warning(f"Model unavailable, scoring with the rule-based fallback: {e}")
+        self.model_name = self.svc.model_name if self.svc is not None else RULE_BASED_MODEL
+
+    def score(self, texts: List[str]) -> List[Dict[str, Any]]:
+        if self.svc is None:
+            return [rule_based_sentiment(t) for t in texts]
+        # "length": the service batches similar token lengths so padding stays small
+        return self.svc.predict(
+            texts, max_len=self.max_len, batch_size=self.batch_size, bucket=self.strategy == "length"
+        )
+
+
+_worker_scorer: Optional[Scorer] = None
+
+
+def _init_worker(use_model: bool, batch_size: int, max_len: int, strategy: str, threads: int) -> None:
+    global _worker_scorer
+    if use_model:
+        import torch
+        torch.set_num_threads(threads)
+    _worker_scorer = Scorer(use_model, batch_size, max_len, strategy)
+
+
+def _score_in_worker(texts: List[str]) -> Tuple[List[Dict[str, Any]], str]:
+    return _worker_scorer.score(texts), _worker_scorer.model_name
+
+
+# ─── Output and checkpoint ────────────────────────────────────────────────────
+
+class OutputWriter:
+    """Appends scored rows; truncates to the checkpointed size when resuming."""
+
+    def __init__(self, path: str, fmt: str, fields: List[str], resume_bytes: Optional[int]):
+        self.fmt = fmt
+        self.fields = fields
+        if resume_bytes is not None and os.path.exists(path):
+            self.f = open(path, "r+", encoding="utf-8", newline="")
+            self.f.truncate(resume_bytes)  # drop rows written after the last checkpoint
+            self.f.seek(resume_bytes)
+        else:
+            self.f = open(path, "w", encoding="utf-8", newline="")
+        self.csv = csv.DictWriter(self.f, fieldnames=fields, extrasaction="ignore") if fmt == "csv" else None
+        if self.csv is not None and self.f.tell() == 0:
+            self.csv.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if self.csv is not None:
+            self.csv.writerows(rows)
+        else:
+            self.f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+    def commit(self) -> int:
+        """Flush to disk and return the byte offset a checkpoint can point at."""
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return self.f.tell()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def _load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+
+def _rows_for(
+    chunk: List[Optional[Dict[str, Any]]],
+    preds: List[Dict[str, Any]],
+    model_name: str,
+    keep_fields: List[str],
+) -> List[Dict[str, Any]]:
+    rows = []
+    it = iter(preds)
+    for record in chunk:
+        if record is None:
+            continue
+        pred = next(it)
+        row = {k: record.get(k) for k in keep_fields}
+        row.update({
+            "label": pred["label"],
+            "confidence": round(pred["confidence"], 6),
+            **{k: round(v, 6) for k, v in pred["scores"].items()},
+            "model_name": model_name,
+        })
+        rows.append(row)
+    return rows
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    in_fmt = args.format if args.format != "auto" else _detect_format(args.input, INPUT_FORMATS)
+    out_fmt = _detect_format(args.output, OUTPUT_FORMATS)
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint.json"
+    keep_fields = [f for f in ([args.id_field] + args.keep_fields.split(",")) if f]
+    keep_fields = list(dict.fromkeys(keep_fields))
+
+    state = {
+        "input": os.path.abspath(args.input),
+        "input_size": os.path.getsize(args.input),
+        "output": os.path.abspath(args.output),
+        "records_done": 0,
+        "rows_written": 0,
+        "output_bytes": 0,
+    }
+    resume_bytes = None
+    if args.resume:
+        saved = _load_checkpoint(checkpoint_path)
+        if saved is None:
+            logger.info("No checkpoint found — starting from the beginning")
+        elif (saved["input"], saved["input_size"]) != (state["input"], state["input_size"]):
+            raise SystemExit(f"Checkpoint {checkpoint_path} belongs to a different input; remove it or drop --resume")
+        else:
+            state.update(saved)
+            resume_bytes = saved["output_bytes"]
+            logger.info(f"Resuming after {state['records_done']:,} records")
+    elif os.path.exists(args.output):
+        raise SystemExit(f"{args.output} exists; pass --resume to continue it or remove it first")
+
+    writer = OutputWriter(args.output, out_fmt, keep_fields + SCORE_FIELDS, resume_bytes)
+    use_model = not args.rule_based
+    scorer: Optional[Scorer] = None
+    pool: Optional[ProcessPoolExecutor] = None
+    if args.workers > 1:
+        import multiprocessing as mp
+        threads = max(1, (os.cpu_count() or 1) // args.workers)
+        pool = ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(use_model, args.batch_size, args.max_len, args.batch_strategy, threads),
+        )
+    else:
+        scorer = Scorer(use_model, args.batch_size, args.max_len, args.batch_strategy)
+
+    labels: Counter = Counter()
+    started = time.perf_counter()
+    scored_this_run = 0
+    in_flight: "deque[Tuple[List[Optional[Dict[str, Any]]], Future]]" = deque()
+
+    def _texts(chunk):
+        return [str(r.get(args.text_field) or "") for r in chunk if r is not None]
+
+    def _finish(chunk, preds, model_name):
+        nonlocal scored_this_run
+        rows = _rows_for(chunk, preds, model_name, keep_fields)
+        writer.write(rows)
+        labels.update(r["label"] for r in rows)
+        scored_this_run += len(rows)
+        state["records_done"] += len(chunk)
+        state["rows_written"] += len(rows)
+        state["output_bytes"] = writer.commit()
+        state["model_name"] = model_name
+        state["updated_at"] = datetime.now(timezone.utc).isoformat()
+        _save_checkpoint(checkpoint_path, state)
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"{state['records_done']:,} records done | {scored_this_run / elapsed:,.1f} comments/s "
+            f"| {elapsed:,.0f}s elapsed"
+        )
+
+    try:
+        for chunk in iter_chunks(args.input, in_fmt, args.chunk_size, skip=state["records_done"]):
+            if pool is None:
+                _finish(chunk, scorer.score(_texts(chunk)), scorer.model_name)
+                continue
+            in_flight.append((chunk, pool.submit(_score_in_worker, _texts(chunk))))
+            # Keep every worker busy, but write chunks back in input order
+            while len(in_flight) > args.workers:
+                done_chunk, future = in_flight.popleft()
+                _finish(done_chunk, *future.result())
+        while in_flight:
+            done_chunk, future = in_flight.popleft()
+            _finish(done_chunk, *future.result())
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "records_done": state["records_done"],
+        "scored_this_run": scored_this_run,
+        "seconds": round(elapsed, 2),
+        "comments_per_second": round(scored_this_run / elapsed, 1) if elapsed > 0 else 0.0,
+        "labels": dict(labels),
+        "model_name": state.get("model_name"),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    settings = get_settings()
+    p = argparse.ArgumentParser(
+        prog="python -m backend.score_corpus",
+        description="Score a local JSONL/CSV/Parquet corpus of comments with the sentiment model.",
+    )
+    p.add_argument("input", help="Comments file (.jsonl, .csv or .parquet)")
+    p.add_argument("output", help="Predictions file (.jsonl or .csv), written incrementally")
+    p.add_argument("--format", choices=("auto",) + INPUT_FORMATS, default="auto", help="Input format (default: from extension)")
+    p.add_argument("--text-field", default="text", help="Field holding the comment text (default: text)")
+    p.add_argument("--id-field", default="comment_id", help="Field copied to the output to join on (default: comment_id)")
+    p.add_argument("--keep-fields", default="", help="Extra comma-separated input fields to copy to the output")
+    p.add_argument("--chunk-size", type=int, default=2000, help="Records read, scored and checkpointed together")
+    p.add_argument("--batch-size", type=int, default=settings.BATCH_SIZE, help="Model batch size")
+    p.add_argument("--max-len", type=int, default=settings.MAX_TEXT_LENGTH, help="Max tokens per comment (per window with LONG_TEXT_MODE=window)")
+    p.add_argument("--batch-strategy", choices=("length", "fixed"), default="length",
+                   help="length: batch similar-length comments to cut padding; fixed: input order")
+    p.add_argument("--workers", type=int, default=1, help="Scoring processes (each loads its own model copy)")
+    p.add_argument("--rule-based", action="store_true", help="Skip the model and use the keyword fallback")
+    p.add_argument("--checkpoint", default=None, help="Checkpoint path (default: OUTPUT.checkpoint.json)")
+    p.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted run")
+    return p
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", datefmt="%H:%M:%S")
+    args = build_parser().parse_args(argv)
+    if args.workers < 1 or args.chunk_size < 1 or args.batch_size < 1:
+        raise SystemExit("--workers, --chunk-size and --batch-size must be positive")
+
+    summary = run(args)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# backend/services/cascade.py - Cheap first-stage sentiment model for the cascade
+from __future__ import annotations
+
+import json
+import re
+import threading
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LABELS = ["negative", "neutral", "positive"]  # SentimentService's class order
+
+CASCADE_MODEL = "cascade-ngram"
+DEFAULT_HASH_BITS = 18
+
+# Words (any script) and single non-space symbols, so emoji and "!!!" count
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _features(text: str, mask: int) -> List[int]:
+    """Hashed word unigrams and bigrams of one text (crc32: stable across processes)."""
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not grams:
+        grams = ["<empty>"]
+    return sorted({zlib.crc32(g.encode("utf-8")) & mask for g in grams})
+
+
+def featurize(texts: Sequence[str], hash_bits: int) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR-style (indices, indptr) of hashed binary features; every row is non-empty."""
+    mask = (1 << hash_bits) - 1
+    rows = [_features(t, mask) for t in texts]
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in rows], out=indptr[1:])
+    indices = np.fromiter((f for r in rows for f in r), dtype=np.int64, count=int(indptr[-1]))
+    return indices, indptr
+
+
+class HashedNgramModel:
+    """
+    Softmax regression over hashed word n-grams, distilled from the
+    transformer's stored scores. Scoring is a handful of numpy gathers per
+    batch, so it costs microseconds per comment instead of a forward pass.
+    """
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, meta: Optional[Dict[str, Any]] = None):
+        self.weights = weights.astype(np.float32, copy=False)
+        self.bias = bias.astype(np.float32, copy=False)
+        self.meta = dict(meta or {})
+        self.hash_bits = int(np.log2(len(self.weights)))
+        self.model_name = self.meta.get("name", CASCADE_MODEL)
+
+    @classmethod
+    def zeros(cls, hash_bits: int = DEFAULT_HASH_BITS, **meta) -> "HashedNgramModel":
+        return cls(np.zeros((1 << hash_bits, len(LABELS)), np.float32), np.zeros(len(LABELS), np.float32), meta)
+
+    # ── Inference ────────────────────────────────────────────────────────────
+    def _logits(self, indices: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+        lengths = np.diff(indptr)
+        sums = np.add.reduceat(self.weights[indices], indptr[:-1], axis=0)
+        return sums / np.sqrt(lengths)[:, None] + self.bias
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), 3) probabilities in LABELS order."""
+        if not len(texts):
+            return np.zeros((0, len(LABELS)), np.float32)
+        return _softmax(self._logits(*featurize(texts, self.hash_bits)))
+
+    def predict(self, texts: Sequence[str], neutral_threshold: float = 0.5) -> List[Dict[str, Any]]:
+        """Predictions in SentimentService.predict's format (same neutral threshold rule)."""
+        out = []
+        for prob in self.predict_proba(texts):
+            pred_id = 1 if prob[1] >= neutral_threshold else int(np.argmax(prob))
+            out.append({
+                "label": LABELS[pred_id],
+                "confidence": float(prob[pred_id]),
+                "scores": {"negative": float(prob[0]), "neutral": float(prob[1]), "positive": float(prob[2])},
+            })
+        return out
+
+    # ── Training ─────────────────────────────────────────────────────────────
+    def fit(
+        self,
+        texts: Sequence[str],
+        targets: np.ndarray,
+        epochs: int = 4,
+        batch_size: int = 256,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        seed: int = 0,
+    ) -> "HashedNgramModel":
+        """
+        Fit to soft ``targets`` (n, 3) — the teacher's probabilities — with
+        mini-batch Adagrad on the cross-entropy. Only the weight rows a batch
+        touches are updated.
+        """
+        indices, indptr = featurize(texts, self.hash_bits)
+        targets = np.asarray(targets, dtype=np.float32)
+        g2_w = np.zeros_like(self.weights)
+        g2_b = np.zeros_like(self.bias)
+        rng = np.random.default_rng(seed)
+        n = len(texts)
+        for _ in range(epochs):
+            order = rng.permutation(n)
+            for start in range(0, n, batch_size):
+                rows = order[start:start + batch_size]
+                b_idx, b_ptr = _take_rows(indices, indptr, rows)
+                lengths = np.diff(b_ptr)
+                scale = (1.0 / np.sqrt(lengths)).astype(np.float32)
+
+                probs = _softmax(self._logits(b_idx, b_ptr))
+                grad = (probs - targets[rows]) / len(rows)                       # (batch, 3)
+                row_of = np.repeat(np.arange(len(rows)), lengths)
+                grad_w = (grad[row_of] * scale[row_of, None]).astype(np.float32)
+
+                touched, inverse = np.unique(b_idx, return_inverse=True)
+                g = np.zeros((len(touched), len(LABELS)), np.float32)
+                np.add.at(g, inverse, grad_w)
+                g += l2 * self.weights[touched]
+                g2_w[touched] += g * g
+                self.weights[touched] -= learning_rate * g / (np.sqrt(g2_w[touched]) + 1e-8)
+
+                gb = grad.sum(axis=0)
+                g2_b += gb * gb
+                self.bias -= learning_rate * gb / (np.sqrt(g2_b) + 1e-8)
+        return self
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+    def save(self, path: str) -> None:
+        meta = dict(self.meta, name=self.model_name, saved_at=datetime.now(timezone.utc).isoformat())
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNgramModel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], data["bias"], json.loads(str(data["meta"])))
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    e = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def _take_rows(indices: np.ndarray, indptr: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    starts, ends = indptr[rows], indptr[rows + 1]
+    lengths = ends - starts
+    b_ptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=b_ptr[1:])
+    offsets = np.arange(b_ptr[-1]) - np.repeat(b_ptr[:-1], lengths)
+    return indices[np.repeat(starts, lengths) + offsets], b_ptr
+
+
+def agreement_report(
+    student: Sequence[Dict[str, Any]],
+    teacher_labels: Sequence[str],
+    gates: Sequence[float],
+) -> List[Dict[str, Any]]:
+    """
+    For each confidence gate: the share of comments the first stage would
+    label itself (coverage), how often those labels match the full model
+    (gated_agreement), and the agreement of the whole cascade's output with
+    running the full model on everything (cascade_agreement).
+    """
+    conf = np.array([p["confidence"] for p in student])
+    same = np.array([p["label"] == t for p, t in zip(student, teacher_labels)])
+    report = []
+    for gate in gates:
+        gated = conf >= gate
+        coverage = float(gated.mean()) if len(gated) else 0.0
+        gated_agreement = float(same[gated].mean()) if gated.any() else None
+        report.append({
+            "gate": gate,
+            "coverage": round(coverage, 4),
+            "gated_agreement": round(gated_agreement, 4) if gated_agreement is not None else None,
+            "cascade_agreement": round(1.0 - float((gated & ~same).mean()), 4) if len(same) else None,
+        })
+    return report
+
+
+class CascadeStats:
+    """Live cascade counters: routing volumes and audited agreement with the full model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.first_stage = 0
+        self.escalated = 0
+        self.audited = 0
+        self.audit_agreed = 0
+        self.audit_confusion: Counter = Counter()  # (first-stage label, full-model label) of disagreements
+
+    def record(self, first_stage: int, escalated: int, audits: Sequence[Tuple[str, str]] = ()) -> None:
+        with self._lock:
+            self.first_stage += first_stage
+            self.escalated += escalated
+            for mine, full in audits:
+                self.audited += 1
+                if mine == full:
+                    self.audit_agreed += 1
+                else:
+                    self.audit_confusion[(mine, full)] += 1
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.first_stage + self.escalated
+            return {
+                "comments": total,
+                "first_stage": self.first_stage,
+                "escalated": self.escalated,
+                "first_stage_share": round(self.first_stage / total, 4) if total else None,
+                "audited": self.audited,
+                "audit_agreement": round(self.audit_agreed / self.audited, 4) if self.audited else None,
+                "audit_disagreements": {f"{a}->{b}": n for (a, b), n in self.audit_confusion.most_common()},
+            }
@@ -0,0 +1,216 @@
+# backend/services/clustering.py - Topic clusters from the sentiment model's embeddings
+from __future__ import annotations
+
+import math
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.services.timeline import LABELS
+from backend.services.visualization import word_frequencies
+
+KEYWORDS_PER_TOPIC = 6
+EXAMPLES_PER_TOPIC = 3
+_ASSIGN_BLOCK = 4096  # rows scored against the centroids per matrix product
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest centroid by cosine similarity → (cluster, similarity) per row."""
+    labels = np.empty(len(x), dtype=np.int64)
+    sims = np.empty(len(x), dtype=np.float32)
+    for start in range(0, len(x), _ASSIGN_BLOCK):
+        s = x[start:start + _ASSIGN_BLOCK] @ centroids.T
+        labels[start:start + len(s)] = s.argmax(axis=1)
+        sims[start:start + len(s)] = s.max(axis=1)
+    return labels, sims
+
+
+def _kmeans_pp(x: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding on cosine distance."""
+    centroids = [x[rng.integers(len(x))]]
+    dist = 1.0 - x @ centroids[0]
+    for _ in range(1, k):
+        weights = np.maximum(dist, 0.0) ** 2
+        total = weights.sum()
+        idx = rng.choice(len(x), p=weights / total) if total > 0 else rng.integers(len(x))
+        centroids.append(x[idx])
+        dist = np.minimum(dist, 1.0 - x @ x[idx])
+    return np.stack(centroids)
+
+
+def _cluster_sums(x: np.ndarray, labels: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-cluster row sums and counts (one-hot matrix product, faster than np.add.at)."""
+    onehot = np.zeros((k, len(x)), dtype=x.dtype)
+    onehot[labels, np.arange(len(x))] = 1.0
+    return onehot @ x, onehot.sum(axis=1)
+
+
+def minibatch_kmeans(
+    x: np.ndarray,
+    k: int,
+    batch_size: int = 1024,
+    max_iter: int = 100,
+    refine_iter: int = 3,
+    n_init: int = 3,
+    tol: float = 1e-4,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Spherical mini-batch k-means (Sculley, 2010) on L2-normalized rows →
+    (centroids, cluster per row, cosine similarity to its centroid).
+    Each step moves the centroids toward a random batch with per-centroid
+    learning rates of 1 / (rows seen), so the cost per step is independent
+    of len(x). ``n_init`` k-means++ starts are run and the one with the
+    highest mean similarity kept, after ``refine_iter`` full-data updates.
+    """
+    x = _normalize(np.asarray(x, dtype=np.float32))
+    rng = np.random.default_rng(seed)
+    k = max(1, min(k, len(x)))
+    best = None
+    for _ in range(n_init):
+        seed_rows = x if len(x) <= 10 * batch_size else x[rng.choice(len(x), 10 * batch_size, replace=False)]
+        centroids = _kmeans_pp(seed_rows, k, rng)
+        seen = np.zeros(k, dtype=np.float32)
+
+        for _ in range(max_iter):
+            batch = x if len(x) <= batch_size else x[rng.choice(len(x), batch_size, replace=False)]
+            labels, _ = _assign(batch, centroids)
+            sums, hits = _cluster_sums(batch, labels, k)
+            seen += hits
+            moved = hits > 0
+            previous = centroids.copy()
+            centroids[moved] += (sums[moved] - hits[moved, None] * centroids[moved]) / seen[moved, None]
+            centroids = _normalize(centroids)
+            if float(np.abs(centroids - previous).max()) < tol:
+                break
+
+        # A few full passes settle the centroids the shrinking steps left short
+        for _ in range(refine_iter):
+            labels, _ = _assign(x, centroids)
+            sums, hits = _cluster_sums(x, labels, k)
+            centroids = np.where(hits[:, None] > 0, _normalize(sums), centroids)
+
+        labels, sims = _assign(x, centroids)
+        if best is None or sims.mean() > best[2].mean():
+            best = (centroids, labels, sims)
+    return best
+
+
+def _distinctive_keywords(texts_by_cluster: Sequence[Sequence[str]], top_n: int) -> List[List[str]]:
+    """Per cluster, words frequent in it but rare elsewhere (class-based TF-IDF)."""
+    counts = [word_frequencies(list(texts)) for texts in texts_by_cluster]
+    overall: Counter = Counter()
+    for c in counts:
+        overall.update(c)
+    avg_words = sum(overall.values()) / max(1, len(counts))
+    keywords = []
+    for c in counts:
+        size = sum(c.values()) or 1
+        scored = sorted(
+            c.items(),
+            key=lambda item: item[1] / size * math.log(1.0 + avg_words / overall[item[0]]),
+            reverse=True,
+        )
+        keywords.append([word for word, freq in scored[:top_n] if freq > 1])
+    return keywords
+
+
+class TopicAccumulator:
+    """
+    Comment embeddings of an analysis, fed chunk by chunk and clustered once
+    at the end. Rows are kept as float16; beyond ``max_rows`` a uniform
+    reservoir sample is kept, so memory stays bounded on streamed analyses
+    and the per-topic shares become estimates ("sampled" in the result).
+    """
+
+    def __init__(self, clusters: int, max_rows: int = 20000, seed: int = 0):
+        self.clusters = clusters
+        self.max_rows = max_rows
+        self.seen = 0
+        self.total = 0
+        self._rows: Optional[np.ndarray] = None
+        self._meta: List[Dict[str, Any]] = []
+        self._rng = random.Random(seed)
+
+    def update(self, vectors: Sequence[Optional[np.ndarray]], analyzed: Sequence[Dict[str, Any]]) -> None:
+        """Add the comments of one chunk that have an embedding (all of them count toward coverage)."""
+        self.total += len(analyzed)
+        for vec, c in zip(vectors, analyzed):
+            if vec is None:
+                continue
+            meta = {
+                "comment_id": c.get("comment_id"),
+                "text": c.get("text", ""),
+                "author": c.get("author", ""),
+                "like_count": c.get("like_count", 0),
+                "label": c["prediction"]["label"],
+                "duplicate": bool(c.get("duplicate_of")),
+            }
+            if self._rows is None:
+                self._rows = np.empty((min(self.max_rows, 1024), len(vec)), dtype=np.float16)
+            self.seen += 1
+            if len(self._meta) < self.max_rows:
+                slot = len(self._meta)
+                if slot == len(self._rows):
+                    grown = np.empty((min(self.max_rows, 2 * len(self._rows)), self._rows.shape[1]), np.float16)
+                    grown[:slot] = self._rows
+                    self._rows = grown
+                self._meta.append(meta)
+            else:
+                slot = self._rng.randrange(self.seen)
+                if slot >= self.max_rows:
+                    continue
+                self._meta[slot] = meta
+            self._rows[slot] = vec
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """
+        Topic clusters with their sentiment mix, keywords and most central
+        examples. "coverage" is the share of the analyzed comments that had an
+        embedding; below 1 the topics describe only that part of the sample.
+        """
+        n = len(self._meta)
+        if n < 2 * self.clusters:
+            return None
+        x = self._rows[:n].astype(np.float32)
+        _, labels, sims = minibatch_kmeans(x, self.clusters)
+
+        members = [np.flatnonzero(labels == j) for j in range(labels.max() + 1)]
+        members = [m for m in members if len(m)]
+        keywords = _distinctive_keywords(
+            [[self._meta[i]["text"] for i in m] for m in members], KEYWORDS_PER_TOPIC
+        )
+        topics = []
+        for m, words in zip(members, keywords):
+            counts = Counter(self._meta[i]["label"] for i in m)
+            central = [i for i in m[np.argsort(-sims[m])] if not self._meta[i]["duplicate"]]
+            topics.append({
+                "size": int(len(m)),
+                "share": round(len(m) / n, 4),
+                "counts": {label: counts.get(label, 0) for label in LABELS},
+                "ratios": {label: round(counts.get(label, 0) / len(m), 4) for label in LABELS},
+                "keywords": words,
+                "examples": [
+                    {key: self._meta[i][key] for key in ("comment_id", "text", "author", "like_count", "label")}
+                    for i in central[:EXAMPLES_PER_TOPIC]
+                ],
+            })
+        topics.sort(key=lambda t: t["size"], reverse=True)
+        for rank, topic in enumerate(topics):
+            topic["topic"] = rank
+        return {
+            "method": "minibatch-kmeans",
+            "clustered_comments": n,
+            "embedded_comments": self.seen,
+            "analyzed_comments": self.total,
+            "coverage": round(self.seen / self.total, 4) if self.total else 0.0,
+            "sampled": self.seen > n,
+            "topics": topics,
+        }
@@ -0,0 +1,158 @@
+# backend/services/dedup.py - Exact and near-duplicate comment collapsing (MinHash/LSH)
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SHINGLE_SIZE = 5         # character shingles: works for any language and for emoji runs
+NUM_PERM = 128
+BANDS = 16               # 16 bands × 8 rows: ~95% recall at Jaccard 0.8, ~6% at 0.5
+NEAR_MIN_CHARS = 40      # shorter comments are only collapsed when identical
+_MAX_WINDOWS = 1 << 16   # shingles hashed per vectorized step (bounds temporary memory)
+
+# Permutations of the 32-bit shingle hashes: x → (a·x + b) mod 2**32 with a odd
+# is a bijection, computed as one wrapping uint32 multiply-add per permutation.
+_rng = np.random.default_rng(20240501)  # fixed: signatures are comparable across calls
+_PERM_A = _rng.integers(1, 1 << 32, size=NUM_PERM, dtype=np.uint32) | np.uint32(1)
+_PERM_B = _rng.integers(0, 1 << 32, size=NUM_PERM, dtype=np.uint32)
+_SHINGLE_MULT = _rng.integers(1, 1 << 63, size=SHINGLE_SIZE, dtype=np.uint64) | np.uint64(1)
+
+# Near duplicates must agree on these: one inserted "not" / "tidak" flips the
+# sentiment but barely moves the shingle similarity of a long comment
+_NEGATIONS = frozenset(
+    "not no never nothing nobody nor cannot dont doesnt didnt isnt arent wasnt werent wont cant "
+    "tidak tak bukan gak ga nggak enggak ngga kagak jangan belum kurang".split()
+)
+_WORD_RE = re.compile(r"[^\W\d_]+(?:'t)?")
+_SPACE_RE = re.compile(r"\s+")
+_INVISIBLE_RE = re.compile("[\u200b-\u200f\u2060\ufeff]")
+
+
+def normalize(text: str) -> str:
+    """Key for exact duplicates: case-folded, invisible characters dropped, whitespace collapsed."""
+    return _SPACE_RE.sub(" ", _INVISIBLE_RE.sub("", text or "").casefold()).strip()
+
+
+def _negations(key: str) -> frozenset:
+    """Negation words of a normalized text ("don't" counts as "dont")."""
+    return _NEGATIONS.intersection(w.replace("'", "") for w in _WORD_RE.findall(key))
+
+
+def minhash_signatures(texts: Sequence[str]) -> np.ndarray:
+    """
+    (len(texts), NUM_PERM) MinHash signatures over character shingles.
+    Shingling, hashing and the per-text minimum are vectorized over many
+    texts at once; texts shorter than SHINGLE_SIZE get all-max signatures.
+    """
+    sigs = np.full((len(texts), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    start = 0
+    while start < len(texts):
+        # Grow the chunk until it holds about _MAX_WINDOWS shingles
+        end, windows = start, 0
+        while end < len(texts) and (end == start or windows + len(texts[end]) <= _MAX_WINDOWS):
+            windows += len(texts[end])
+            end += 1
+        _signature_chunk(texts, start, end, sigs)
+        start = end
+    return sigs
+
+
+def _signature_chunk(texts: Sequence[str], start: int, end: int, out: np.ndarray) -> None:
+    codes = [np.frombuffer(t.encode("utf-32-le"), dtype=np.uint32) for t in texts[start:end]]
+    lengths = np.array([len(c) for c in codes], dtype=np.int64)
+    if lengths.max(initial=0) < SHINGLE_SIZE:
+        return
+    cp = np.concatenate(codes).astype(np.uint64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+
+    # Shingle hash of every window, then keep windows that stay inside one text
+    with np.errstate(over="ignore"):
+        hashes = sliding_window_view(cp, SHINGLE_SIZE) @ _SHINGLE_MULT  # wraps mod 2**64
+    win_start = np.arange(len(hashes))
+    doc = np.searchsorted(offsets, win_start, side="right") - 1
+    valid = win_start + SHINGLE_SIZE <= offsets[doc + 1]
+    hashes, doc = hashes[valid], doc[valid]
+    if not len(hashes):
+        return
+
+    x = (hashes >> np.uint64(32)).astype(np.uint32)
+    permuted = np.multiply.outer(_PERM_A, x)  # (NUM_PERM, windows), wraps mod 2**32
+    permuted += _PERM_B[:, None]
+    seg = np.flatnonzero(np.r_[True, doc[1:] != doc[:-1]])
+    out[start + doc[seg]] = np.minimum.reduceat(permuted, seg, axis=1).T
+
+
+def _lsh_clusters(sigs: np.ndarray, threshold: float) -> np.ndarray:
+    """Representative (lowest index) of each signature's near-duplicate cluster."""
+    # Candidate pairs: signatures sharing any band. Each candidate is checked
+    # against its bucket's first member by estimated Jaccard (share of equal
+    # minhashes); verified pairs from all bands are unioned once at the end.
+    rows = NUM_PERM // BANDS
+    edges = []
+    for b in range(BANDS):
+        band = np.ascontiguousarray(sigs[:, b * rows:(b + 1) * rows]).view(np.dtype((np.void, 4 * rows))).ravel()
+        _, inverse, counts = np.unique(band, return_inverse=True, return_counts=True)
+        shared = np.flatnonzero(counts[inverse] >= 2)  # only shared buckets yield candidates
+        if not len(shared):
+            continue
+        shared = shared[np.argsort(inverse[shared], kind="stable")]
+        starts = np.flatnonzero(np.r_[True, np.diff(inverse[shared]) != 0])
+        heads = np.repeat(shared[starts], np.diff(np.r_[starts, len(shared)]))
+        members = shared[heads != shared]
+        heads = heads[heads != shared]
+        similar = (sigs[members] == sigs[heads]).mean(axis=1) >= threshold
+        edges.append(np.stack([heads[similar], members[similar]], axis=1))
+
+    parent = np.arange(len(sigs))
+    if edges:
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for a, b in np.unique(np.concatenate(edges), axis=0).tolist():
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+        for i in range(len(parent)):
+            parent[i] = parent[parent[i]]  # roots are the lowest index, so one pass in order flattens
+    return parent
+
+
+def find_duplicates(texts: Sequence[str], threshold: float = 0.8, near: bool = True) -> Tuple[List[int], Dict[str, int]]:
+    """
+    Group duplicate comments → (representative, stats).
+
+    ``representative[i]`` is the index of the first comment of i's cluster
+    (i itself when it is unique or the first copy). Identical texts after
+    normalize() are collapsed exactly; with ``near``, texts of at least
+    NEAR_MIN_CHARS characters whose estimated Jaccard similarity over
+    character shingles reaches ``threshold`` are merged too (MinHash + LSH),
+    unless their negation words differ.
+    stats counts the collapsed comments: {"exact": n, "near": m}.
+    """
+    keys = [normalize(t) for t in texts]
+    first: Dict[str, int] = {}
+    representative = [first.setdefault(k, i) for i, k in enumerate(keys)]
+    exact = sum(1 for i, r in enumerate(representative) if r != i)
+
+    near_collapsed = 0
+    if near:
+        uniques = [i for i, r in enumerate(representative) if r == i and len(keys[i]) >= NEAR_MIN_CHARS]
+        if len(uniques) > 1:
+            clusters = _lsh_clusters(minhash_signatures([keys[i] for i in uniques]), threshold)
+            merged = {
+                uniques[j]: uniques[c] for j, c in enumerate(clusters)
+                if c != j and _negations(keys[uniques[j]]) == _negations(keys[uniques[c]])
+            }
+            near_collapsed = len(merged)
+            if merged:
+                for i, r in enumerate(representative):
+                    # Exact copies follow their text's cluster representative
+                    representative[i] = merged.get(r, r)
+
+    return representative, {"exact": exact, "near": near_collapsed}
@@ -0,0 +1,101 @@
+# backend/services/keywords.py - Bounded-memory streaming keyword counts
+from __future__ import annotations
+
+import heapq
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.services.visualization import word_frequencies
+
+_LABELS = ("positive", "neutral", "negative")
+
+
+class SpaceSaving:
+    """
+    Weighted Space-Saving top-k sketch (Metwally et al., 2005).
+
+    Keeps at most ``capacity`` counters no matter how many distinct words flow
+    through. Words that fit are counted exactly; once full, a new word replaces
+    the current minimum and inherits its count, so every estimate overshoots
+    the true count by at most ``total / capacity``.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []  # lazy min-heap of (count, word)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def update(self, counts: Dict[str, int]) -> None:
+        """Merge a batch of exact counts (e.g. one batch's Counter) into the sketch."""
+        for word, n in counts.items():
+            self.total += n
+            if word in self._counts:
+                self._counts[word] += n
+            elif len(self._counts) < self.capacity:
+                self._counts[word] = n
+            else:
+                floor = self._pop_min()
+                self._counts[word] = floor + n
+            heapq.heappush(self._heap, (self._counts[word], word))
+
+        # Stale heap entries pile up as counts grow; rebuild before they dominate
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, w) for w, c in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> int:
+        while True:
+            count, word = heapq.heappop(self._heap)
+            if self._counts.get(word) == count:
+                del self._counts[word]
+                return count
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Highest estimated counts first, like Counter.most_common."""
+        return Counter(self._counts).most_common(n)
+
+
+class KeywordSketch:
+    """
+    Streaming keyword engine for an analysis: one Space-Saving sketch over all
+    comments plus one per sentiment label, fed batch by batch as predictions
+    come in. Memory is bounded by ``capacity`` per sketch, not by corpus size.
+    """
+
+    def __init__(self, capacity: int = 5000):
+        self.overall = SpaceSaving(capacity)
+        self.by_label = {label: SpaceSaving(capacity) for label in _LABELS}
+
+    def update(self, texts: Sequence[str], labels: Optional[Sequence[str]] = None) -> None:
+        """Tokenize one batch once and merge it into the overall and per-label sketches."""
+        if labels is None:
+            self.overall.update(word_frequencies(list(texts)))
+            return
+
+        groups: Dict[str, List[str]] = {}
+        for text, label in zip(texts, labels):
+            if text:
+                groups.setdefault(label, []).append(text)
+        for label, group in groups.items():
+            counts = word_frequencies(group)
+            self.overall.update(counts)
+            if label in self.by_label:
+                self.by_label[label].update(counts)
+
+    def frequencies(self, n: Optional[int] = None) -> Counter:
+        """Overall estimated counts as a Counter (what VisualizationService consumes)."""
+        return Counter(dict(self.overall.most_common(n)))
+
+    def top_keywords(self, top_n: int = 20, label: Optional[str] = None) -> List[Dict[str, Any]]:
+        sketch = self.overall if label is None else self.by_label[label]
+        return [{"word": word, "frequency": freq} for word, freq in sketch.most_common(top_n)]
+
+    def top_keywords_by_sentiment(self, top_n: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+        return {label: self.top_keywords(top_n, label) for label in _LABELS}
+
@@ -0,0 +1,45 @@
+# backend/services/lexicon.py - Rule-based fallback sentiment (no torch needed)
+from __future__ import annotations
+
+from typing import Any, Dict
+
+POS_WORDS = {
+    "good", "great", "amazing", "awesome", "love", "excellent", "wonderful",
+    "fantastic", "perfect", "best", "helpful", "thanks", "thank", "brilliant",
+    "outstanding", "nice", "beautiful", "cool", "incredible", "superb",
+    "bagus", "keren", "mantap", "suka", "luar biasa", "terima kasih", "makasih",
+    "menarik", "kece", "top", "jos", "gilak", "gila", "dewa", "sempurna",
+    "membantu", "bermanfaat", "informatif", "edukatif",
+}
+NEG_WORDS = {
+    "bad", "terrible", "awful", "hate", "worst", "horrible", "disgusting",
+    "stupid", "boring", "sucks", "waste", "disappointed", "useless", "trash",
+    "pathetic", "annoying", "frustrating",
+    "buruk", "jelek", "payah", "benci", "membosankan", "sampah", "lebay",
+    "norak", "kampungan", "tidak berguna", "buang waktu", "kecewa", "zonk",
+}
+
+
+RULE_BASED_MODEL = "rule-based"
+
+
+def rule_based_sentiment(text: str) -> Dict[str, Any]:
+    """Keyword-count fallback used when the transformer model is unavailable."""
+    tl = text.lower()
+    pos = sum(1 for w in POS_WORDS if w in tl)
+    neg = sum(1 for w in NEG_WORDS if w in tl)
+    if pos > neg:
+        label, conf = "positive", min(0.95, 0.60 + (pos - neg) * 0.1)
+    elif neg > pos:
+        label, conf = "negative", min(0.95, 0.60 + (neg - pos) * 0.1)
+    else:
+        label, conf = "neutral", 0.65
+    return {
+        "label": label,
+        "confidence": conf,
+        "scores": {
+            "positive": conf if label == "positive" else 0.25,
+            "neutral": conf if label == "neutral" else 0.35,
+            "negative": conf if label == "negative" else 0.25,
+        },
+    }
@@ -0,0 +1,102 @@
+# backend/services/precision.py - Confidence intervals on sentiment ratios
+from __future__ import annotations
+
+import math
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Tuple
+
+from backend.services.timeline import LABELS
+
+CONFIDENCE = 0.95
+
+
+def _z(confidence: float, intervals: int) -> float:
+    """Two-sided z for ``intervals`` simultaneous intervals (Bonferroni)."""
+    alpha = (1.0 - confidence) / intervals
+    return NormalDist().inv_cdf(1.0 - alpha / 2.0)
+
+
+def wilson_interval(
+    k: int,
+    n: int,
+    z: float,
+    population: Optional[int] = None,
+) -> Tuple[float, float]:
+    """
+    Wilson score interval for the proportion k/n. With ``population`` (the
+    number of comments the sample was drawn from, without replacement) the
+    half-width gets the finite population correction, so it shrinks to zero
+    as the sample approaches the whole population.
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    p = k / n
+    z2 = z * z
+    denom = 1.0 + z2 / n
+    center = (p + z2 / (2 * n)) / denom
+    half = z * math.sqrt(p * (1.0 - p) / n + z2 / (4 * n * n)) / denom
+    if population and population > 1 and n < population:
+        half *= math.sqrt((population - n) / (population - 1))
+    elif population and n >= population:
+        half = 0.0
+        center = p
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def ratio_intervals(
+    counts: Dict[str, int],
+    population: Optional[int] = None,
+    confidence: float = CONFIDENCE,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Simultaneous intervals for the positive / neutral / negative ratios:
+    {label: {"ratio", "low", "high", "margin"}} where margin is the half-width.
+    All three hold together at ``confidence``.
+    """
+    n = sum(counts.get(label, 0) for label in LABELS)
+    z = _z(confidence, len(LABELS))
+    out: Dict[str, Dict[str, float]] = {}
+    for label in LABELS:
+        k = counts.get(label, 0)
+        low, high = wilson_interval(k, n, z, population)
+        out[label] = {
+            "ratio": round(k / n, 4) if n else 0.0,
+            "low": round(low, 4),
+            "high": round(high, 4),
+            "margin": round((high - low) / 2, 4),
+        }
+    return out
+
+
+def precision_report(
+    counts: Dict[str, int],
+    target_margin: Optional[float],
+    population: Optional[int] = None,
+    stopped_early: bool = False,
+    confidence: float = CONFIDENCE,
+) -> Dict[str, Any]:
+    """The "precision" block of an analysis result."""
+    intervals = ratio_intervals(counts, population, confidence)
+    achieved = max(iv["margin"] for iv in intervals.values())
+    return {
+        "confidence": confidence,
+        "target_margin": target_margin,
+        "achieved_margin": achieved,
+        "converged": target_margin is not None and achieved <= target_margin,
+        "stopped_early": stopped_early,
+        "intervals": intervals,
+    }
+
+
+def has_converged(
+    counts: Dict[str, int],
+    target_margin: float,
+    population: Optional[int] = None,
+    min_sample: int = 0,
+    confidence: float = CONFIDENCE,
+) -> bool:
+    """True once every ratio's interval half-width is at most ``target_margin``."""
+    if sum(counts.values()) < min_sample:
+        return False
+    intervals = ratio_intervals(counts, population, confidence)
+    return all(iv["margin"] <= target_margin for iv in intervals.values())
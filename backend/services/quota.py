@@ -0,0 +1,140 @@
+# backend/services/quota.py - In-process quota ledger
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+
+class QuotaLedger:
+    """
+    Today's quota usage held in memory — globally, per client IP and per session.
+
+    Usage is split in two parts:
+      * ``base``      — what the database last reported (all workers' usage),
+      * ``unflushed`` — units recorded here whose quota_usage row is not yet
+                        confirmed written.
+    Reads are ``base + unflushed`` under a lock, so checks never touch the DB.
+    reconcile() replaces ``base`` with fresh DB totals; persisted() moves
+    units from ``unflushed`` into ``base`` once their row is committed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._day = date.today()
+        self._version = 0
+        self._base = Counter()        # keys: "total", ("ip", x), ("session", x)
+        self._unflushed = Counter()
+
+    # ─── Internal ───────────────────────────────────────────────────────────
+
+    def _roll_day(self) -> None:
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._base.clear()
+            self._unflushed.clear()
+            self._version += 1
+
+    @staticmethod
+    def _keys(user_ip: Optional[str], session_id: Optional[str]):
+        yield "total"
+        if user_ip:
+            yield ("ip", user_ip)
+        if session_id:
+            yield ("session", session_id)
+
+    # ─── Updates ────────────────────────────────────────────────────────────
+
+    def record(self, units: int, user_ip: Optional[str] = None, session_id: Optional[str] = None) -> None:
+        """Count units spent now; they stay 'unflushed' until persisted() is called."""
+        with self._lock:
+            self._roll_day()
+            for key in self._keys(user_ip, session_id):
+                self._unflushed[key] += units
+
+    def persisted(
+        self,
+        units: int,
+        user_ip: Optional[str] = None,
+        session_id: Optional[str] = None,
+        day: Optional[date] = None,
+    ) -> None:
+        """The quota_usage row for these units is committed — count them as DB usage."""
+        with self._lock:
+            self._roll_day()
+            if day is not None and day != self._day:
+                return
+            for key in self._keys(user_ip, session_id):
+                self._unflushed[key] = max(0, self._unflushed[key] - units)
+                self._base[key] += units
+            self._version += 1
+
+    def version(self) -> int:
+        """Snapshot token for reconcile(): taken before reading DB totals."""
+        with self._lock:
+            return self._version
+
+    def reconcile(
+        self,
+        day: date,
+        total: int,
+        by_ip: Dict[str, int],
+        by_session: Dict[str, int],
+        version: Optional[int] = None,
+    ) -> bool:
+        """
+        Replace the DB-backed part with fresh totals for ``day``. Skipped (returns
+        False) if rows were persisted since ``version`` was taken — the totals
+        may predate them; the next reconciliation picks them up. Callers that
+        keep being skipped reconcile on the thread that calls persisted(), so
+        no persist can land in between (see main._quota_reconcile_loop).
+        """
+        with self._lock:
+            self._roll_day()
+            if day != self._day or (version is not None and version != self._version):
+                return False
+            base = Counter({"total": total})
+            base.update({("ip", ip): n for ip, n in by_ip.items() if ip})
+            base.update({("session", sid): n for sid, n in by_session.items() if sid})
+            self._base = base
+            self._version += 1
+            return True
+
+    # ─── Reads ──────────────────────────────────────────────────────────────
+
+    def usage(self, user_ip: Optional[str] = None, session_id: Optional[str] = None) -> Tuple[int, int, int]:
+        """(total, this IP, this session) units used today."""
+        with self._lock:
+            self._roll_day()
+
+            def used(key) -> int:
+                return self._base[key] + self._unflushed[key]
+
+            return (
+                used("total"),
+                used(("ip", user_ip)) if user_ip else 0,
+                used(("session", session_id)) if session_id else 0,
+            )
+
+    def exceeded(
+        self,
+        daily_limit: int,
+        ip_limit: int = 0,
+        session_limit: int = 0,
+        user_ip: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> Optional[str]:
+        """Name of the first exhausted limit ("daily", "ip", "session"), or None. 0 = no limit."""
+        total, ip_used, session_used = self.usage(user_ip, session_id)
+        if daily_limit > 0 and total >= daily_limit:
+            return "daily"
+        if ip_limit > 0 and user_ip and ip_used >= ip_limit:
+            return "ip"
+        if session_limit > 0 and session_id and session_used >= session_limit:
+            return "session"
+        return None
+
+
+quota_ledger = QuotaLedger()
@@ -1,13 +1,15 @@
 # backend/services/sentiment.py
 from __future__ import annotations
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import os
 import json
 import logging
+import random
 import numpy as np
 import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 from backend.core.config import get_settings
+from backend.services.cascade import CascadeStats, HashedNgramModel
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +18,14 @@ _LABELS = ["negative", "neutral", "positive"]
 class SentimentService:
     _instance: Optional["SentimentService"] = None
 
-    def __init__(self, model_dir: str, neutral_threshold: Optional[float] = None):
+    def __init__(
+        self,
+        model_dir: str,
+        neutral_threshold: Optional[float] = None,
+        model_name: Optional[str] = None,
+    ):
+        # Stored with every prediction; defaults to the model directory's name
+        self.model_name = model_name or os.path.basename(os.path.normpath(model_dir))
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(f"Using device: {self.device}")
         
@@ -45,75 +54,289 @@ class SentimentService:
         self.t_neu = float(t) if t is not None else 0.5
         logger.info(f"Neutral threshold set to: {self.t_neu}")
 
+        # Optional cascade first stage (see predict_cascade)
+        self.first_stage: Optional[HashedNgramModel] = None
+        self.cascade_stats = CascadeStats()
+        self._audit_rng = random.Random()
+        self._affixes: Optional[Tuple[List[int], List[int]]] = None
+
     @classmethod
     def get(cls) -> "SentimentService":
         if cls._instance is None:
             settings = get_settings()
-            cls._instance = SentimentService(settings.MODEL_DIR, settings.NEUTRAL_THRESHOLD)
+            svc = SentimentService(settings.MODEL_DIR, settings.NEUTRAL_THRESHOLD, settings.MODEL_NAME)
+            if settings.CASCADE_MODEL_PATH:
+                svc.load_first_stage(settings.CASCADE_MODEL_PATH)
+            cls._instance = svc
         return cls._instance
 
-    def predict(self, texts: List[str], max_len: int = 160, batch_size: int = 32) -> List[Dict]:
+    def load_first_stage(self, path: str) -> bool:
+        """Load the cascade's first-stage model. Returns False (cascade off) if it cannot be read."""
+        try:
+            first_stage = HashedNgramModel.load(path)
+        except Exception as e:
+            logger.warning(f"Cascade first stage not loaded from {path}: {e}")
+            return False
+        teacher = first_stage.meta.get("teacher")
+        if teacher and teacher != self.model_name:
+            logger.warning(f"Cascade first stage was trained from '{teacher}', not '{self.model_name}'")
+        self.first_stage = first_stage
+        logger.info(f"Cascade first stage loaded from {path}")
+        return True
+
+    def model_names(self) -> List[str]:
+        """Models whose stored predictions count as current: the full model, then the first stage."""
+        names = [self.model_name]
+        if self.first_stage is not None:
+            names.append(self.first_stage.model_name)
+        return names
+
+    def predict(
+        self,
+        texts: List[str],
+        max_len: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        bucket: bool = True,
+    ) -> List[Dict]:
         """
         Predict sentiment for list of texts.
-        
+
+        Texts are tokenized once and, with ``bucket``, batched by token
+        length, so each batch is padded to its own longest comment instead of
+        ``max_len`` (MAX_TEXT_LENGTH). Comments longer than ``max_len`` tokens
+        are truncated, or with LONG_TEXT_MODE=window split into windows
+        overlapping by WINDOW_OVERLAP tokens that are scored in the same
+        batches; a comment's probabilities are the average of its windows',
+        weighted by their token counts.
+
         Returns:
             List of dict: {label, confidence, scores:{negative, neutral, positive}}
         """
+        return self._predict(texts, max_len, batch_size, bucket, embed=False)[0]
+
+    def predict_with_embeddings(
+        self,
+        texts: List[str],
+        max_len: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        bucket: bool = True,
+    ) -> Tuple[List[Dict], np.ndarray]:
+        """
+        predict() plus a (len(texts), hidden size) float16 matrix of comment
+        embeddings from the same forward pass: the last hidden layer averaged
+        over the comment's tokens (and windows), L2-normalized.
+        """
+        return self._predict(texts, max_len, batch_size, bucket, embed=True)
+
+    def embed(
+        self,
+        texts: List[str],
+        max_len: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Comment embeddings only (see predict_with_embeddings), for texts whose
+        prediction came from elsewhere. Costs the same forward pass as scoring.
+        """
+        return self._predict(texts, max_len, batch_size, True, embed=True)[1]
+
+    def _predict(
+        self,
+        texts: List[str],
+        max_len: Optional[int],
+        batch_size: Optional[int],
+        bucket: bool,
+        embed: bool,
+    ) -> Tuple[List[Dict], Optional[np.ndarray]]:
         if not texts:
-            return []
-        
-        results: List[Dict] = []
-        
+            return [], (np.zeros((0, self.model.config.hidden_size), np.float16) if embed else None)
+
+        settings = get_settings()
+        max_len = max_len or settings.MAX_TEXT_LENGTH
+        batch_size = batch_size or settings.BATCH_SIZE
+        owners, pieces, weights = self._windows(
+            texts, max_len, settings.LONG_TEXT_MODE == "window", settings.WINDOW_OVERLAP
+        )
+        if len(pieces) > len(texts):
+            logger.info(f"Long comments split: scoring {len(texts):,} comments as {len(pieces):,} windows")
+
+        order = sorted(range(len(pieces)), key=lambda k: len(pieces[k])) if bucket else list(range(len(pieces)))
+        probs = np.zeros((len(pieces), len(_LABELS)))
+        hidden = np.zeros((len(pieces), self.model.config.hidden_size), np.float32) if embed else None
+        failed = np.zeros(len(pieces), dtype=bool)
+
         with torch.no_grad():
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i+batch_size]
-                
+            for i in range(0, len(order), batch_size):
+                batch = order[i:i+batch_size]
+
                 try:
-                    # Tokenize batch
-                    encoded = self.tokenizer(
-                        batch, 
-                        truncation=True, 
-                        max_length=max_len,
-                        padding=True, 
+                    # Pad to the longest window in this batch
+                    encoded = self.tokenizer.pad(
+                        {"input_ids": [pieces[k] for k in batch]},
+                        padding=True,
                         return_tensors="pt"
                     ).to(self.device)
-                    
+
                     # Get predictions
-                    logits = self.model(**encoded).logits.detach().cpu().numpy()
-                    
+                    outputs = self.model(**encoded, output_hidden_states=embed)
+                    logits = outputs.logits.detach().cpu().numpy()
+                    if embed:
+                        # Mean of the last hidden layer over real (unpadded) tokens
+                        mask = encoded["attention_mask"].unsqueeze(-1).to(outputs.hidden_states[-1].dtype)
+                        summed = (outputs.hidden_states[-1] * mask).sum(dim=1)
+                        hidden[batch] = (summed / mask.sum(dim=1).clamp(min=1)).float().cpu().numpy()
+
                     # Apply softmax
                     exp_logits = np.exp(logits - logits.max(axis=1, keepdims=True))
-                    probs = exp_logits / exp_logits.sum(axis=1, keepdims=True)
-                    
-                    # Process each prediction
-                    for prob in probs:
-                        # Apply neutral threshold
-                        if prob[1] >= self.t_neu:
-                            pred_id = 1
-                        else:
-                            pred_id = int(np.argmax(prob))
-                        
-                        results.append({
-                            "label": _LABELS[pred_id],
-                            "confidence": float(prob[pred_id]),
-                            "scores": {
-                                "negative": float(prob[0]), 
-                                "neutral": float(prob[1]), 
-                                "positive": float(prob[2])
-                            }
-                        })
-                        
+                    probs[batch] = exp_logits / exp_logits.sum(axis=1, keepdims=True)
+
                 except Exception as e:
                     logger.error(f"Error in batch prediction: {e}")
-                    # Add error placeholders for this batch
-                    for _ in batch:
-                        results.append({
-                            "label": "neutral",
-                            "confidence": 0.0,
-                            "scores": {"negative": 0.0, "neutral": 1.0, "positive": 0.0}
-                        })
-        
-        return results
+                    failed[batch] = True
+
+        # Pool windows back per comment
+        owners_arr = np.asarray(owners)
+        weights_arr = np.asarray(weights, dtype=float)
+        pooled = np.zeros((len(texts), len(_LABELS)))
+        np.add.at(pooled, owners_arr, probs * weights_arr[:, None])
+        pooled /= np.bincount(owners_arr, weights_arr, minlength=len(texts))[:, None]
+        broken = np.bincount(owners_arr, failed, minlength=len(texts)) > 0
+
+        embeddings = None
+        if embed:
+            pooled_hidden = np.zeros((len(texts), hidden.shape[1]))
+            np.add.at(pooled_hidden, owners_arr, hidden * weights_arr[:, None])
+            pooled_hidden[broken] = 0.0
+            norms = np.linalg.norm(pooled_hidden, axis=1, keepdims=True)
+            embeddings = (pooled_hidden / np.maximum(norms, 1e-12)).astype(np.float16)
+
+        results: List[Dict] = []
+        for prob, is_broken in zip(pooled, broken):
+            if is_broken:
+                # Error placeholder for comments in a failed batch
+                results.append({
+                    "label": "neutral",
+                    "confidence": 0.0,
+                    "scores": {"negative": 0.0, "neutral": 1.0, "positive": 0.0}
+                })
+                continue
+
+            # Apply neutral threshold
+            if prob[1] >= self.t_neu:
+                pred_id = 1
+            else:
+                pred_id = int(np.argmax(prob))
+
+            results.append({
+                "label": _LABELS[pred_id],
+                "confidence": float(prob[pred_id]),
+                "scores": {
+                    "negative": float(prob[0]),
+                    "neutral": float(prob[1]),
+                    "positive": float(prob[2])
+                }
+            })
+
+        return results, embeddings
+
+    def _windows(
+        self,
+        texts: List[str],
+        max_len: int,
+        windowed: bool,
+        overlap: int,
+    ) -> Tuple[List[int], List[List[int]], List[int]]:
+        """
+        Model inputs for ``texts`` → (owner text index, input ids with special
+        tokens, content token count) per window. Without ``windowed`` every
+        text is one window truncated to ``max_len`` tokens.
+        """
+        prefix, suffix = self._special_affixes()
+        body = max(1, max_len - len(prefix) - len(suffix))
+        step = max(1, body - overlap)
+        token_ids = self.tokenizer(list(texts), add_special_tokens=False, truncation=False, verbose=False)["input_ids"]
+
+        owners: List[int] = []
+        pieces: List[List[int]] = []
+        weights: List[int] = []
+        for i, ids in enumerate(token_ids):
+            if len(ids) <= body or not windowed:
+                starts = [0]
+            else:
+                # Last window is aligned to the end so the tail is always covered
+                starts = list(range(0, len(ids) - body, step)) + [len(ids) - body]
+            for s in starts:
+                window = ids[s:s + body]
+                owners.append(i)
+                pieces.append(prefix + window + suffix)
+                weights.append(max(1, len(window)))
+        return owners, pieces, weights
+
+    def _special_affixes(self) -> Tuple[List[int], List[int]]:
+        """Special token ids the tokenizer puts before and after a single text (e.g. <s> … </s>)."""
+        if getattr(self, "_affixes", None) is None:
+            plain = self.tokenizer("sentiment", add_special_tokens=False)["input_ids"]
+            full = self.tokenizer("sentiment")["input_ids"]
+            at = next(
+                (k for k in range(len(full) - len(plain) + 1) if full[k:k + len(plain)] == plain),
+                len(full),
+            )
+            self._affixes = (full[:at], full[at + len(plain):])
+        return self._affixes
+
+    def predict_cascade(
+        self,
+        texts: List[str],
+        max_len: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        gate: Optional[float] = None,
+        audit_rate: Optional[float] = None,
+        embed: bool = False,
+    ) -> Tuple[List[Tuple[Dict, str]], Dict[int, np.ndarray]]:
+        """
+        Confidence-gated cascade → ([(prediction, model_name)] in input order,
+        {text index: embedding}).
+
+        The first stage labels every text; those at or above ``gate``
+        (CASCADE_CONFIDENCE_GATE) keep its prediction and only the rest go
+        through the transformer. A random ``audit_rate`` share of the gated
+        texts is sent to the transformer as well, to measure live agreement
+        (cascade_stats); audited texts get the transformer's prediction.
+        Without a first stage this is predict() for every text. With
+        ``embed``, texts scored by the transformer also get their embedding
+        (see predict_with_embeddings); first-stage labels come without one.
+        """
+        if self.first_stage is None or not texts:
+            preds, vectors = self._predict(texts, max_len, batch_size, True, embed)
+            return [(p, self.model_name) for p in preds], dict(enumerate(vectors)) if embed else {}
+
+        settings = get_settings()
+        gate = settings.CASCADE_CONFIDENCE_GATE if gate is None else gate
+        audit_rate = settings.CASCADE_AUDIT_RATE if audit_rate is None else audit_rate
+
+        cheap = self.first_stage.predict(texts, self.t_neu)
+        escalate = [i for i, p in enumerate(cheap) if p["confidence"] < gate]
+        audit = [
+            i for i, p in enumerate(cheap)
+            if p["confidence"] >= gate and audit_rate > 0 and self._audit_rng.random() < audit_rate
+        ]
+        send = sorted(escalate + audit)
+        full, vectors = self._predict([texts[i] for i in send], max_len, batch_size, True, embed)
+
+        results: List[Tuple[Dict, str]] = [(p, self.first_stage.model_name) for p in cheap]
+        for i, pred in zip(send, full):
+            results[i] = (pred, self.model_name)
+        audited = set(audit)
+        self.cascade_stats.record(
+            len(texts) - len(escalate),
+            len(escalate),
+            [(cheap[i]["label"], pred["label"]) for i, pred in zip(send, full) if i in audited],
+        )
+        logger.info(
+            f"Cascade: {len(texts) - len(escalate):,} of {len(texts):,} labeled by the first stage, "
+            f"{len(escalate):,} escalated, {len(audit):,} audited"
+        )
+        return results, dict(zip(send, vectors)) if embed else {}
 
     def predict_single(self, text: str) -> Dict:
         """Predict sentiment for single text"""
@@ -0,0 +1,152 @@
+# backend/services/streaming.py - Incremental aggregation for bounded-memory analyses
+from __future__ import annotations
+
+import csv
+import heapq
+import itertools
+import os
+import tempfile
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.services.clustering import TopicAccumulator
+from backend.services.keywords import KeywordSketch
+from backend.services.timeline import LABELS, TimelineAccumulator
+
+EXAMPLES_PER_LABEL = 5
+
+# Columns of the analysis CSV export (GET /api/analyze/video/{id}/download)
+CSV_HEADER = [
+    "author", "text", "like_count", "is_reply",
+    "published_at", "sentiment", "confidence",
+    "score_positive", "score_neutral", "score_negative",
+]
+
+
+def csv_row(c: Dict[str, Any]) -> List[Any]:
+    """One analyzed comment as a CSV_HEADER row."""
+    pred = c.get("prediction", {})
+    scores = pred.get("scores", {})
+    return [
+        c.get("author", ""),
+        c.get("text", "").replace("\n", " "),
+        c.get("like_count", 0),
+        c.get("is_reply", False),
+        c.get("published_at", ""),
+        pred.get("label", ""),
+        round(pred.get("confidence", 0), 4),
+        round(scores.get("positive", 0), 4),
+        round(scores.get("neutral", 0), 4),
+        round(scores.get("negative", 0), 4),
+    ]
+
+
+class StreamingAggregator:
+    """
+    Everything an analysis result needs, accumulated chunk by chunk: label
+    counts, the most-liked examples per label, a keyword sketch and the
+    timeline. Memory is bounded by the sketch capacity and the time span, not
+    by the number of comments. With ``spill_csv`` every analyzed comment is
+    also appended to a temporary CSV file for export; the caller owns that
+    file (see close() and csv_path).
+
+    Comments that copy another comment of the analysis (``duplicate_of``,
+    set by _score_comments) count everywhere except the examples, so one
+    spam text cannot fill them.
+
+    With ``topic_clusters`` the comments' "embedding" entries (see
+    _score_comments) are taken out of the chunk and collected for topic
+    clustering (topics).
+    """
+
+    def __init__(
+        self,
+        keyword_capacity: int = 5000,
+        spill_csv: bool = False,
+        spill_dir: Optional[str] = None,
+        topic_clusters: int = 0,
+    ):
+        self.counts = {label: 0 for label in LABELS}
+        self.model_counts: Counter = Counter()
+        self.duplicates = 0
+        self.sketch = KeywordSketch(keyword_capacity)
+        self.timeline = TimelineAccumulator()
+        self.topics: Optional[TopicAccumulator] = TopicAccumulator(topic_clusters) if topic_clusters > 0 else None
+        self._examples: Dict[str, List] = {label: [] for label in LABELS}  # min-heaps of (likes, -seq, entry)
+        self._seq = itertools.count()
+
+        self.csv_path: Optional[str] = None
+        self._csv_file = None
+        self._csv_writer = None
+        if spill_csv:
+            fd, self.csv_path = tempfile.mkstemp(prefix="sentiment_", suffix=".csv", dir=spill_dir)
+            self._csv_file = os.fdopen(fd, "w", newline="", encoding="utf-8")
+            self._csv_writer = csv.writer(self._csv_file)
+            self._csv_writer.writerow(CSV_HEADER)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def update(self, analyzed: Sequence[Dict[str, Any]]) -> None:
+        """Fold one chunk of analyzed comments (as built by _score_comments) into the aggregates."""
+        if not analyzed:
+            return
+        labels = [c["prediction"]["label"] for c in analyzed]
+        vectors = [c.pop("embedding", None) for c in analyzed]
+        if self.topics is not None:
+            self.topics.update(vectors, analyzed)
+        for c, label in zip(analyzed, labels):
+            self.counts[label] += 1
+            self.model_counts[c.get("model_name")] += 1
+            if c.get("duplicate_of"):
+                self.duplicates += 1
+                continue
+            # Keep the top EXAMPLES_PER_LABEL by likes; earlier comments win ties
+            item = (c.get("like_count", 0), -next(self._seq), c)
+            heap = self._examples[label]
+            if len(heap) < EXAMPLES_PER_LABEL:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+
+        self.sketch.update([c["text"] for c in analyzed], labels)
+        self.timeline.update(
+            [c.get("published_at", "") for c in analyzed],
+            labels,
+            np.array([
+                [sc.get("positive", 0.0), sc.get("neutral", 0.0), sc.get("negative", 0.0)]
+                for sc in (c["prediction"].get("scores", {}) for c in analyzed)
+            ]).reshape(-1, 3),
+        )
+        if self._csv_writer is not None:
+            self._csv_writer.writerows(csv_row(c) for c in analyzed)
+
+    def examples(self) -> List[Dict[str, Any]]:
+        """Most-liked examples, positive → neutral → negative, most likes first."""
+        out: List[Dict[str, Any]] = []
+        for label in LABELS:
+            out.extend(entry for _likes, _seq, entry in sorted(self._examples[label], key=lambda t: t[:2], reverse=True))
+        return out
+
+    def model_name(self) -> Optional[str]:
+        """Model that scored most comments."""
+        return self.model_counts.most_common(1)[0][0] if self.model_counts else None
+
+    def close(self) -> None:
+        """Flush and close the spill file (kept on disk at csv_path)."""
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = self._csv_writer = None
+
+    def discard(self) -> None:
+        """Close and delete the spill file."""
+        self.close()
+        if self.csv_path:
+            try:
+                os.remove(self.csv_path)
+            except FileNotFoundError:
+                pass
+            self.csv_path = None
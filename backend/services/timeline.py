@@ -0,0 +1,145 @@
+# backend/services/timeline.py - Time-bucketed sentiment timeline (vectorized)
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+LABELS = ("positive", "neutral", "negative")
+
+# Finest bucket that keeps the timeline at or under MAX_BUCKETS points
+BUCKETS = (("hour", 3600), ("day", 86400), ("week", 7 * 86400))
+MAX_BUCKETS = 240
+_WEEK_OFFSET = 4 * 86400  # 1970-01-05 was a Monday: weeks start on Monday (UTC)
+_HOUR = 3600
+
+
+def _choose_bucket(span_seconds: int):
+    for name, size in BUCKETS:
+        if span_seconds // size + 1 <= MAX_BUCKETS:
+            return name, size
+    return BUCKETS[-1]
+
+
+def _empty_timeline(unparsed: int = 0) -> Dict[str, Any]:
+    return {
+        "bucket": None, "bucket_seconds": 0, "timezone": "UTC", "start": [], "total": [],
+        "counts": {k: [] for k in LABELS}, "mean_scores": {k: [] for k in LABELS},
+        "unparsed": unparsed,
+    }
+
+
+class TimelineAccumulator:
+    """
+    Incremental form of build_timeline: feed chunks with update(), read the
+    timeline with result(). Only per-hour counts and score sums are kept, so
+    memory grows with the time span covered, not with the number of comments.
+    The bucket size is chosen in result(), from the full span.
+    """
+
+    def __init__(self):
+        self._hours = np.empty(0, dtype=np.int64)  # sorted hour indexes since the epoch
+        self._counts = np.empty((0, len(LABELS)), dtype=np.int64)
+        self._sums = np.empty((0, len(LABELS)), dtype=np.float64)
+        self._has_scores = False
+        self.unparsed = 0
+
+    def update(
+        self,
+        published_at: Sequence[str],
+        labels: Sequence[str],
+        scores: Optional[np.ndarray] = None,
+    ) -> None:
+        """Add one chunk; parsing and grouping are vectorized (pandas + np.bincount)."""
+        ts = pd.to_datetime(pd.Series(published_at, dtype="object"), utc=True, errors="coerce", format="ISO8601")
+        label_codes = pd.Categorical(labels, categories=LABELS).codes  # -1 for unknown labels
+        valid = ts.notna().to_numpy() & (label_codes >= 0)
+        self.unparsed += int(len(valid) - valid.sum())
+        if not valid.any():
+            return
+
+        hours = ts[valid].to_numpy(dtype="datetime64[s]").astype(np.int64) // _HOUR
+        codes = label_codes[valid].astype(np.int64)
+        uniq, idx = np.unique(hours, return_inverse=True)
+        n = len(uniq)
+        counts = np.bincount(idx * len(LABELS) + codes, minlength=n * len(LABELS)).reshape(n, len(LABELS))
+        sums = np.zeros((n, len(LABELS)))
+        if scores is not None:
+            self._has_scores = True
+            scores = np.asarray(scores, dtype=np.float64)[valid]
+            for j in range(len(LABELS)):
+                sums[:, j] = np.bincount(idx, weights=scores[:, j], minlength=n)
+
+        # Merge into the hours seen so far
+        merged = np.union1d(self._hours, uniq)
+        merged_counts = np.zeros((len(merged), len(LABELS)), dtype=np.int64)
+        merged_sums = np.zeros((len(merged), len(LABELS)))
+        old_pos = np.searchsorted(merged, self._hours)
+        new_pos = np.searchsorted(merged, uniq)
+        merged_counts[old_pos] += self._counts
+        merged_counts[new_pos] += counts
+        merged_sums[old_pos] += self._sums
+        merged_sums[new_pos] += sums
+        self._hours, self._counts, self._sums = merged, merged_counts, merged_sums
+
+    def result(self) -> Dict[str, Any]:
+        """Chart-ready arrays in build_timeline's shape."""
+        if len(self._hours) == 0:
+            return _empty_timeline(self.unparsed)
+
+        # Bucket choice uses the hour-truncated span; timestamps inside the
+        # first and last hour would not change it for day/week buckets.
+        seconds = self._hours * _HOUR
+        name, size = _choose_bucket(int(seconds[-1] - seconds[0]))
+        offset = _WEEK_OFFSET if name == "week" else 0
+        buckets = (seconds - offset) // size
+        first = int(buckets[0])
+        idx = buckets - first
+        n = int(idx[-1]) + 1
+
+        counts = np.zeros((n, len(LABELS)), dtype=np.int64)
+        sums = np.zeros((n, len(LABELS)))
+        np.add.at(counts, idx, self._counts)
+        np.add.at(sums, idx, self._sums)
+        total = counts.sum(axis=1)
+
+        mean_scores: Dict[str, List[Optional[float]]] = {}
+        if self._has_scores:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                for j, label in enumerate(LABELS):
+                    means = sums[:, j] / total
+                    mean_scores[label] = [None if np.isnan(v) else round(float(v), 4) for v in means]
+
+        starts = (np.arange(first, first + n, dtype=np.int64) * size + offset).astype("datetime64[s]")
+        return {
+            "bucket": name,
+            "bucket_seconds": size,
+            "timezone": "UTC",
+            "start": [f"{s}Z" for s in np.datetime_as_string(starts, unit="s")],
+            "total": total.tolist(),
+            "counts": {label: counts[:, j].tolist() for j, label in enumerate(LABELS)},
+            "mean_scores": mean_scores,
+            "unparsed": self.unparsed,
+        }
+
+
+def build_timeline(
+    published_at: Sequence[str],
+    labels: Sequence[str],
+    scores: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """
+    Sentiment per time bucket as chart-ready arrays.
+
+    ``published_at`` are ISO timestamps, ``labels`` the predicted labels and
+    ``scores`` an optional (n, 3) array of positive/neutral/negative scores.
+    Parsing, bucketing and grouping are vectorized (pandas + np.bincount);
+    the bucket size adapts to the time span (hour → day → week). Empty buckets
+    are kept so the x-axis is continuous. Comments whose timestamp fails to
+    parse (or whose label is unknown) are counted in ``unparsed`` and left out.
+    """
+    acc = TimelineAccumulator()
+    acc.update(published_at, labels, scores)
+    return acc.result()
+
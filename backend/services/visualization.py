@@ -2,16 +2,26 @@
 import matplotlib
 matplotlib.use('Agg')  # Non-GUI backend, must be set before importing pyplot
 
-import matplotlib.pyplot as plt
+# Charts are drawn with the object-oriented Figure API: unlike pyplot's global
+# state machine it is safe to use from concurrent threads and worker processes.
+from matplotlib.figure import Figure
 import numpy as np
 from wordcloud import WordCloud, STOPWORDS
 import base64
 from io import BytesIO
 import re
 import logging
-from typing import List, Dict, Optional, Any
+import math
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Dict, Optional, Any, Set, Tuple
 from collections import Counter
 
+from backend.core.config import get_settings
+
 logger = logging.getLogger(__name__)
 
 # ─── Stopwords gabungan Indonesia + English ───────────────────────────────────
@@ -41,6 +51,10 @@ _STOPWORDS_EN = set(STOPWORDS) | {
 
 ALL_STOPWORDS = _STOPWORDS_ID | _STOPWORDS_EN
 
+# Artifacts selectable through the analyze endpoints' ``include=`` parameter
+CHART_ARTIFACTS = ("wordcloud", "pie_chart", "bar_chart")
+VIZ_ARTIFACTS = CHART_ARTIFACTS + ("top_keywords",)
+
 # Dark-themed color palette consistent with frontend
 _DARK_BG = "#1A1F2E"
 _COLORS = {
@@ -51,182 +65,354 @@ _COLORS = {
 _TEXT_COLOR = "#E5E7EB"
 _GRID_COLOR = "rgba(255,255,255,0.08)"
 
+# Part of every render-cache key, so a palette change never serves stale PNGs
+_THEME_KEY = (_DARK_BG, _TEXT_COLOR, tuple(sorted(_COLORS.items())))
 
-def _fig_to_base64(fig: plt.Figure) -> str:
+
+def _fig_to_base64(fig: Figure) -> str:
     """Convert a matplotlib figure to a base64-encoded PNG data URL."""
     buf = BytesIO()
     fig.savefig(buf, format="png", bbox_inches="tight", dpi=110,
                 facecolor=fig.get_facecolor())
     buf.seek(0)
     encoded = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close(fig)
     buf.close()
     return f"data:image/png;base64,{encoded}"
 
 
-def _clean_texts(texts: List[str]) -> List[str]:
-    """Basic cleanup: remove URLs, special chars, short tokens."""
-    cleaned = []
-    for t in texts:
-        t = re.sub(r"https?://\S+|www\.\S+", " ", t)
-        t = re.sub(r"[^\w\s]", " ", t)
-        t = re.sub(r"\s+", " ", t).strip()
-        if t:
-            cleaned.append(t)
-    return cleaned
+# One precompiled pass over the whole batch replaces per-comment cleanup
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_WORD_RE = re.compile(r"\w+")
+
+# Words the word cloud draws (its max_words) and chart_data carries
+WORDCLOUD_MAX_WORDS = 120
+
+
+def word_frequencies(texts: List[str]) -> Counter:
+    """
+    Tokenize every comment once and count keywords.
+
+    URLs are dropped, text is lowercased and split on non-word characters;
+    stopwords, digits and words of 2 characters or fewer are skipped. The same
+    Counter feeds the word cloud, the top keywords and chart_data.
+    """
+    batch = _URL_RE.sub(" ", "\n".join(texts).lower())
+    return Counter(
+        word for word in _WORD_RE.findall(batch)
+        if len(word) > 2 and word not in ALL_STOPWORDS and not word.isdigit()
+    )
+
+
+# ─── Renderers ────────────────────────────────────────────────────────────────
+# Module-level (picklable) so they can run in the render pool's worker
+# processes. Each one returns a base64 PNG data URL, or None on failure.
+
+def _new_wordcloud() -> WordCloud:
+    return WordCloud(
+        width=700,
+        height=600,
+        background_color="#1A1F2E",
+        max_words=WORDCLOUD_MAX_WORDS,
+        colormap="cool",
+        stopwords=ALL_STOPWORDS,
+        collocations=False,
+        min_font_size=10,
+        relative_scaling=0.5,
+    )
+
+
+def _wordcloud_to_base64(wc: WordCloud) -> str:
+    fig = Figure(figsize=(7, 6))
+    ax = fig.subplots()
+    fig.patch.set_facecolor(_DARK_BG)
+    ax.set_facecolor(_DARK_BG)
+    ax.imshow(wc, interpolation="bilinear")
+    ax.axis("off")
+    ax.set_title("Most Frequent Words", color=_TEXT_COLOR,
+                 fontsize=14, pad=12, fontweight="bold")
+    return _fig_to_base64(fig)
+
+
+def render_wordcloud_frequencies(frequencies: Dict[str, int]) -> Optional[str]:
+    """Word cloud from precomputed word frequencies."""
+    try:
+        if not frequencies:
+            return None
+        return _wordcloud_to_base64(_new_wordcloud().generate_from_frequencies(frequencies))
+    except Exception as e:
+        logger.error(f"Word cloud generation failed: {e}")
+        return None
+
+
+def render_pie_chart(counts: Dict[str, int]) -> Optional[str]:
+    """Dark-themed sentiment pie chart."""
+    try:
+        total = sum(counts.values())
+        if total == 0:
+            return None
+
+        order = ["positive", "neutral", "negative"]
+        labels = []
+        sizes = []
+        colors = []
+
+        for key in order:
+            v = counts.get(key, 0)
+            if v > 0:
+                labels.append(key.capitalize())
+                sizes.append(v)
+                colors.append(_COLORS[key])
+
+        if not sizes:
+            return None
+
+        fig = Figure(figsize=(7, 6))
+        ax = fig.subplots()
+        fig.patch.set_facecolor(_DARK_BG)
+        ax.set_facecolor(_DARK_BG)
+
+        wedges, texts, autotexts = ax.pie(
+            sizes,
+            labels=labels,
+            colors=colors,
+            autopct="%1.1f%%",
+            startangle=140,
+            pctdistance=0.78,
+            textprops={"color": _TEXT_COLOR, "fontsize": 11},
+            wedgeprops={"edgecolor": _DARK_BG, "linewidth": 2},
+        )
+        for at in autotexts:
+            at.set_color(_DARK_BG)
+            at.set_fontweight("bold")
+
+        ax.set_title("Sentiment Distribution", color=_TEXT_COLOR,
+                     fontsize=14, pad=16, fontweight="bold")
+        return _fig_to_base64(fig)
+
+    except Exception as e:
+        logger.error(f"Pie chart generation failed: {e}")
+        return None
+
+
+def render_bar_chart(counts: Dict[str, int]) -> Optional[str]:
+    """Dark-themed sentiment bar chart."""
+    try:
+        total = sum(counts.values())
+        if total == 0:
+            return None
+
+        sentiments = ["Positive", "Neutral", "Negative"]
+        values = [
+            counts.get("positive", 0),
+            counts.get("neutral", 0),
+            counts.get("negative", 0),
+        ]
+        colors = [_COLORS["positive"], _COLORS["neutral"], _COLORS["negative"]]
+
+        fig = Figure(figsize=(8, 5))
+        ax = fig.subplots()
+        fig.patch.set_facecolor(_DARK_BG)
+        ax.set_facecolor(_DARK_BG)
+
+        bars = ax.bar(sentiments, values, color=colors,
+                      edgecolor=_DARK_BG, linewidth=0.8,
+                      width=0.55, zorder=3)
+
+        # Value labels on bars
+        for bar, val in zip(bars, values):
+            if val > 0:
+                ax.text(
+                    bar.get_x() + bar.get_width() / 2.0,
+                    bar.get_height() + total * 0.01,
+                    f"{val:,}",
+                    ha="center", va="bottom",
+                    color=_TEXT_COLOR, fontsize=11, fontweight="bold",
+                )
+
+        ax.set_title("Sentiment Analysis Results", color=_TEXT_COLOR,
+                     fontsize=14, pad=14, fontweight="bold")
+        ax.set_ylabel("Number of Comments", color=_TEXT_COLOR, fontsize=11)
+        ax.tick_params(colors=_TEXT_COLOR, labelsize=11)
+        for spine in ax.spines.values():
+            spine.set_color((1.0, 1.0, 1.0, 0.1))
+        ax.set_ylim(0, max(values) * 1.2 if max(values) > 0 else 1)
+        ax.yaxis.grid(True, color="#2E3550", linewidth=0.6, zorder=0)
+        ax.set_axisbelow(True)
+
+        # Percentage labels below bar names
+        pcts = [v / total * 100 if total else 0 for v in values]
+        tick_labels = [f"{s}\n{p:.1f}%" for s, p in zip(sentiments, pcts)]
+        ax.set_xticks(range(len(sentiments)))
+        ax.set_xticklabels(tick_labels, color=_TEXT_COLOR)
+
+        fig.tight_layout()
+        return _fig_to_base64(fig)
+
+    except Exception as e:
+        logger.error(f"Bar chart generation failed: {e}")
+        return None
+
+
+# ─── Render pool ──────────────────────────────────────────────────────────────
+# One process pool shared by every request. Worker processes are spawned (not
+# forked) so they never inherit the model weights or the server's threads.
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared render pool, or None when RENDER_WORKERS <= 0 (render inline)."""
+    global _render_pool
+    workers = get_settings().RENDER_WORKERS
+    if workers <= 0:
+        return None
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Chart render pool started with {workers} worker processes")
+        return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    """Stop the shared render pool (called on application shutdown)."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
+
+
+def _submit(fn: Callable[..., Optional[str]], *args: Any) -> "Future[Optional[str]]":
+    """Run a renderer in the pool, or inline when the pool is disabled or broken."""
+    global _render_pool
+    pool = get_render_pool()
+    if pool is not None:
+        try:
+            return pool.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning(f"Render pool unavailable, rendering inline: {e}")
+            with _render_pool_lock:
+                if _render_pool is pool:
+                    _render_pool = None
+
+    future: "Future[Optional[str]]" = Future()
+    future.set_result(fn(*args))
+    return future
+
+
+def _result(future: "Future[Optional[str]]", fn: Callable[..., Optional[str]], *args: Any) -> Optional[str]:
+    """Collect a render result; re-render inline if the worker process died."""
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        logger.warning(f"Render worker crashed, rendering inline: {e}")
+        return fn(*args)
+
+
+# ─── Render cache for the counts-only charts ──────────────────────────────────
+# The pie and bar charts depend on nothing but the three sentiment counts (and
+# the theme), and small videos often produce identical distributions.
+
+class _RenderCache:
+    """Thread-safe, bounded LRU of rendered chart data URLs."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[str]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple, value: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+_chart_cache = _RenderCache(get_settings().CHART_CACHE_SIZE)
+
+_COUNTS_RENDERERS: Dict[str, Callable[[Dict[str, int]], Optional[str]]] = {
+    "pie_chart": render_pie_chart,
+    "bar_chart": render_bar_chart,
+}
+
+
+def _counts_key(chart: str, counts: Dict[str, int]) -> Tuple:
+    """
+    Cache key for a counts chart. The pie only shows proportions, so its counts
+    are reduced by their GCD (10/5/5 draws the same pie as 2/1/1); the bar chart
+    prints absolute values and keys on the exact counts.
+    """
+    values = tuple(int(counts.get(k, 0)) for k in ("positive", "neutral", "negative"))
+    if chart == "pie_chart":
+        g = math.gcd(*values)
+        if g > 1:
+            values = tuple(v // g for v in values)
+    return (chart, _THEME_KEY, values)
+
+
+def _submit_counts_chart(chart: str, counts: Dict[str, int]) -> "Future[Optional[str]]":
+    """Serve a pie/bar chart from the render cache, or submit it to the pool."""
+    cached = _chart_cache.get(_counts_key(chart, counts))
+    if cached is not None:
+        future: "Future[Optional[str]]" = Future()
+        future.set_result(cached)
+        return future
+    return _submit(_COUNTS_RENDERERS[chart], dict(counts))
+
+
+def _collect_counts_chart(chart: str, counts: Dict[str, int], future: "Future[Optional[str]]") -> Optional[str]:
+    image = _result(future, _COUNTS_RENDERERS[chart], dict(counts))
+    if image:
+        _chart_cache.put(_counts_key(chart, counts), image)
+    return image
 
 
 class VisualizationService:
     """Service for generating all visualizations from analyzed comments."""
 
-    def __init__(self):
-        plt.ioff()
-
     # ─── Word Cloud ──────────────────────────────────────────────────────────
 
     def generate_wordcloud(self, texts: List[str]) -> Optional[str]:
         """Generate a word cloud from comment texts. Returns base64 PNG data URL."""
         try:
-            cleaned = _clean_texts(texts)
-            if not cleaned:
-                return None
-
-            combined = " ".join(cleaned)
-            if not combined.strip():
-                return None
-
-            wc = WordCloud(
-                width=700,
-                height=600,
-                background_color="#1A1F2E",
-                max_words=120,
-                colormap="cool",
-                stopwords=ALL_STOPWORDS,
-                collocations=False,
-                min_font_size=10,
-                relative_scaling=0.5,
-            ).generate(combined)
-
-            fig, ax = plt.subplots(figsize=(7, 6))
-            fig.patch.set_facecolor(_DARK_BG)
-            ax.set_facecolor(_DARK_BG)
-            ax.imshow(wc, interpolation="bilinear")
-            ax.axis("off")
-            ax.set_title("Most Frequent Words", color=_TEXT_COLOR,
-                         fontsize=14, pad=12, fontweight="bold")
-            return _fig_to_base64(fig)
-
+            frequencies = dict(word_frequencies(texts).most_common(WORDCLOUD_MAX_WORDS))
         except Exception as e:
             logger.error(f"Word cloud generation failed: {e}")
             return None
+        return self.generate_wordcloud_from_frequencies(frequencies)
+
+    def generate_wordcloud_from_frequencies(self, frequencies: Dict[str, int]) -> Optional[str]:
+        """Generate a word cloud from precomputed word frequencies (see build_chart_data)."""
+        return _result(
+            _submit(render_wordcloud_frequencies, frequencies),
+            render_wordcloud_frequencies, frequencies,
+        )
 
     # ─── Pie Chart ───────────────────────────────────────────────────────────
 
     def generate_pie_chart(self, counts: Dict[str, int]) -> Optional[str]:
         """Generate a dark-themed sentiment pie chart. Returns base64 PNG."""
-        try:
-            total = sum(counts.values())
-            if total == 0:
-                return None
-
-            order = ["positive", "neutral", "negative"]
-            labels = []
-            sizes = []
-            colors = []
-
-            for key in order:
-                v = counts.get(key, 0)
-                if v > 0:
-                    labels.append(key.capitalize())
-                    sizes.append(v)
-                    colors.append(_COLORS[key])
-
-            if not sizes:
-                return None
-
-            fig, ax = plt.subplots(figsize=(7, 6))
-            fig.patch.set_facecolor(_DARK_BG)
-            ax.set_facecolor(_DARK_BG)
-
-            wedges, texts, autotexts = ax.pie(
-                sizes,
-                labels=labels,
-                colors=colors,
-                autopct="%1.1f%%",
-                startangle=140,
-                pctdistance=0.78,
-                textprops={"color": _TEXT_COLOR, "fontsize": 11},
-                wedgeprops={"edgecolor": _DARK_BG, "linewidth": 2},
-            )
-            for at in autotexts:
-                at.set_color(_DARK_BG)
-                at.set_fontweight("bold")
-
-            ax.set_title("Sentiment Distribution", color=_TEXT_COLOR,
-                         fontsize=14, pad=16, fontweight="bold")
-            return _fig_to_base64(fig)
-
-        except Exception as e:
-            logger.error(f"Pie chart generation failed: {e}")
-            return None
+        return _collect_counts_chart("pie_chart", counts, _submit_counts_chart("pie_chart", counts))
 
     # ─── Bar Chart ───────────────────────────────────────────────────────────
 
     def generate_bar_chart(self, counts: Dict[str, int]) -> Optional[str]:
         """Generate a dark-themed sentiment bar chart. Returns base64 PNG."""
-        try:
-            total = sum(counts.values())
-            if total == 0:
-                return None
-
-            sentiments = ["Positive", "Neutral", "Negative"]
-            values = [
-                counts.get("positive", 0),
-                counts.get("neutral", 0),
-                counts.get("negative", 0),
-            ]
-            colors = [_COLORS["positive"], _COLORS["neutral"], _COLORS["negative"]]
-
-            fig, ax = plt.subplots(figsize=(8, 5))
-            fig.patch.set_facecolor(_DARK_BG)
-            ax.set_facecolor(_DARK_BG)
-
-            bars = ax.bar(sentiments, values, color=colors,
-                          edgecolor=_DARK_BG, linewidth=0.8,
-                          width=0.55, zorder=3)
-
-            # Value labels on bars
-            for bar, val in zip(bars, values):
-                if val > 0:
-                    ax.text(
-                        bar.get_x() + bar.get_width() / 2.0,
-                        bar.get_height() + total * 0.01,
-                        f"{val:,}",
-                        ha="center", va="bottom",
-                        color=_TEXT_COLOR, fontsize=11, fontweight="bold",
-                    )
-
-            ax.set_title("Sentiment Analysis Results", color=_TEXT_COLOR,
-                         fontsize=14, pad=14, fontweight="bold")
-            ax.set_ylabel("Number of Comments", color=_TEXT_COLOR, fontsize=11)
-            ax.tick_params(colors=_TEXT_COLOR, labelsize=11)
-            for spine in ax.spines.values():
-                spine.set_color((1.0, 1.0, 1.0, 0.1))
-            ax.set_ylim(0, max(values) * 1.2 if max(values) > 0 else 1)
-            ax.yaxis.grid(True, color="#2E3550", linewidth=0.6, zorder=0)
-            ax.set_axisbelow(True)
-
-            # Percentage labels below bar names
-            pcts = [v / total * 100 if total else 0 for v in values]
-            tick_labels = [f"{s}\n{p:.1f}%" for s, p in zip(sentiments, pcts)]
-            ax.set_xticklabels(tick_labels, color=_TEXT_COLOR)
-
-            fig.tight_layout()
-            return _fig_to_base64(fig)
-
-        except Exception as e:
-            logger.error(f"Bar chart generation failed: {e}")
-            return None
+        return _collect_counts_chart("bar_chart", counts, _submit_counts_chart("bar_chart", counts))
 
     # ─── Top Keywords ─────────────────────────────────────────────────────────
 
@@ -234,26 +420,11 @@ class VisualizationService:
         self,
         texts: List[str],
         top_n: int = 20,
+        frequencies: Optional[Counter] = None,
     ) -> List[Dict[str, Any]]:
         """Extract the top N keywords from comment texts, excluding stopwords."""
         try:
-            cleaned = _clean_texts(texts)
-            if not cleaned:
-                return []
-
-            all_words: List[str] = []
-            for text in cleaned:
-                words = text.lower().split()
-                for word in words:
-                    word = word.strip()
-                    if (
-                        len(word) > 2
-                        and word not in ALL_STOPWORDS
-                        and not word.isdigit()
-                    ):
-                        all_words.append(word)
-
-            counter = Counter(all_words)
+            counter = frequencies if frequencies is not None else word_frequencies(texts)
             return [
                 {"word": word, "frequency": freq}
                 for word, freq in counter.most_common(top_n)
@@ -263,17 +434,83 @@ class VisualizationService:
             logger.error(f"Keyword extraction failed: {e}")
             return []
 
+    # ─── Chart-ready data & on-demand rendering ──────────────────────────────
+
+    def build_chart_data(
+        self,
+        texts: List[str],
+        counts: Dict[str, int],
+        frequencies: Optional[Counter] = None,
+    ) -> Dict[str, Any]:
+        """
+        Cheap, JSON-serializable inputs for every chart: the sentiment counts
+        and the word frequencies the word cloud is drawn from.
+        """
+        try:
+            counter = frequencies if frequencies is not None else word_frequencies(texts)
+            top_words = dict(counter.most_common(WORDCLOUD_MAX_WORDS))
+        except Exception as e:
+            logger.error(f"Word frequency extraction failed: {e}")
+            top_words = {}
+        return {"counts": dict(counts), "word_frequencies": top_words}
+
+    def render_chart(self, chart: str, chart_data: Dict[str, Any]) -> Optional[str]:
+        """Render one chart (see CHART_ARTIFACTS) from build_chart_data output."""
+        if chart == "wordcloud":
+            return self.generate_wordcloud_from_frequencies(chart_data.get("word_frequencies", {}))
+        if chart == "pie_chart":
+            return self.generate_pie_chart(chart_data.get("counts", {}))
+        if chart == "bar_chart":
+            return self.generate_bar_chart(chart_data.get("counts", {}))
+        raise ValueError(f"Unknown chart: {chart}")
+
     # ─── Convenience: generate all at once ───────────────────────────────────
 
     def generate_all(
         self,
         texts: List[str],
         counts: Dict[str, int],
+        include: Optional[Set[str]] = None,
+        frequencies: Optional[Counter] = None,
     ) -> Dict[str, Any]:
-        """Generate all visualizations and return as a dict."""
-        return {
-            "wordcloud_base64": self.generate_wordcloud(texts),
-            "pie_chart_base64": self.generate_pie_chart(counts),
-            "bar_chart_base64": self.generate_bar_chart(counts),
-            "top_keywords": self.generate_top_keywords(texts),
-        }
+        """
+        Generate visualizations and return as a dict.
+
+        ``include`` selects which of VIZ_ARTIFACTS are computed now (None = all).
+        Charts left out come back as None and can be rendered later from
+        ``chart_data`` with render_chart(). Pass precomputed ``frequencies``
+        (e.g. from a KeywordSketch) to skip tokenizing ``texts``.
+        """
+        selected = set(VIZ_ARTIFACTS) if include is None else include
+
+        # Submit every requested chart first so the pool renders them in parallel
+        # (pie/bar come straight from the render cache when the counts repeat).
+        # Texts are tokenized once; every artifact reads the same Counter.
+        if frequencies is None:
+            frequencies = word_frequencies(texts)
+        chart_data = self.build_chart_data(texts, counts, frequencies)
+
+        futures: Dict[str, "Future[Optional[str]]"] = {}
+        cloud_words = chart_data["word_frequencies"]
+        if "wordcloud" in selected:
+            futures["wordcloud"] = _submit(render_wordcloud_frequencies, cloud_words)
+        for chart in _COUNTS_RENDERERS:
+            if chart in selected:
+                futures[chart] = _submit_counts_chart(chart, counts)
+
+        top_keywords = (
+            self.generate_top_keywords(texts, frequencies=frequencies)
+            if "top_keywords" in selected else []
+        )
+
+        viz: Dict[str, Any] = {}
+        for chart in CHART_ARTIFACTS:
+            if chart not in futures:
+                viz[f"{chart}_base64"] = None
+            elif chart == "wordcloud":
+                viz[f"{chart}_base64"] = _result(futures[chart], render_wordcloud_frequencies, cloud_words)
+            else:
+                viz[f"{chart}_base64"] = _collect_counts_chart(chart, counts, futures[chart])
+        viz["top_keywords"] = top_keywords
+        viz["chart_data"] = chart_data
+        return viz
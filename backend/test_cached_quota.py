@@ -0,0 +1,100 @@
+"""
+Analyses are charged the YouTube units they actually spent.
+
+Turns on the on-disk page cache (YOUTUBE_CACHE_DIR) and serves a fake
+YouTube API. The first analysis of a video calls YouTube for every page and
+is charged one unit per call; re-fetching the same video while its pages
+are still fresh is served from the cache without any call and charged 0.
+
+Run from the project root:  python -m backend.test_cached_quota
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="ss-quota-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'quota.db')}"
+os.environ["YOUTUBE_CACHE_DIR"] = os.path.join(_tmp, "pages")
+
+from backend.api import ingest_youtube
+from backend.db import session as db_session
+from backend.services.quota import quota_ledger
+from backend import main
+
+VIDEO_ID = "dQw4w9WgXcQ"
+PAGE_SIZE = 100
+COMMENTS = 150
+CLIENT_IP = "203.0.113.7"
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {"ETag": '"v1"'}
+
+    def __init__(self, body):
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeYouTube:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls += 1
+        if url.endswith("/videos"):
+            return FakeResponse({"items": [{
+                "snippet": {"title": "T", "channelTitle": "C", "publishedAt": "2026-01-01T00:00:00Z"},
+                "statistics": {"commentCount": str(COMMENTS)},
+            }]})
+        start = int(params.get("pageToken") or 0)
+        items = [
+            {"snippet": {
+                "topLevelComment": {"id": f"C{n}", "snippet": {
+                    "textDisplay": f"comment {n} mantap", "authorDisplayName": "a",
+                    "publishedAt": f"2026-01-01T00:{n // 60:02d}:{n % 60:02d}Z",
+                }},
+                "totalReplyCount": 0,
+            }}
+            for n in range(start, min(start + PAGE_SIZE, COMMENTS))
+        ]
+        page = {"items": items}
+        if start + PAGE_SIZE < COMMENTS:
+            page["nextPageToken"] = str(start + PAGE_SIZE)
+        return FakeResponse(page)
+
+
+def _analyze_and_charge(youtube: FakeYouTube):
+    """One refresh=true analysis through the endpoint's charging path → (units charged, YouTube calls)."""
+    calls = youtube.calls
+    used_before = quota_ledger.usage(CLIENT_IP)[1]
+    result = main._run_analysis(VIDEO_ID, 1.0, read_through=False)
+    main._record_quota_usage(result, CLIENT_IP, None)
+    return quota_ledger.usage(CLIENT_IP)[1] - used_before, youtube.calls - calls, result
+
+
+def test_fully_cached_refetch_charges_nothing():
+    db_session.init_db()
+    youtube = FakeYouTube()
+    ingest_youtube.requests.get = youtube.get
+    main.settings.YOUTUBE_API_KEY = main.settings.YOUTUBE_API_KEY or "test-key"
+    assert ingest_youtube.youtube_cache is not None, "YOUTUBE_CACHE_DIR did not enable the page cache"
+
+    charged, calls, result = _analyze_and_charge(youtube)
+    print(f"first fetch : {result['actual_analyzed']} comments, {calls} calls, charged {charged}")
+    assert result["actual_analyzed"] == COMMENTS
+    assert calls > 0 and charged == calls == result["quota_units"]
+
+    charged, calls, result = _analyze_and_charge(youtube)
+    print(f"cached fetch: {result['actual_analyzed']} comments, {calls} calls, charged {charged}")
+    assert result["actual_analyzed"] == COMMENTS and result["data_source"] == "youtube"
+    assert calls == 0 and charged == 0 and result["quota_units"] == 0
+
+
+if __name__ == "__main__":
+    test_fully_cached_refetch_charges_nothing()
+    print("OK — a fully cached re-fetch is charged 0 units")
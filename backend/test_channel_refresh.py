@@ -0,0 +1,123 @@
+"""
+Channel refreshes that hit MAX_COMMENTS_LIMIT make progress.
+
+Points the app at a local SQLite stand-in and serves a fake YouTube comment
+listing (newest first, 100 threads per page). After a first crawl, more new
+comments arrive than one refresh may fetch: the capped refresh keeps the
+high-water mark and saves where it stopped, the next one continues downward
+from there without re-reading the newest pages, and once the gap is closed
+the mark moves up to the newest comment. No comment is fetched twice.
+
+Run from the project root:  python -m backend.test_channel_refresh
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="ss-channel-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'channel.db')}"
+
+from sqlalchemy import func, select
+
+from backend.api import ingest_youtube
+from backend.db import session as db_session
+from backend.db.models import ChannelVideo, Comment
+from backend import main
+
+VIDEO_ID = "dQw4w9WgXcQ"
+PAGE_SIZE = 100
+CAP = 120            # MAX_COMMENTS_LIMIT during the test
+FIRST_CRAWL = 50     # comments present at the first crawl
+BACKLOG = 200        # comments arriving before the next refresh
+
+
+def _timestamp(n: int) -> str:
+    """n-th comment ever posted; comments 129/130 share a second (on the cap boundary)."""
+    n = 129 if n == 130 else n
+    return f"2026-01-01T{n // 3600:02d}:{n // 60 % 60:02d}:{n % 60:02d}Z"
+
+
+class FakeYouTube:
+    def __init__(self):
+        self.posted = 0
+        self.pages_read = []
+
+    def post(self, n: int) -> None:
+        self.posted += n
+
+    def request(self, url, params, retries=3, max_age=None):
+        start = int(params.get("pageToken") or 0)
+        self.pages_read.append(start)
+        newest_first = range(self.posted - 1, -1, -1)[start:start + PAGE_SIZE]
+        items = [
+            {"snippet": {
+                "topLevelComment": {"id": f"C{n}", "snippet": {
+                    "textDisplay": f"comment {n} mantap", "authorDisplayName": "a", "publishedAt": _timestamp(n),
+                }},
+                "totalReplyCount": 0,
+            }}
+            for n in newest_first
+        ]
+        page = {"items": items}
+        if start + PAGE_SIZE < self.posted:
+            page["nextPageToken"] = str(start + PAGE_SIZE)
+        return page
+
+
+def _refresh(youtube: FakeYouTube):
+    youtube.pages_read.clear()
+    result = main._run_channel_analysis("UCfakefakefakefakefakefa", 1)
+    (video,) = result["summary"]["videos"]
+    return video, list(youtube.pages_read)
+
+
+def _crawl_state():
+    with db_session.get_session() as db:
+        stored = db.execute(select(func.count(Comment.id))).scalar_one()
+        state = db.execute(select(ChannelVideo)).scalar_one()
+        return stored, state.high_water_mark, state.resume_point
+
+
+def test_capped_refresh_resumes_below_the_newest_pages():
+    db_session.init_db()
+    youtube = FakeYouTube()
+    ingest_youtube._request = youtube.request
+    main.resolve_channel = lambda channel, key=None: {
+        "channel_id": "UCfakefakefakefakefakefa", "title": "Fake", "handle": None, "uploads_playlist_id": "UUfake",
+    }
+    main.list_channel_uploads = lambda playlist, key=None, max_videos=1: (
+        [{"video_id": VIDEO_ID, "title": "T", "channel_title": "Fake", "published_at": "2026-01-01T00:00:00Z"}], 1,
+    )
+    main.settings.MAX_COMMENTS_LIMIT = CAP
+    main.settings.RAW_JSON_STORAGE = "off"
+    main.settings.YOUTUBE_API_KEY = main.settings.YOUTUBE_API_KEY or "test-key"
+
+    youtube.post(FIRST_CRAWL)
+    video, _ = _refresh(youtube)
+    stored, mark, resume = _crawl_state()
+    assert video["new_comments"] == FIRST_CRAWL and video["caught_up"] and resume is None
+    first_mark = mark
+
+    youtube.post(BACKLOG)
+    video, pages = _refresh(youtube)
+    stored, mark, resume = _crawl_state()
+    print(f"capped refresh : {video['new_comments']} new, pages {pages}, caught up {video['caught_up']}")
+    assert video["new_comments"] == CAP and not video["caught_up"]
+    assert mark == first_mark, "a capped refresh must keep the old mark"
+    assert resume["page_token"] == str(PAGE_SIZE)
+
+    video, pages = _refresh(youtube)
+    stored, mark, resume = _crawl_state()
+    print(f"resumed refresh: {video['new_comments']} new, pages {pages}, caught up {video['caught_up']}")
+    assert pages[0] == PAGE_SIZE, "the resumed refresh re-read the newest page"
+    assert video["new_comments"] == BACKLOG - CAP and video["caught_up"]
+    assert stored == FIRST_CRAWL + BACKLOG
+    assert mark == _timestamp(FIRST_CRAWL + BACKLOG - 1) and resume is None
+
+    video, pages = _refresh(youtube)
+    print(f"idle refresh   : {video['new_comments']} new, pages {pages}")
+    assert video["new_comments"] == 0 and pages == [0]
+
+
+if __name__ == "__main__":
+    test_capped_refresh_resumes_below_the_newest_pages()
+    print("OK — capped channel refreshes resume where they stopped")
@@ -0,0 +1,83 @@
+"""
+Event-loop latency under a slow database.
+
+Points the app at a local SQLite stand-in, injects a fixed delay into every
+SQL statement, then fires concurrent quota-ledger reconciliations while a 10 ms ticker
+measures how late the event loop wakes up. With DB calls on the dedicated
+DB thread pool the lag stays flat; calling the same query inline (the old
+behaviour) stalls the loop for the whole injected delay.
+
+Run from the project root:  python -m backend.test_db_latency
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix="ss-latency-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'latency.db')}"
+
+from sqlalchemy import event
+
+from backend.db import session as db_session
+from backend import main
+
+DB_DELAY = 0.2       # seconds added to every statement
+CONCURRENT = 8       # reconciliations in flight at once
+TICK = 0.01          # ticker period
+
+
+def _inject_latency():
+    @event.listens_for(db_session.engine, "before_cursor_execute")
+    def _slow(*_args, **_kwargs):
+        time.sleep(DB_DELAY)
+
+
+async def _max_loop_lag(workload) -> float:
+    """Run workload() while ticking every TICK seconds; return the worst wake-up delay."""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(TICK)
+            worst = max(worst, time.perf_counter() - before - TICK)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 3)  # let the ticker settle
+    await workload()
+    done.set()
+    await task
+    return worst
+
+
+async def _offloaded():
+    await asyncio.gather(*(db_session.run_db(main._reconcile_quota_ledger) for _ in range(CONCURRENT)))
+
+
+async def _inline():
+    for _ in range(CONCURRENT):
+        main._reconcile_quota_ledger()  # blocking call on the loop
+        await asyncio.sleep(0)
+
+
+def test_event_loop_latency_stays_flat():
+    db_session.init_db()
+    _inject_latency()
+
+    offloaded = asyncio.run(_max_loop_lag(_offloaded))
+    inline = asyncio.run(_max_loop_lag(_inline))
+
+    print(f"Injected DB latency : {DB_DELAY * 1000:.0f} ms per statement")
+    print(f"Max loop lag (pool) : {offloaded * 1000:.1f} ms")
+    print(f"Max loop lag (inline): {inline * 1000:.1f} ms")
+
+    assert inline >= DB_DELAY * 0.9, "latency injection did not take effect"
+    assert offloaded < DB_DELAY / 4, "event loop stalled while waiting on the database"
+
+
+if __name__ == "__main__":
+    test_event_loop_latency_stays_flat()
+    print("OK — event loop stays responsive under DB latency")
@@ -0,0 +1,96 @@
+"""
+Trend and channel rollups count every comment once, across models.
+
+Points the app at a local SQLite stand-in and stores one channel upload whose
+comments were scored by two models (the transformer and the rule-based
+fallback), then re-scores some of them with the transformer. The served
+rollup behind the trend series and the channel summary must count each
+comment once with its newest prediction, and match a full rebuild.
+
+Run from the project root:  python -m backend.test_sentiment_rollups
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="ss-rollups-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'rollups.db')}"
+
+from sqlalchemy import select
+
+from backend.db import session as db_session
+from backend.db.models import SentimentDaily
+from backend.db.repository import (
+    bulk_upsert_comments, daily_sentiment_series, rebuild_sentiment_daily, refresh_channel_summary,
+    save_channel_video_crawl, upsert_channel, upsert_prediction_rows,
+)
+
+VIDEO_ID = "dQw4w9WgXcQ"
+TRANSFORMER, FALLBACK = "xlmr-sentiment", "rule-based"
+
+
+def _prediction(label: str):
+    scores = {"negative": 0.1, "neutral": 0.1, "positive": 0.1, label: 0.8}
+    return {"label": label, "confidence": 0.8, "scores": scores}
+
+
+def _comment(i: int, label: str, model_name: str):
+    return {
+        "comment_id": f"C{i}",
+        "text": f"comment {i}",
+        "published_at": f"2026-01-0{1 + i % 3}T10:00:00Z",
+        "prediction": _prediction(label),
+        "model_name": model_name,
+    }
+
+
+def _rollup_rows(db):
+    return sorted(
+        (r.video_pk, r.model_name, r.day, r.label, r.comment_count, round(r.positive_score_sum, 6))
+        for r in db.execute(select(SentimentDaily)).scalars()
+        if r.comment_count
+    )
+
+
+def test_served_rollup_spans_models():
+    db_session.init_db()
+    # 6 comments by the transformer, 4 by the fallback (the model was down)
+    analyzed = [_comment(i, "positive", TRANSFORMER) for i in range(6)]
+    analyzed += [_comment(i, "negative", FALLBACK) for i in range(6, 10)]
+
+    with db_session.get_session() as db:
+        channel_pk = upsert_channel(db, {"channel_id": "UCfakefakefakefakefakefa", "uploads_playlist_id": "UUfake"})
+        video = {"video_id": VIDEO_ID, "title": "T", "channel_title": "Fake"}
+        save_channel_video_crawl(db, channel_pk, video, analyzed)
+
+    with db_session.get_session() as db:
+        model, series = daily_sentiment_series(db, VIDEO_ID)
+        counts = {k: sum(day["counts"][k] for day in series) for k in ("positive", "negative")}
+        print(f"served trend   : {model} {counts}")
+        assert counts == {"positive": 6, "negative": 4}
+        summary = refresh_channel_summary(db, channel_pk)
+        assert summary["total"] == 10 and summary["counts"]["negative"] == 4
+
+    # The model is back: two fallback comments are re-scored as neutral
+    with db_session.get_session() as db:
+        pks = bulk_upsert_comments(db, db.execute(select(SentimentDaily.video_pk)).scalars().first(), analyzed)
+        upsert_prediction_rows(db, [(pks["C6"], TRANSFORMER, _prediction("neutral")),
+                                    (pks["C7"], TRANSFORMER, _prediction("neutral"))])
+
+    with db_session.get_session() as db:
+        _, series = daily_sentiment_series(db, VIDEO_ID)
+        counts = {k: sum(day["counts"][k] for day in series) for k in ("positive", "neutral", "negative")}
+        _, transformer_only = daily_sentiment_series(db, VIDEO_ID, TRANSFORMER)
+        print(f"after re-score : {counts}, transformer alone: {sum(d['total'] for d in transformer_only)}")
+        assert counts == {"positive": 6, "neutral": 2, "negative": 2}
+        assert sum(d["total"] for d in transformer_only) == 8
+        summary = refresh_channel_summary(db, channel_pk)
+        assert summary["total"] == 10 and summary["counts"] == counts
+
+        incremental = _rollup_rows(db)
+        rebuild_sentiment_daily(db)
+        assert _rollup_rows(db) == incremental, "incremental rollups drifted from a rebuild"
+
+
+if __name__ == "__main__":
+    test_served_rollup_spans_models()
+    print("OK — rollups count every comment once across models")
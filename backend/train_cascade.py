@@ -0,0 +1,177 @@
+"""
+Train the cascade's first-stage model from stored predictions.
+
+Reads comment texts and the full model's stored scores from the database,
+distills them into a hashed n-gram model (backend.services.cascade), and
+reports on a held-out share how many comments each confidence gate would
+keep away from the transformer and how often those labels agree with it.
+Point CASCADE_MODEL_PATH at the output to enable the cascade.
+
+Run from the project root:
+    python -m backend.train_cascade
+    python -m backend.train_cascade --output artifacts/cascade.npz --gates 0.8,0.9,0.95
+    python -m backend.train_cascade --teacher xlmr-sentiment --limit 200000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.core.config import get_settings
+from backend.services.cascade import DEFAULT_HASH_BITS, HashedNgramModel, agreement_report
+
+logger = logging.getLogger("train_cascade")
+
+DEFAULT_OUTPUT = "artifacts/cascade-ngram.npz"
+
+
+def _default_teacher() -> str:
+    """The model name SentimentService stores its predictions under."""
+    settings = get_settings()
+    return settings.MODEL_NAME or os.path.basename(os.path.normpath(settings.MODEL_DIR))
+
+
+def _neutral_threshold() -> float:
+    """Same resolution as SentimentService: NEUTRAL_THRESHOLD, then inference_config.json, then 0.5."""
+    settings = get_settings()
+    if settings.NEUTRAL_THRESHOLD is not None:
+        return float(settings.NEUTRAL_THRESHOLD)
+    cfg_path = os.path.join(settings.MODEL_DIR, "inference_config.json")
+    try:
+        with open(cfg_path, "r", encoding="utf-8") as f:
+            t = json.load(f).get("t_neu")
+        return float(t) if t is not None else 0.5
+    except (OSError, ValueError):
+        return 0.5
+
+
+def load_training_data(teacher: str, limit: Optional[int]) -> Tuple[List[str], np.ndarray, List[str]]:
+    """Texts, (n, 3) teacher probabilities and teacher labels of every stored prediction."""
+    from sqlalchemy import select
+
+    from backend.db.models import Comment, Prediction
+    from backend.db.session import get_session
+
+    stmt = (
+        select(
+            Comment.text,
+            Prediction.negative_score,
+            Prediction.neutral_score,
+            Prediction.positive_score,
+            Prediction.label,
+        )
+        .join(Prediction, Prediction.comment_pk == Comment.id)
+        .where(Prediction.model_name == teacher)
+        .order_by(Prediction.id)
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+
+    texts: List[str] = []
+    scores: List[Tuple[float, float, float]] = []
+    labels: List[str] = []
+    with get_session() as db:
+        for text, neg, neu, pos, label in db.execute(stmt).yield_per(5000):
+            texts.append(text or "")
+            scores.append((neg, neu, pos))
+            labels.append(label)
+    return texts, np.array(scores, dtype=np.float32).reshape(-1, 3), labels
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    teacher = args.teacher or _default_teacher()
+    gates = [float(g) for g in args.gates.split(",") if g.strip()]
+    t_neu = _neutral_threshold()
+
+    started = time.time()
+    texts, targets, labels = load_training_data(teacher, args.limit)
+    if len(texts) < 100:
+        raise SystemExit(f"Only {len(texts)} stored predictions from '{teacher}'; analyze more videos first")
+    logger.info(f"Loaded {len(texts):,} predictions from '{teacher}' in {time.time() - started:.1f}s")
+
+    # Normalize stored scores (rounded on write) into proper distributions
+    targets /= np.maximum(targets.sum(axis=1, keepdims=True), 1e-6)
+
+    order = np.random.default_rng(args.seed).permutation(len(texts))
+    n_holdout = max(1, int(len(texts) * args.holdout)) if args.holdout > 0 else 0
+    test, train = order[:n_holdout], order[n_holdout:]
+
+    started = time.time()
+    model = HashedNgramModel.zeros(args.hash_bits)
+    model.fit([texts[i] for i in train], targets[train], epochs=args.epochs, seed=args.seed)
+    train_seconds = time.time() - started
+    logger.info(f"Trained on {len(train):,} comments in {train_seconds:.1f}s")
+
+    report: List[Dict[str, Any]] = []
+    if n_holdout:
+        started = time.time()
+        student = model.predict([texts[i] for i in test], t_neu)
+        per_comment_ms = (time.time() - started) * 1000 / n_holdout
+        report = agreement_report(student, [labels[i] for i in test], gates)
+    else:
+        per_comment_ms = None
+
+    model.meta.update(
+        teacher=teacher,
+        t_neu=t_neu,
+        trained_at=datetime.now(timezone.utc).isoformat(),
+        train_comments=len(train),
+        holdout_comments=n_holdout,
+        hash_bits=args.hash_bits,
+        epochs=args.epochs,
+        agreement=report,
+    )
+    out_dir = os.path.dirname(args.output)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    model.save(args.output)
+
+    return {
+        "output": args.output,
+        "teacher": teacher,
+        "neutral_threshold": t_neu,
+        "train_comments": len(train),
+        "holdout_comments": n_holdout,
+        "train_seconds": round(train_seconds, 2),
+        "first_stage_ms_per_comment": round(per_comment_ms, 4) if per_comment_ms is not None else None,
+        "agreement": report,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    settings = get_settings()
+    p = argparse.ArgumentParser(
+        prog="python -m backend.train_cascade",
+        description="Distill stored transformer predictions into the cascade's first-stage model.",
+    )
+    p.add_argument("--output", default=settings.CASCADE_MODEL_PATH or DEFAULT_OUTPUT,
+                   help=f"Model file to write (default: CASCADE_MODEL_PATH or {DEFAULT_OUTPUT})")
+    p.add_argument("--teacher", default=None, help="Model name whose stored predictions are learned (default: the configured model)")
+    p.add_argument("--limit", type=int, default=None, help="Use at most this many stored predictions")
+    p.add_argument("--holdout", type=float, default=0.1, help="Share held out for the agreement report (default: 0.1)")
+    p.add_argument("--gates", default="0.7,0.8,0.9,0.95", help="Confidence gates to report on (comma-separated)")
+    p.add_argument("--epochs", type=int, default=4, help="Training passes over the data")
+    p.add_argument("--hash-bits", type=int, default=DEFAULT_HASH_BITS, help="log2 of the hashed feature space")
+    p.add_argument("--seed", type=int, default=0, help="Seed for the holdout split and shuffling")
+    return p
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", datefmt="%H:%M:%S")
+    args = build_parser().parse_args(argv)
+    if not 0 <= args.holdout < 1 or args.epochs < 1 or not 10 <= args.hash_bits <= 24:
+        raise SystemExit("--holdout must be in [0, 1), --epochs positive and --hash-bits in 10..24")
+
+    summary = run(args)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
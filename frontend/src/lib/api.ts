@@ -59,7 +59,119 @@ export interface AnalyzeOut {
     pie_chart_base64: string | null;
     bar_chart_base64: string | null;
     top_keywords: Array<{ word: string; frequency: number }>;
+    top_keywords_by_sentiment?: Record<
+      "positive" | "neutral" | "negative",
+      Array<{ word: string; frequency: number }>
+    >;
+    chart_data?: {
+      counts: { positive: number; negative: number; neutral: number };
+      word_frequencies: Record<string, number>;
+    };
+  };
+  timeline?: SentimentTimeline;
+  precision?: RatioPrecision | null;
+  topics?: TopicClusters | null;
+  data_source?: "youtube" | "database";
+  quota_units?: number;
+}
+
+export interface TopicCluster {
+  topic: number;
+  size: number;
+  share: number;
+  counts: { positive: number; neutral: number; negative: number };
+  ratios: { positive: number; neutral: number; negative: number };
+  keywords: string[];
+  examples: Array<{
+    comment_id: string | null;
+    text: string;
+    author: string;
+    like_count: number;
+    label: string;
+  }>;
+}
+
+export interface TopicClusters {
+  method: string;
+  clustered_comments: number;
+  embedded_comments: number;
+  analyzed_comments: number;
+  coverage: number; // share of analyzed comments with an embedding (clustered or sampled)
+  sampled: boolean;
+  topics: TopicCluster[];
+}
+
+export interface RatioInterval {
+  ratio: number;
+  low: number;
+  high: number;
+  margin: number;
+}
+
+export interface RatioPrecision {
+  confidence: number;
+  target_margin: number | null;
+  achieved_margin: number;
+  converged: boolean;
+  stopped_early: boolean;
+  intervals: Record<"positive" | "neutral" | "negative", RatioInterval>;
+}
+
+export interface SentimentTimeline {
+  bucket: "hour" | "day" | "week" | null;
+  bucket_seconds: number;
+  timezone: "UTC";
+  start: string[];
+  total: number[];
+  counts: { positive: number[]; negative: number[]; neutral: number[] };
+  mean_scores: Partial<Record<"positive" | "neutral" | "negative", Array<number | null>>>;
+  unparsed: number;
+}
+
+export interface BatchAnalyzeOut {
+  videos: AnalyzeOut[];
+  errors: Array<{ video_id: string; detail: string }>;
+  aggregate: {
+    videos_analyzed: number;
+    from_database: number;
+    actual_analyzed: number;
+    counts: { positive: number; negative: number; neutral: number };
+    ratios: { positive: number; negative: number; neutral: number };
+    top_keywords: Array<{ word: string; frequency: number }>;
   };
+  processing_time: number;
+  quota_units: number;
+}
+
+export interface ChannelVideoSummary {
+  video_id: string;
+  title: string | null;
+  published_at: string | null;
+  last_crawled_at: string | null;
+  total: number;
+  counts: { positive: number; negative: number; neutral: number };
+  ratios: { positive: number; negative: number; neutral: number };
+  new_comments?: number;
+  caught_up: boolean; // false: a capped refresh left a gap, the next refresh continues it
+}
+
+export interface ChannelAnalysis {
+  channel_id: string;
+  title: string;
+  handle: string | null;
+  videos_crawled: number;
+  new_comments: number;
+  summary: {
+    videos_tracked: number;
+    total: number;
+    counts: { positive: number; negative: number; neutral: number };
+    ratios: { positive: number; negative: number; neutral: number };
+    videos: ChannelVideoSummary[];
+    computed_at: string;
+  };
+  errors: Array<{ video_id: string; detail: string }>;
+  quota_units: number;
+  processing_time: number;
 }
 
 export interface StartScrapeResponse {
@@ -79,6 +191,24 @@ export interface JobStatus {
   result?: AnalyzeOut;
 }
 
+type SentimentTriple = { positive: number; negative: number; neutral: number };
+
+export interface TrendPoint {
+  date: string;
+  total: number;
+  counts: SentimentTriple;
+  ratios: SentimentTriple;
+  mean_scores: SentimentTriple;
+  mean_confidence: Record<"positive" | "neutral" | "negative", number | null>;
+}
+
+export interface VideoTrend {
+  video_id: string;
+  model_name: string;
+  days: number;
+  series: TrendPoint[];
+}
+
 export interface ProgressEvent {
   step: string;
   progress: number;
@@ -107,10 +237,14 @@ export const streamAnalysis = (
   percentage: number,
   onProgress: (event: ProgressEvent) => void,
   onResult: (result: AnalyzeOut) => void,
-  onError: (error: string) => void
+  onError: (error: string) => void,
+  targetMargin?: number
 ): (() => void) => {
   const videoId = extractVideoId(url);
-  const streamUrl = `${API_BASE_URL}/api/analyze/video/${videoId}/stream?percentage=${percentage}`;
+  let streamUrl = `${API_BASE_URL}/api/analyze/video/${videoId}/stream?percentage=${percentage}`;
+  if (targetMargin !== undefined) {
+    streamUrl += `&target_margin=${targetMargin}`;
+  }
 
   const eventSource = new EventSource(streamUrl);
 
@@ -202,6 +336,43 @@ export const downloadCSV = (videoId: string, percentage: number): void => {
   document.body.removeChild(link);
 };
 
+// ── Batch analysis (several videos, one request) ──────────────────────────────
+export const analyzeBatch = async (
+  videos: string[],
+  percentage: number,
+  include?: string
+): Promise<BatchAnalyzeOut> => {
+  const { data } = await api.post<BatchAnalyzeOut>("/api/analyze/batch", {
+    videos,
+    percentage,
+    include,
+  });
+  return data;
+};
+
+// ── Channel analysis (incremental) ────────────────────────────────────────────
+export const analyzeChannel = async (
+  channel: string,
+  maxVideos = 10
+): Promise<ChannelAnalysis> => {
+  const { data } = await api.get<ChannelAnalysis>(
+    `/api/analyze/channel/${encodeURIComponent(channel)}`,
+    { params: { max_videos: maxVideos } }
+  );
+  return data;
+};
+
+// ── Daily sentiment trend ─────────────────────────────────────────────────────
+export const getVideoTrend = async (
+  videoId: string,
+  days?: number
+): Promise<VideoTrend> => {
+  const { data } = await api.get<VideoTrend>(`/api/videos/${videoId}/trend`, {
+    params: days ? { days } : undefined,
+  });
+  return data;
+};
+
 // ── Health check ──────────────────────────────────────────────────────────────
 export const healthCheck = () => api.get("/health");
 
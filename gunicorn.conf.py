@@ -0,0 +1,78 @@
+# gunicorn.conf.py - Multi-worker deployment that shares one copy of the model
+#
+# Run from the project root (Linux/macOS; gunicorn does not run on Windows):
+#     gunicorn -c gunicorn.conf.py backend.main:app
+#
+# The master process imports the app and loads XLM-RoBERTa once, then forks
+# the workers. The weights are never written after loading, so the forked
+# workers keep sharing the master's pages (copy-on-write) instead of each
+# loading its own ~1 GB copy. `uvicorn --workers` cannot do this: it starts
+# every worker as a fresh interpreter.
+#
+# Environment:
+#     WEB_CONCURRENCY        worker processes (default 2)
+#     BIND                   listen address (default 0.0.0.0:8000)
+#     PRELOAD_MODEL          1 = load the model in the master (default); 0 = every
+#                            worker loads its own copy (the old behaviour, for comparison)
+#     TORCH_THREADS          intra-op threads per worker (default: CPU cores / workers)
+#
+# Measure the effect with `python -m backend.bench_worker_memory`.
+import gc
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = 300  # full analyses of large videos run for minutes
+graceful_timeout = 30
+
+_preload_model = os.getenv("PRELOAD_MODEL", "1") != "0"
+preload_app = _preload_model
+
+if _preload_model:
+    # Objects created while the app and model load are frozen below; keeping
+    # the collector off until then leaves them packed together (CPython's
+    # documented recipe for fork-after-load servers).
+    gc.disable()
+
+
+def on_starting(server):
+    """Master, before forking: load the model once and freeze the heap."""
+    if not _preload_model:
+        return
+    import torch
+
+    # No intra-op thread pool in the master: OpenMP threads do not survive fork
+    torch.set_num_threads(1)
+
+    from backend import main
+
+    if main._try_load_model():
+        server.log.info("Model loaded in the master; workers will share its weights")
+    else:
+        server.log.warning("Model not loaded in the master; each worker will try on startup")
+
+    # Move everything allocated so far out of the collector's reach, so
+    # collections in the workers never write to (and so copy) those pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Worker, right after fork."""
+    if _preload_model:
+        gc.enable()
+
+    import torch
+
+    threads = int(os.getenv("TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // server.cfg.workers)
+    torch.set_num_threads(threads)
+
+    # Connections must not be shared across processes; the master never opens
+    # any, but drop the inherited pool state to be safe
+    try:
+        from backend.db.session import engine
+
+        engine.dispose(close=False)
+    except Exception:
+        pass